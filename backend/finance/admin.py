@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Transaction, Budget, Goal
+from . import fulltext
+from .models import Transaction, Budget, Goal, CategoryRule
 
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
@@ -7,6 +8,12 @@ class TransactionAdmin(admin.ModelAdmin):
     list_filter = ['type', 'category', 'date']
     search_fields = ['description']
     ordering = ['-date']
+    
+    def get_search_results(self, request, queryset, search_term):
+        # The full-text index instead of a LIKE '%term%' scan of every description
+        if not fulltext.words(search_term):
+            return queryset, False
+        return fulltext.matching(queryset, search_term), False
 
 @admin.register(Budget)
 class BudgetAdmin(admin.ModelAdmin):
@@ -17,4 +24,10 @@ class GoalAdmin(admin.ModelAdmin):
     list_display = ['name', 'target_amount', 'current_amount', 'target_date', 'completed']
     list_filter = ['completed', 'target_date']
     search_fields = ['name', 'description']
-    ordering = ['-created_at']
\ No newline at end of file
+    ordering = ['-created_at']
+
+@admin.register(CategoryRule)
+class CategoryRuleAdmin(admin.ModelAdmin):
+    list_display = ['name', 'match_type', 'pattern', 'category', 'min_amount', 'max_amount', 'priority', 'is_active']
+    list_filter = ['match_type', 'is_active', 'category']
+    ordering = ['priority', 'id']
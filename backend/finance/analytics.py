@@ -0,0 +1,242 @@
+import calendar
+from datetime import date, timedelta
+
+from django.db.models import F, Q, Sum
+from django.db.models.functions import TruncQuarter, TruncWeek
+
+from .caching import CATEGORIES_SCOPE, cached, month_scope
+from .models import Category, MonthlyRollup, Transaction
+from .rollups import month_end, month_start, summarize
+
+RANGE_MONTHS = {
+    '3m': 3,
+    '6m': 6,
+    '12m': 12,
+}
+
+TREND_GRANULARITIES = ('week', 'month', 'quarter')
+
+
+def add_months(value, months):
+    """Shift a date by whole calendar months, clamping the day to the month's end"""
+    month_index = value.year * 12 + value.month - 1 + months
+    year, month = divmod(month_index, 12)
+    month += 1
+    day = min(value.day, calendar.monthrange(year, month)[1])
+    return date(year, month, day)
+
+
+def month_span(start_date, end_date):
+    """Number of calendar months touched by the inclusive range"""
+    return (end_date.year - start_date.year) * 12 + end_date.month - start_date.month + 1
+
+
+def analytics_summary(start_date, end_date, months):
+    """
+    Build the Analytics page payload (monthlyTrend, categoryBreakdown, insights)
+    for transactions dated within [start_date, end_date].
+
+    Totals come from the monthly rollup (plus the partial months at the edges),
+    so the cost depends on the months and categories in range, not on the
+    number of transactions.
+    """
+    rows = summarize(start_date, end_date, fields=('month', 'type', 'category__name', 'category__color'))
+
+    monthly_data = {}
+    category_totals = {}
+    total_income = 0
+    total_expenses = 0
+    for row in sorted(rows, key=lambda row: row['month']):
+        month = row['month']
+        entry = monthly_data.setdefault(month, {
+            'month': month.strftime('%b %Y'),
+            'income': 0,
+            'expenses': 0,
+        })
+        amount = float(row['total'])
+        if row['type'] == 'income':
+            entry['income'] += amount
+            total_income += amount
+        else:
+            entry['expenses'] += amount
+            total_expenses += amount
+            key = (row['category__name'], row['category__color'])
+            category_totals[key] = category_totals.get(key, 0) + amount
+
+    category_breakdown = [
+        {
+            'name': name or 'Uncategorized',
+            'amount': amount,
+            'color': color,
+        }
+        for (name, color), amount in sorted(category_totals.items(), key=lambda item: item[1], reverse=True)
+    ]
+
+    net_change = total_income - total_expenses
+    days = (end_date - start_date).days + 1
+    largest = category_breakdown[0] if category_breakdown else None
+
+    return {
+        'period': {
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+            'months': months,
+        },
+        'monthlyTrend': list(monthly_data.values()),
+        'categoryBreakdown': category_breakdown,
+        'insights': {
+            'totalIncome': total_income,
+            'totalExpenses': total_expenses,
+            'netWorthChange': net_change,
+            'savingsRate': (net_change / total_income * 100) if total_income > 0 else 0,
+            'avgMonthlySpending': total_expenses / max(months, 1),
+            'avgDailySpending': total_expenses / max(days, 1),
+            'largestCategory': {
+                'category': largest['name'],
+                'amount': largest['amount'],
+            } if largest else None,
+        },
+    }
+
+
+def cached_analytics_summary(start_date, end_date, months, key):
+    """
+    analytics_summary() through the versioned cache. The entry is keyed by
+    `key` plus the range, and invalidated by any committed write to a month
+    inside the range or to categories.
+    """
+    scopes = [CATEGORIES_SCOPE] + [month_scope(month) for month in _bucket_starts('month', start_date, end_date)]
+    return cached(
+        f"{key}:{start_date.isoformat()}:{end_date.isoformat()}:{months}",
+        scopes,
+        lambda: analytics_summary(start_date, end_date, months),
+    )
+
+
+def _bucket_starts(granularity, start_date, end_date):
+    if granularity == 'week':
+        current = start_date - timedelta(days=start_date.weekday())
+        step = lambda value: value + timedelta(weeks=1)
+    elif granularity == 'quarter':
+        current = date(start_date.year, (start_date.month - 1) // 3 * 3 + 1, 1)
+        step = lambda value: add_months(value, 3)
+    else:
+        current = month_start(start_date)
+        step = lambda value: add_months(value, 1)
+
+    while current <= end_date:
+        yield current
+        current = step(current)
+
+
+def _bucket_label(granularity, start):
+    if granularity == 'week':
+        return f"Week of {start.isoformat()}"
+    if granularity == 'quarter':
+        return f"Q{(start.month - 1) // 3 + 1} {start.year}"
+    return start.strftime('%b %Y')
+
+
+def trend(months, granularity, today):
+    """
+    Income, expenses and savings for the last `months` calendar months
+    (including the current one), bucketed by week, month or quarter.
+
+    One grouped query with conditional aggregation fetches every bucket; month
+    and quarter buckets read the monthly rollup, weeks read the ledger by date
+    range. Buckets without transactions are zero-filled.
+    """
+    start_date = month_start(add_months(today, -(months - 1)))
+    end_date = month_end(today)
+    income = Q(type='income')
+    expense = Q(type='expense')
+
+    if granularity == 'week':
+        rows = (
+            Transaction.objects
+            .filter(date__gte=start_date, date__lte=end_date)
+            .annotate(bucket=TruncWeek('date'))
+            .values('bucket')
+            .annotate(income=Sum('amount', filter=income), expenses=Sum('amount', filter=expense))
+            .order_by()
+        )
+    else:
+        bucket = TruncQuarter('month') if granularity == 'quarter' else F('month')
+        rows = (
+            MonthlyRollup.objects
+            .filter(month__gte=start_date, month__lte=end_date)
+            .annotate(bucket=bucket)
+            .values('bucket')
+            .annotate(income=Sum('total', filter=income), expenses=Sum('total', filter=expense))
+            .order_by()
+        )
+
+    totals = {row['bucket']: row for row in rows}
+    buckets = []
+    for start in _bucket_starts(granularity, start_date, end_date):
+        row = totals.get(start, {})
+        bucket_income = float(row.get('income') or 0)
+        bucket_expenses = float(row.get('expenses') or 0)
+        buckets.append({
+            'period': start.isoformat(),
+            'label': _bucket_label(granularity, start),
+            'income': bucket_income,
+            'expenses': bucket_expenses,
+            'savings': bucket_income - bucket_expenses,
+        })
+    return buckets
+
+
+def category_map():
+    """{id: {'name', 'color'}} of every category"""
+    return {row['id']: row for row in Category.objects.values('id', 'name', 'color')}
+
+
+def month_summary(today, categories=None):
+    """
+    Income, expenses, savings and the expenses and income by category name for
+    the month of `today`. `categories` is a `category_map()`, read here when
+    not given.
+    """
+    rows = summarize(month_start(today), month_end(today), fields=('type', 'category_id'))
+    if categories is None:
+        categories = category_map()
+
+    monthly_income = sum(row['total'] for row in rows if row['type'] == 'income')
+    monthly_expenses = sum(row['total'] for row in rows if row['type'] == 'expense')
+
+    breakdowns = {'expense': {}, 'income': {}}
+    for row in rows:
+        breakdown = breakdowns[row['type']]
+        category = categories.get(row['category_id'])
+        category_name = category['name'] if category else 'uncategorized'
+        if category_name not in breakdown:
+            breakdown[category_name] = {
+                'amount': 0,
+                'color': (category['color'] if category else None) or '#6b7280',
+                'count': 0
+            }
+        breakdown[category_name]['amount'] += float(row['total'])
+        breakdown[category_name]['count'] += row['count']
+
+    return {
+        'monthly_income': float(monthly_income),
+        'monthly_expenses': float(monthly_expenses),
+        'monthly_savings': float(monthly_income - monthly_expenses),
+        'expense_breakdown': breakdowns['expense'],
+        'income_breakdown': breakdowns['income'],
+        'transaction_count': sum(row['count'] for row in rows)
+    }
+
+
+def six_month_savings(today):
+    """Income, expenses and savings of the last six months, labelled by month"""
+    return [
+        {
+            'month': date.fromisoformat(bucket['period']).strftime('%b'),
+            'income': bucket['income'],
+            'expenses': bucket['expenses'],
+            'savings': bucket['savings']
+        }
+        for bucket in trend(6, 'month', today)
+    ]
@@ -0,0 +1,86 @@
+"""
+Apply a validated /transactions/batch/ request.
+
+Creates go through one bulk_create, deletes through one DELETE per chunk of
+ids, and updates are grouped by identical field values so that a bulk
+recategorization becomes a single UPDATE per chunk. Everything runs in one
+atomic block; the TransactionQuerySet bulk operations keep MonthlyRollup in
+step. Creates arrive with their budget period already resolved by
+TransactionOperationListSerializer.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Transaction
+
+# Keep `pk__in` lists below SQLite's bound-parameter limit
+ID_CHUNK_SIZE = 900
+
+
+def apply_operations(operations):
+    """Apply validated operations in order. Returns (op, instance_or_id) pairs in request order."""
+    now = timezone.now()
+    results = [None] * len(operations)
+    creates = []
+    updates = []
+    deletes = []
+
+    for index, operation in enumerate(operations):
+        if operation['op'] == 'create':
+            creates.append((index, operation['validated']))
+        elif operation['op'] == 'update':
+            updates.append((index, operation['instance'], operation['validated']))
+        else:
+            deletes.append((index, operation['instance'].pk))
+
+    with transaction.atomic():
+        if deletes:
+            ids = [pk for _, pk in deletes]
+            for chunk in _chunks(ids):
+                Transaction.objects.filter(pk__in=chunk).delete()
+            for index, pk in deletes:
+                results[index] = ('delete', pk)
+
+        if updates:
+            _apply_updates(updates, now)
+            for index, instance, _ in updates:
+                results[index] = ('update', instance)
+
+        if creates:
+            instances = [Transaction(**attrs) for _, attrs in creates]
+            Transaction.objects.bulk_create(instances)
+            for (index, _), instance in zip(creates, instances):
+                results[index] = ('create', instance)
+
+    return results
+
+
+def _apply_updates(updates, now):
+    groups = {}
+    for _, instance, attrs in updates:
+        for field, value in attrs.items():
+            setattr(instance, field, value)
+        instance.updated_at = now
+        signature = tuple(sorted((field, getattr(value, 'pk', value)) for field, value in attrs.items()))
+        groups.setdefault(signature, (attrs, []))[1].append(instance)
+
+    singles = []
+    single_fields = set()
+    for attrs, instances in groups.values():
+        if len(instances) == 1:
+            singles.extend(instances)
+            single_fields.update(attrs)
+            continue
+        if not attrs:
+            continue
+        ids = [instance.pk for instance in instances]
+        for chunk in _chunks(ids):
+            Transaction.objects.filter(pk__in=chunk).update(updated_at=now, **attrs)
+
+    if singles:
+        Transaction.objects.bulk_update(singles, sorted(single_fields) + ['updated_at'])
+
+
+def _chunks(items, size=ID_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
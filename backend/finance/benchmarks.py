@@ -0,0 +1,122 @@
+"""
+Endpoint benchmarks over synthetic ledgers.
+
+`run_endpoints` requests every read action of the API through the test
+client and records its status, SQL query count and latency. Each timed run
+starts from an empty cache, so cached summaries are measured computing their
+result. A final request without clearing the cache is reported as `warm_ms`.
+Write actions are left out, since repeating them would change the data being
+measured.
+
+Results are plain JSON. `compare` checks a run against an earlier one and
+lists the endpoints that got slower or issue more queries than the thresholds
+allow.
+"""
+import statistics
+import time
+
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .database import query_wrappers
+from .metrics import QueryTimer
+from .models import Category, Transaction
+from .rollups import month_start
+
+# name, URL (formatted with the values from `url_context`)
+ENDPOINTS = (
+    ('transactions.list', '/api/transactions/'),
+    ('transactions.list_filtered', '/api/transactions/?type=expense&date_from={month_start}'),
+    ('transactions.list_category', '/api/transactions/?category={category}'),
+    ('transactions.list_columns', '/api/transactions/?shape=columns&page_size=500'),
+    ('transactions.retrieve', '/api/transactions/{transaction}/'),
+    ('transactions.monthly_summary', '/api/transactions/monthly_summary/'),
+    ('transactions.six_month_trend', '/api/transactions/six_month_trend/'),
+    ('transactions.trend', '/api/transactions/trend/?granularity=week'),
+    ('transactions.analytics', '/api/transactions/analytics/?range=12m'),
+    ('transactions.export', '/api/transactions/export/?date_from={month_start}'),
+    ('transactions.search', '/api/transactions/search/?q=coffee'),
+    ('budget.list', '/api/budget/'),
+    ('budget.current_budget', '/api/budget/current_budget/'),
+    ('budget.budget_analysis', '/api/budget/budget_analysis/'),
+    ('budget.report_data', '/api/budget/report_data/'),
+    ('budget_periods.list', '/api/budget-periods/'),
+    ('budget_periods.current', '/api/budget-periods/current/'),
+    ('categories.list', '/api/categories/'),
+    ('categories.by_type', '/api/categories/by_type/'),
+    ('recurring.list', '/api/recurring-transactions/'),
+    ('recurring.due_transactions', '/api/recurring-transactions/due_transactions/'),
+    ('goals.list', '/api/goals/'),
+    ('goals.active_goals', '/api/goals/active_goals/'),
+    ('goals.completed_goals', '/api/goals/completed_goals/'),
+    ('dashboard', '/api/dashboard/?page_size=500'),
+)
+
+
+def url_context():
+    today = timezone.now().date()
+    latest = Transaction.objects.order_by('-date', '-id').values_list('id', flat=True).first()
+    category = Category.objects.filter(type='expense').order_by('id').values_list('id', flat=True).first()
+    return {'month_start': month_start(today), 'transaction': latest or 0, 'category': category or 0}
+
+
+def _request(client, url):
+    timer = QueryTimer()
+    start = time.perf_counter()
+    with query_wrappers([timer]):
+        response = client.get(url)
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+    return response, (time.perf_counter() - start) * 1000, timer
+
+
+def run_endpoints(repeat=5, endpoints=ENDPOINTS):
+    """{name: {url, status, queries, median_ms, min_ms, sql_ms, warm_ms}} for every endpoint"""
+    client = APIClient()
+    context = url_context()
+    results = {}
+    for name, url in endpoints:
+        url = url.format(**context)
+        timings = []
+        sql_timings = []
+        for _ in range(repeat):
+            cache.clear()
+            response, elapsed, timer = _request(client, url)
+            timings.append(elapsed)
+            sql_timings.append(timer.seconds * 1000)
+        _, warm, _ = _request(client, url)
+        results[name] = {
+            'url': url,
+            'status': response.status_code,
+            'queries': timer.count,
+            'median_ms': round(statistics.median(timings), 3),
+            'min_ms': round(min(timings), 3),
+            'sql_ms': round(statistics.median(sql_timings), 3),
+            'warm_ms': round(warm, 3),
+        }
+    return results
+
+
+def compare(baseline, current, threshold=0.2, min_delta_ms=1.0, query_threshold=0):
+    """
+    Regressions of `current` against `baseline` (both as written by the
+    benchmark command), as readable lines. An endpoint regresses when its
+    median grows by more than `threshold` (a fraction) and `min_delta_ms`, or
+    when it issues more than `query_threshold` extra queries. Sizes and
+    endpoints missing from either run are skipped.
+    """
+    regressions = []
+    for size, endpoints in current['sizes'].items():
+        base_endpoints = baseline.get('sizes', {}).get(size, {})
+        for name, result in endpoints.items():
+            base = base_endpoints.get(name)
+            if base is None:
+                continue
+            before, after = base['median_ms'], result['median_ms']
+            if after > before * (1 + threshold) and after - before > min_delta_ms:
+                regressions.append(f'{name} @ {size}: median {before:.1f} ms -> {after:.1f} ms')
+            if result['queries'] > base['queries'] + query_threshold:
+                regressions.append(f"{name} @ {size}: {base['queries']} -> {result['queries']} queries")
+    return regressions
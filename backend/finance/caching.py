@@ -0,0 +1,182 @@
+"""
+Version-keyed caching for computed summaries.
+
+Cached values are stored under a key that embeds the current version token of
+every scope they depend on. Writes bump the versions of the scopes they touch
+once their transaction commits; entries keyed by old versions are then never
+read again and simply age out of the cache.
+
+The same versions double as per-table change counters for conditional GET:
+`conditional()` derives ETag and Last-Modified validators from them, so an
+unchanged reload is answered with 304 before any query or serialization.
+
+Values may live in a per-process cache, but the version tokens are kept in
+the `versions` cache, which every process using the database shares (see
+CACHES in settings). A bump from one gunicorn worker or a management command
+is then seen by all the others.
+
+Scopes:
+    month:YYYY-MM   ledger totals of one calendar month (bumped by apply_deltas)
+    ledger          any ledger total (bumped by apply_deltas)
+    transactions    any transaction row, totals or not (bumped by apply_deltas
+                    and tracked_update)
+    categories, budgets, budget_periods, recurring, goals, category_rules
+                    the matching tables (bumped by post_save/post_delete signals)
+"""
+import functools
+import hashlib
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.utils import timezone
+from django.views.decorators.http import condition
+from rest_framework.response import Response
+
+VERSION_KEY = 'finance:version:{}'
+
+VERSIONS_CACHE = 'versions'
+
+CACHE_TIMEOUT = 60 * 60
+
+LEDGER_SCOPE = 'ledger'
+TRANSACTIONS_SCOPE = 'transactions'
+CATEGORIES_SCOPE = 'categories'
+BUDGETS_SCOPE = 'budgets'
+BUDGET_PERIODS_SCOPE = 'budget_periods'
+RECURRING_SCOPE = 'recurring'
+GOALS_SCOPE = 'goals'
+CATEGORY_RULES_SCOPE = 'category_rules'
+
+# Hits and misses per cached name, for this process
+stats = Counter()
+
+
+def month_scope(month):
+    return f'month:{month:%Y-%m}'
+
+
+def _new_version():
+    # "<unix time>:<random>": the time part feeds Last-Modified
+    return f'{time.time():.6f}:{uuid.uuid4().hex}'
+
+
+def _version_time(version):
+    try:
+        return float(version.split(':', 1)[0])
+    except ValueError:
+        return None
+
+
+def version_store():
+    """The cache holding version tokens, shared between processes when configured"""
+    return caches[VERSIONS_CACHE] if VERSIONS_CACHE in settings.CACHES else cache
+
+
+def get_versions(scopes):
+    """Current version token of each scope, creating tokens for scopes never seen before"""
+    store = version_store()
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    found = store.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # A fresh random token (rather than 0) keeps an evicted version
+            # from resurrecting entries cached under its earlier value.
+            store.add(key, _new_version(), timeout=None)
+            found[key] = store.get(key)
+    return [found[key] for key in keys]
+
+
+def bump(scopes):
+    version_store().set_many({VERSION_KEY.format(scope): _new_version() for scope in scopes}, timeout=None)
+
+
+def bump_on_commit(scopes):
+    """Bump `scopes` once the current transaction commits (immediately in autocommit mode)"""
+    scopes = list(scopes)
+    if scopes:
+        transaction.on_commit(lambda: bump(scopes))
+
+
+def _versioned_key(key, scopes):
+    versions = ':'.join(get_versions(scopes))
+    return f'finance:{key}:{hashlib.md5(versions.encode("ascii")).hexdigest()}'
+
+
+def cached(key, scopes, compute, timeout=CACHE_TIMEOUT):
+    """Return the cached value for `key` at the current versions of `scopes`, computing it on a miss"""
+    name = key.split(':', 1)[0]
+    versioned_key = _versioned_key(key, scopes)
+    value = cache.get(versioned_key)
+    if value is None:
+        stats[name, 'misses'] += 1
+        value = compute()
+        cache.set(versioned_key, value, timeout)
+    else:
+        stats[name, 'hits'] += 1
+    return value
+
+
+def cache_stats():
+    """{name: {'hits': n, 'misses': n}} for every cached name used by this process"""
+    summary = {}
+    for (name, outcome), count in stats.items():
+        summary.setdefault(name, {'hits': 0, 'misses': 0})[outcome] = count
+    return summary
+
+
+def cached_response(name, scopes):
+    """
+    Cache the data of a successful read-only DRF action. `scopes(request, today)`
+    returns the scopes the response depends on; the key covers the action
+    name, today's date and the query string. Responses carry X-Cache: hit/miss.
+    """
+    def decorator(view_method):
+        @functools.wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            today = timezone.now().date()
+            versioned_key = _versioned_key(
+                f'{name}:{today.isoformat()}:{request.query_params.urlencode()}',
+                scopes(request, today),
+            )
+            data = cache.get(versioned_key)
+            if data is not None:
+                stats[name, 'hits'] += 1
+                response = Response(data)
+                response['X-Cache'] = 'hit'
+                return response
+
+            stats[name, 'misses'] += 1
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(versioned_key, response.data, CACHE_TIMEOUT)
+            response['X-Cache'] = 'miss'
+            return response
+        return wrapper
+    return decorator
+
+
+def conditional(scopes):
+    """
+    Django `condition` decorator whose validators come from the versions of
+    `scopes(request, today)`. The ETag also covers the path, query string,
+    Accept header and today's date, since several summaries are relative to
+    today.
+    """
+    def etag(request, *args, **kwargs):
+        today = timezone.now().date()
+        versions = ':'.join(get_versions(scopes(request, today)))
+        key = f"{request.get_full_path()}|{request.META.get('HTTP_ACCEPT', '')}|{today.isoformat()}|{versions}"
+        return hashlib.md5(key.encode('utf-8')).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        times = [_version_time(version) for version in get_versions(scopes(request, timezone.now().date()))]
+        if not times or None in times:
+            return None
+        return datetime.fromtimestamp(max(times), tz=dt_timezone.utc)
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
@@ -0,0 +1,393 @@
+"""
+Automatic categorization of transactions from their description and amount.
+
+A prediction comes from the first of two sources that has one:
+
+1. Rules (CategoryRule). A keyword rule matches its words at the start of a
+   word of the description, case-insensitively; a regex rule searches the
+   description. A rule applies only to transactions of its category's type
+   and, when it has bounds, to amounts within them. The rule bounds split
+   the amounts into bands in which the same rules apply, and the rules of
+   each (type, band) are compiled into one regular expression: an anchored
+   lookahead per rule, in priority order, so a single `match` call returns
+   the first rule that matches.
+2. A multinomial naive Bayes model over description words, trained from the
+   labelled ledger (every transaction outside the catch-all "other"
+   categories). Training groups the ledger by (type, category, description)
+   in SQL, so each distinct description is tokenized once however many rows
+   share it. Predictions whose probability is below `min_confidence` are
+   dropped. A single new transaction barely moves the word counts, so the
+   model is kept until the categories change or RETRAIN_SECONDS pass,
+   rather than retrained after every write to the ledger. Each process
+   holds its trained model in memory next to the version it was trained
+   at; only the version check goes through the cache.
+
+Ledgers repeat the same few descriptions over and over, so `Categorizer`
+memoizes predictions per (type, amount band, description). `reclassify`
+walks the ledger in primary-key order and writes each batch's changes as one
+UPDATE per category and chunk of ids; `evaluate` reports precision on a
+held-out split of the labelled ledger.
+"""
+import math
+import re
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict, namedtuple
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from . import fulltext
+from .caching import CATEGORIES_SCOPE, get_versions, stats
+from .models import Category, CategoryRule, Transaction
+
+CATCH_ALL_NAME = 'other'
+
+MIN_CONFIDENCE = 0.6
+
+HOLDOUT_EVERY = 5
+
+BATCH_SIZE = 5000
+
+# Keep `pk__in` lists below SQLite's bound-parameter limit
+ID_CHUNK_SIZE = 900
+
+# Memoized predictions kept per Categorizer before starting over
+MEMO_SIZE = 100000
+
+# How long a trained model is used before picking up new labelled transactions
+RETRAIN_SECONDS = 3600
+
+# Rule regexes are matched against every description, so keep them small
+MAX_REGEX_LENGTH = 100
+
+MAX_REGEX_REPEAT = 100
+
+FLAGS = re.IGNORECASE | re.DOTALL
+
+Rule = namedtuple('Rule', 'id category_id type min_amount max_amount regex')
+
+
+def tokens(description):
+    """Casefolded words of `description`, less single characters and plain numbers"""
+    return [word.casefold() for word in fulltext.words(description) if len(word) > 1 and not word.isdigit()]
+
+
+def rule_regex(match_type, pattern):
+    if match_type == 'keyword':
+        return r'\b' + r'\s+'.join(re.escape(word) for word in pattern.split())
+    return pattern
+
+
+def _lookahead(regex, group=''):
+    return f'(?=.*?(?:{regex})){group}'
+
+
+def _repeat_error(parsed, enclosing_unbounded=None):
+    """
+    Why the parsed regex could backtrack catastrophically, or None: a repeat
+    inside another repeat where either is unbounded, as in (a+)+ or (a|b*)*,
+    or a repeat count above MAX_REGEX_REPEAT.
+    """
+    for op, av in parsed:
+        if op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, getattr(sre_parse, 'POSSESSIVE_REPEAT', None)):
+            low, high, item = av
+            unbounded = high == sre_parse.MAXREPEAT
+            if max(low, 0 if unbounded else high) > MAX_REGEX_REPEAT:
+                return f'Repeat counts above {MAX_REGEX_REPEAT} are not supported.'
+            if enclosing_unbounded is not None and (enclosing_unbounded or unbounded):
+                return 'Nested repeats such as (a+)+ are not supported.'
+            children = [(item, unbounded)]
+        elif op == sre_parse.SUBPATTERN:
+            children = [(av[-1], enclosing_unbounded)]
+        elif op == sre_parse.BRANCH:
+            children = [(branch, enclosing_unbounded) for branch in av[1]]
+        elif op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            children = [(av[1], enclosing_unbounded)]
+        elif op == getattr(sre_parse, 'ATOMIC_GROUP', None):
+            children = [(av, enclosing_unbounded)]
+        elif op == sre_parse.GROUPREF_EXISTS:
+            return 'Conditional groups are not supported.'
+        else:
+            continue
+        for child, unbounded in children:
+            error = _repeat_error(child, unbounded)
+            if error:
+                return error
+    return None
+
+
+def pattern_error(match_type, pattern):
+    """Why `pattern` cannot be used in a rule, or None"""
+    if match_type == 'keyword':
+        return None if pattern.split() else 'Enter at least one word.'
+    if len(pattern) > MAX_REGEX_LENGTH:
+        return f'Regular expressions are limited to {MAX_REGEX_LENGTH} characters.'
+    try:
+        compiled = re.compile(_lookahead(pattern), FLAGS)
+    except re.error as exc:
+        return f'Invalid regular expression: {exc}.'
+    # Rules share one compiled expression, where group names and numbers change
+    if compiled.groupindex or re.search(r'\\[1-9]|\(\?P=', pattern):
+        return 'Named groups and backreferences are not supported.'
+    return _repeat_error(sre_parse.parse(pattern, FLAGS))
+
+
+class RuleMatcher:
+    """The first matching rule, out of rules given in priority order"""
+
+    def __init__(self, rules):
+        self.rules = [
+            Rule(rule.id, rule.category_id, rule.category.type, rule.min_amount, rule.max_amount,
+                 rule_regex(rule.match_type, rule.pattern))
+            for rule in rules
+        ]
+        self.bounds = sorted({
+            bound for rule in self.rules for bound in (rule.min_amount, rule.max_amount) if bound is not None
+        })
+        self.categories = {f'r{rule.id}': rule.category_id for rule in self.rules}
+        self._compiled = {}
+
+    def band(self, amount):
+        """Key shared by every amount that the same rules apply to"""
+        if amount is None or not self.bounds:
+            return None
+        position = bisect_left(self.bounds, amount)
+        return position, position < len(self.bounds) and self.bounds[position] == amount
+
+    def _applies(self, rule, type_, amount):
+        if rule.type != type_:
+            return False
+        if amount is None:
+            return rule.min_amount is None and rule.max_amount is None
+        return ((rule.min_amount is None or rule.min_amount <= amount)
+                and (rule.max_amount is None or amount <= rule.max_amount))
+
+    def _compile(self, type_, amount):
+        applicable = [rule for rule in self.rules if self._applies(rule, type_, amount)]
+        if not applicable:
+            return None
+        return re.compile('|'.join(_lookahead(rule.regex, f'(?P<r{rule.id}>)') for rule in applicable), FLAGS)
+
+    def match(self, description, amount, type_):
+        """Category id of the first rule matching the transaction, or None"""
+        key = (type_, self.band(amount))
+        if key not in self._compiled:
+            self._compiled[key] = self._compile(type_, amount)
+        compiled = self._compiled[key]
+        found = compiled.match(description) if compiled is not None else None
+        return self.categories[found.lastgroup] if found else None
+
+
+class TokenModel:
+    """Multinomial naive Bayes over description tokens, with one set of categories per transaction type"""
+
+    def __init__(self, priors, likelihoods, unseen, size):
+        self.priors = priors            # type -> {category_id: log P(category)}
+        self.likelihoods = likelihoods  # type -> {token: {category_id: log P(token | category)}}
+        self.unseen = unseen            # type -> {category_id: log P(token | category) of a token never seen with it}
+        self.size = size                # labelled transactions trained on
+
+    @classmethod
+    def fit(cls, rows):
+        """Train from (type, category_id, description, count) rows"""
+        documents = defaultdict(Counter)
+        counts = defaultdict(lambda: defaultdict(Counter))
+        for type_, category_id, description, count in rows:
+            documents[type_][category_id] += count
+            token_counts = counts[type_][category_id]
+            for token in tokens(description):
+                token_counts[token] += count
+
+        priors, likelihoods, unseen = {}, {}, {}
+        for type_, categories in documents.items():
+            total = sum(categories.values())
+            vocabulary = len(set().union(*counts[type_].values()))
+            priors[type_] = {category_id: math.log(n / total) for category_id, n in categories.items()}
+            # Laplace smoothing
+            unseen[type_] = {
+                category_id: -math.log(sum(counts[type_][category_id].values()) + vocabulary)
+                for category_id in categories
+            }
+            table = likelihoods[type_] = {}
+            for category_id, token_counts in counts[type_].items():
+                for token, n in token_counts.items():
+                    table.setdefault(token, {})[category_id] = math.log(n + 1) + unseen[type_][category_id]
+        return cls(priors, likelihoods, unseen, sum(sum(categories.values()) for categories in documents.values()))
+
+    def predict(self, description, type_):
+        """(category_id, probability) of the likeliest category, or None when no word is known"""
+        table = self.likelihoods.get(type_)
+        if not table:
+            return None
+        known = [table[token] for token in tokens(description) if token in table]
+        if not known:
+            return None
+        unseen = self.unseen[type_]
+        scores = {
+            category_id: prior + sum(row.get(category_id, unseen[category_id]) for row in known)
+            for category_id, prior in self.priors[type_].items()
+        }
+        best = max(scores, key=scores.get)
+        return best, 1 / sum(math.exp(score - scores[best]) for score in scores.values())
+
+
+class Categorizer:
+    def __init__(self, rules=(), model=None, min_confidence=MIN_CONFIDENCE):
+        self.rules = RuleMatcher(rules)
+        self.model = model
+        self.min_confidence = min_confidence
+        self._memo = {}
+
+    def predict(self, description, amount=None, type_='expense'):
+        """(category_id, source, confidence) for one transaction, where source is rule or model; or None"""
+        key = (type_, self.rules.band(amount), description)
+        if key in self._memo:
+            return self._memo[key]
+
+        prediction = None
+        category_id = self.rules.match(description, amount, type_)
+        if category_id is not None:
+            prediction = (category_id, 'rule', 1.0)
+        elif self.model is not None:
+            found = self.model.predict(description, type_)
+            if found is not None and found[1] >= self.min_confidence:
+                prediction = (found[0], 'model', found[1])
+
+        if len(self._memo) >= MEMO_SIZE:
+            self._memo.clear()
+        self._memo[key] = prediction
+        return prediction
+
+
+def catch_all_ids():
+    return list(Category.objects.filter(name__iexact=CATCH_ALL_NAME).values_list('id', flat=True))
+
+
+def labelled(holdout_every=None, held_out=False):
+    """Transactions outside the catch-all categories; with `holdout_every`, the training or held-out part"""
+    queryset = Transaction.objects.exclude(category_id__in=catch_all_ids())
+    if holdout_every:
+        queryset = queryset.alias(bucket=F('id') % holdout_every)
+        queryset = queryset.filter(bucket=0) if held_out else queryset.exclude(bucket=0)
+    return queryset
+
+
+def train(holdout_every=None):
+    """TokenModel of the labelled ledger, less the held-out part when `holdout_every` is set"""
+    rows = (labelled(holdout_every).order_by()
+            .values_list('type', 'category_id', 'description').annotate(count=Count('id')))
+    return TokenModel.fit(rows.iterator(chunk_size=BATCH_SIZE))
+
+
+def active_rules():
+    return list(CategoryRule.objects.filter(is_active=True).select_related('category'))
+
+
+# (categories version, retrain period, TokenModel) of this process
+_model = None
+
+
+def load(min_confidence=MIN_CONFIDENCE):
+    """
+    Categorizer with the active rules and a model of the labelled ledger,
+    retrained when the categories change and every RETRAIN_SECONDS
+    """
+    global _model
+    version = (get_versions([CATEGORIES_SCOPE])[0], int(time.time() // RETRAIN_SECONDS))
+    held = _model
+    if held is not None and held[:2] == version:
+        stats['categorizer_model', 'hits'] += 1
+    else:
+        stats['categorizer_model', 'misses'] += 1
+        held = _model = (*version, train())
+    return Categorizer(active_rules(), held[2], min_confidence)
+
+
+def apply_changes(changes):
+    """Move transactions to other categories, given {category_id: [transaction ids]}"""
+    now = timezone.now()
+    with transaction.atomic():
+        for category_id, ids in changes.items():
+            for start in range(0, len(ids), ID_CHUNK_SIZE):
+                Transaction.objects.filter(pk__in=ids[start:start + ID_CHUNK_SIZE]).update(
+                    category_id=category_id, updated_at=now)
+
+
+def reclassify(categorizer, everything=False, batch_size=BATCH_SIZE, dry_run=False, progress=None):
+    """
+    Categorize the transactions in a catch-all category (or, with
+    `everything`, the whole ledger) batch by batch, and move those whose
+    prediction differs from their category. `progress` is called with the
+    running summary after every batch. Returns {scanned, changed, rule, model},
+    the last two counting changes by source.
+    """
+    queryset = Transaction.objects.order_by('id')
+    if not everything:
+        queryset = queryset.filter(category_id__in=catch_all_ids())
+    # Amounts only matter to rules with bounds, and converting them to
+    # Decimal otherwise takes half the time
+    fields = ['id', 'type', 'description', 'category_id']
+    if categorizer.rules.bounds:
+        fields.append('amount')
+    summary = {'scanned': 0, 'changed': 0, 'rule': 0, 'model': 0}
+    last_id = 0
+    while True:
+        rows = list(queryset.filter(id__gt=last_id).values_list(*fields)[:batch_size])
+        if not rows:
+            return summary
+        last_id = rows[-1][0]
+
+        changes = defaultdict(list)
+        for transaction_id, type_, description, category_id, *amount in rows:
+            prediction = categorizer.predict(description, amount[0] if amount else None, type_)
+            if prediction is not None and prediction[0] != category_id:
+                changes[prediction[0]].append(transaction_id)
+                summary[prediction[1]] += 1
+        summary['scanned'] += len(rows)
+        summary['changed'] += sum(len(ids) for ids in changes.values())
+        if changes and not dry_run:
+            apply_changes(changes)
+        if progress:
+            progress(summary)
+
+
+def evaluate(holdout_every=HOLDOUT_EVERY, min_confidence=MIN_CONFIDENCE, rules=None):
+    """
+    Precision on a held-out split: train on the labelled ledger less every
+    transaction whose id is a multiple of `holdout_every`, then categorize
+    those and compare with the categories they have. Coverage is the share of
+    held-out transactions that got a prediction at all.
+    """
+    model = train(holdout_every)
+    categorizer = Categorizer(active_rules() if rules is None else rules, model, min_confidence)
+    held_out = labelled(holdout_every, held_out=True).values_list('type', 'amount', 'description', 'category_id')
+
+    total = 0
+    sources = {source: {'predicted': 0, 'correct': 0} for source in ('rule', 'model')}
+    for type_, amount, description, category_id in held_out.iterator(chunk_size=BATCH_SIZE):
+        total += 1
+        prediction = categorizer.predict(description, amount, type_)
+        if prediction is not None:
+            sources[prediction[1]]['predicted'] += 1
+            sources[prediction[1]]['correct'] += prediction[0] == category_id
+
+    predicted = sum(source['predicted'] for source in sources.values())
+    correct = sum(source['correct'] for source in sources.values())
+    for source in sources.values():
+        source['precision'] = round(source['correct'] / source['predicted'], 4) if source['predicted'] else None
+    return {
+        'trained_on': model.size,
+        'held_out': total,
+        'predicted': predicted,
+        'correct': correct,
+        'precision': round(correct / predicted, 4) if predicted else None,
+        'coverage': round(predicted / total, 4) if total else None,
+        'sources': sources,
+    }
@@ -0,0 +1,130 @@
+"""
+SQLite database profiles and read/write routing.
+
+The `default` profile is Django's stock SQLite configuration. The
+`production` profile is tuned for one web server with several workers on one
+database file:
+
+- WAL journaling, so readers no longer wait for a writer (nor it for them),
+  with synchronous=NORMAL, which is durable across application crashes and
+  only loses the last commits on power loss.
+- A larger page cache and memory-mapped reads.
+- A busy timeout (the sqlite3 `timeout`), and write transactions that begin
+  IMMEDIATE. A deferred transaction that reads and then writes cannot wait
+  for the write lock and fails at once with "database is locked", whatever
+  the timeout is.
+- Persistent connections (CONN_MAX_AGE) with health checks.
+- A second alias, `read`, on a read-only connection to the same file.
+  `ReadWriteRouter` sends ORM reads there.
+
+Because a request's queries may run on either alias, and on the fanout
+threads (finance/fanout.py), request instrumentation installs its
+execute_wrapper through `query_wrappers`, which covers every alias and is
+carried over to the fanout threads.
+"""
+import threading
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+READ_ALIAS = 'read'
+
+# Executed on every new connection (Django's sqlite3 `init_command`)
+PRAGMAS = (
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA cache_size = -65536',  # KiB, i.e. 64 MiB
+    'PRAGMA mmap_size = 268435456',
+    'PRAGMA temp_store = MEMORY',
+)
+# journal_mode is stored in the database file and cannot be set read-only
+READ_PRAGMAS = (
+    'PRAGMA query_only = ON',
+    'PRAGMA cache_size = -65536',
+    'PRAGMA mmap_size = 268435456',
+    'PRAGMA temp_store = MEMORY',
+)
+
+BUSY_TIMEOUT_SECONDS = 20
+
+
+def sqlite_databases(path, profile='default', conn_max_age=600):
+    """DATABASES for the SQLite file at `path` under `profile`"""
+    if profile == 'default':
+        return {DEFAULT_DB_ALIAS: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': path}}
+    if profile != 'production':
+        raise ValueError(f'Unknown database profile {profile!r}')
+
+    common = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'CONN_MAX_AGE': conn_max_age,
+        'CONN_HEALTH_CHECKS': True,
+    }
+    return {
+        DEFAULT_DB_ALIAS: {
+            **common,
+            'NAME': path,
+            'OPTIONS': {
+                'init_command': '; '.join(PRAGMAS),
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': BUSY_TIMEOUT_SECONDS,
+            },
+        },
+        READ_ALIAS: {
+            **common,
+            'NAME': f'{Path(path).resolve().as_uri()}?mode=ro',
+            'OPTIONS': {
+                'init_command': '; '.join(READ_PRAGMAS),
+                'timeout': BUSY_TIMEOUT_SECONDS,
+            },
+            # Tests run against the default test database
+            'TEST': {'MIRROR': DEFAULT_DB_ALIAS},
+        },
+    }
+
+
+class ReadWriteRouter:
+    """
+    Reads go to the read-only alias, unless the default connection is inside
+    a transaction: its uncommitted writes are only visible to itself, and code
+    like the rollup upserts reads what it is about to write.
+    """
+
+    def db_for_read(self, model, **hints):
+        if READ_ALIAS not in connections.settings or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return READ_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases are the same database
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+_local = threading.local()
+
+
+def active_query_wrappers():
+    """The execute_wrappers `query_wrappers` has installed in this thread, outermost first"""
+    return getattr(_local, 'wrappers', ())
+
+
+@contextmanager
+def query_wrappers(wrappers):
+    """Install the execute_wrappers on the connection of every alias in this thread for the block"""
+    previous = active_query_wrappers()
+    _local.wrappers = previous + tuple(wrappers)
+    try:
+        with ExitStack() as stack:
+            for wrapper in wrappers:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(wrapper))
+            yield
+    finally:
+        _local.wrappers = previous
@@ -0,0 +1,50 @@
+"""
+Concurrent evaluation of the independent parts of one response.
+
+`run_concurrently` runs callables on a shared thread pool. SQLite releases the
+GIL while it executes a statement, so queries on separate connections overlap
+and the response takes about as long as its slowest part. Each pool thread has
+its own connections, opened and recycled like a request's
+(`close_old_connections`, which honours CONN_MAX_AGE), and the query
+instrumentation of the calling thread (`database.query_wrappers`).
+
+Inside a transaction on the default database the callables run one after the
+other on the calling thread instead, since another connection would not see
+the transaction's uncommitted writes (this includes every TestCase).
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
+
+from .database import active_query_wrappers, query_wrappers
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.FANOUT_WORKERS, thread_name_prefix='fanout')
+        return _executor
+
+
+def _run(function, wrappers):
+    close_old_connections()
+    try:
+        with query_wrappers(wrappers):
+            return function()
+    finally:
+        close_old_connections()
+
+
+def run_concurrently(tasks):
+    """{name: result} of the callables in the `tasks` dict; the first exception raised propagates"""
+    if len(tasks) < 2 or settings.FANOUT_WORKERS < 2 or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return {name: task() for name, task in tasks.items()}
+    wrappers = active_query_wrappers()
+    futures = {name: executor().submit(_run, task, wrappers) for name, task in tasks.items()}
+    return {name: future.result() for name, future in futures.items()}
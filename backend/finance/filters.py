@@ -0,0 +1,80 @@
+from decimal import Decimal, InvalidOperation
+
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+
+class TransactionFilterBackend(BaseFilterBackend):
+    """
+    Server-side filters for the transaction list.
+
+    Supported query parameters:
+        date_from, date_to      inclusive ISO dates (YYYY-MM-DD)
+        type                    'income' or 'expense'
+        category                category id, or a comma separated list of ids
+        budget_period           budget period id
+        min_amount, max_amount  inclusive amount bounds
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        errors = {}
+        filters = {}
+
+        for param, lookup in (('date_from', 'date__gte'), ('date_to', 'date__lte')):
+            value = params.get(param)
+            if value:
+                parsed = _parse_date(value)
+                if parsed is None:
+                    errors[param] = 'Enter a valid date in YYYY-MM-DD format.'
+                else:
+                    filters[lookup] = parsed
+
+        transaction_type = params.get('type')
+        if transaction_type:
+            if transaction_type not in ('income', 'expense'):
+                errors['type'] = "Must be 'income' or 'expense'."
+            else:
+                filters['type'] = transaction_type
+
+        category = params.get('category')
+        if category:
+            try:
+                category_ids = [int(value) for value in category.split(',') if value]
+            except ValueError:
+                errors['category'] = 'Enter a category id or a comma separated list of ids.'
+            else:
+                filters['category_id__in'] = category_ids
+
+        budget_period = params.get('budget_period')
+        if budget_period:
+            try:
+                filters['budget_period_id'] = int(budget_period)
+            except ValueError:
+                errors['budget_period'] = 'Enter a valid budget period id.'
+
+        for param, lookup in (('min_amount', 'amount__gte'), ('max_amount', 'amount__lte')):
+            value = params.get(param)
+            if value:
+                try:
+                    amount = Decimal(value)
+                except InvalidOperation:
+                    amount = None
+                if amount is None or not amount.is_finite():
+                    errors[param] = 'Enter a valid amount.'
+                else:
+                    filters[lookup] = amount
+
+        if errors:
+            raise ValidationError(errors)
+
+        return queryset.filter(**filters)
+
+
+def _parse_date(value):
+    # parse_date raises on well-formed but impossible dates such as 2024-02-30
+    try:
+        return parse_date(value)
+    except ValueError:
+        return None
@@ -0,0 +1,137 @@
+"""
+Full-text search over transaction descriptions.
+
+finance_transaction_fts is an FTS5 index over finance_transaction.description.
+It is an external content table: it holds only the index and reads the text
+back from the ledger. Triggers on finance_transaction keep it in step with
+every write, including raw SQL and the bulk ORM paths. Migration 0008 creates
+it.
+
+Django rebuilds SQLite tables for most schema changes and drops their triggers
+on the way, so `ensure_index` runs after every migrate. It recreates whatever
+is missing and reindexes when it had to.
+
+Search text is split into words, and each word matches as a prefix ("coff
+sho" finds "Coffee shop"). All words must match. Results are ordered by BM25
+rank; searches join the index through the unmanaged TransactionSearchEntry
+model. Other databases, and SQLite builds without FTS5 (probed with
+sqlite_compileoption_used), have no index and fall back to a case-insensitive
+substring match on every word.
+"""
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Q
+
+FTS_TABLE = 'finance_transaction_fts'
+
+CREATE_TABLE = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "description, content='finance_transaction', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+)
+
+TRIGGERS = {
+    f'{FTS_TABLE}_insert': (
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON finance_transaction BEGIN "
+        f"INSERT INTO {FTS_TABLE}(rowid, description) VALUES (new.id, new.description); END"
+    ),
+    f'{FTS_TABLE}_delete': (
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON finance_transaction BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description) VALUES ('delete', old.id, old.description); END"
+    ),
+    f'{FTS_TABLE}_update': (
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF description ON finance_transaction "
+        f"BEGIN INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description) VALUES ('delete', old.id, old.description); "
+        f"INSERT INTO {FTS_TABLE}(rowid, description) VALUES (new.id, new.description); END"
+    ),
+}
+
+# Words are runs of letters and digits, as for the unicode61 tokenizer
+WORD = re.compile(r'\w+')
+
+
+def words(text):
+    return WORD.findall(text or '')
+
+
+def match_expression(text):
+    """FTS5 query matching every word of `text` as a prefix, or None when it has no words"""
+    terms = words(text)
+    if not terms:
+        return None
+    # Quoted, so words like AND or NEAR are not read as operators
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def has_fts5(connection):
+    """Whether `connection` is SQLite compiled with FTS5"""
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+# {alias: has_fts5}, probed on first use
+_available = {}
+
+
+def is_available(using=DEFAULT_DB_ALIAS):
+    if using not in _available:
+        _available[using] = has_fts5(connections[using])
+    return _available[using]
+
+
+def search(queryset, text):
+    """
+    `queryset` narrowed to descriptions matching `text`, best match first
+    (then newest). The FTS match drives the query; the queryset's own filters
+    are applied to the matching rows.
+    """
+    if not is_available(queryset.db):
+        return fallback(queryset, text).order_by('-date', '-created_at', '-id')
+    return matching(queryset, text).order_by('search_entry__rank', '-date', '-id')
+
+
+def matching(queryset, text):
+    """`queryset` filtered to descriptions matching `text`, without changing its ordering"""
+    if not is_available(queryset.db):
+        return fallback(queryset, text)
+    # The index has the one column, so matching it is matching the whole table
+    return queryset.filter(search_entry__description__match=match_expression(text))
+
+
+def fallback(queryset, text):
+    condition = Q()
+    for term in words(text):
+        condition &= Q(description__icontains=term)
+    return queryset.filter(condition)
+
+
+def rebuild(using=DEFAULT_DB_ALIAS):
+    """Reindex every description from the ledger"""
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def ensure_index(using=DEFAULT_DB_ALIAS):
+    """Create the index and its triggers where missing; returns True when it reindexed"""
+    connection = connections[using]
+    if not is_available(using) or 'finance_transaction' not in connection.introspection.table_names():
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE (type = 'trigger' AND name IN ({})) OR (type = 'table' AND name = %s)"
+            .format(', '.join(['%s'] * len(TRIGGERS))),
+            [*TRIGGERS, FTS_TABLE],
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        if existing == {*TRIGGERS, FTS_TABLE}:
+            return False
+        cursor.execute(CREATE_TABLE)
+        for sql in TRIGGERS.values():
+            cursor.execute(sql)
+    # Writes made while a trigger was missing never reached the index
+    rebuild(using)
+    return True
@@ -0,0 +1,321 @@
+"""
+Streaming import of bank statements (CSV, OFX and QIF).
+
+Parsers yield one raw record at a time. `StatementImporter` validates
+records in fixed-size chunks, resolves categories from an in-memory map and
+budget periods from the period index, and writes each chunk with one
+bulk_create in its own transaction. Rows that were already imported (by a
+hash of the normalized date, amount and description, unique in the ledger)
+are skipped through ignore_conflicts.
+
+Identical rows are told apart by numbering them within each run of
+consecutive rows on one date, so besides the chunk the importer only holds
+the current run and a run count per distinct date, not the whole file.
+Statements list their rows in date order, where every date is one run; in a
+file that returns to an earlier date, the later run's hashes carry its run
+number.
+"""
+import csv
+import hashlib
+import re
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import router, transaction
+
+from . import periods
+from .models import Category, Transaction
+
+FORMATS = ('csv', 'ofx', 'qif')
+
+DATE_FORMATS = ('%Y-%m-%d', '%m/%d/%Y', '%d.%m.%Y', '%m/%d/%y')
+
+CSV_COLUMNS = {
+    'date': ('date', 'posted', 'transaction date', 'booking date'),
+    'description': ('description', 'memo', 'payee', 'name', 'details'),
+    'amount': ('amount', 'value'),
+    'type': ('type',),
+    'category': ('category',),
+}
+
+DESCRIPTION_MAX_LENGTH = Transaction._meta.get_field('description').max_length
+
+MAX_REPORTED_ERRORS = 100
+
+# Rows per INSERT; Django lowers it further to fit SQLite's bound-parameter limit
+INSERT_BATCH_SIZE = 500
+
+
+class StatementParseError(Exception):
+    """Raised when a statement cannot be parsed at all (as opposed to a bad row)"""
+
+
+def parse_csv(stream):
+    """Yield (line, record) pairs from a CSV file with a header row"""
+    reader = csv.reader(stream)
+    try:
+        header = [column.strip().lower() for column in next(reader)]
+    except StopIteration:
+        return
+
+    positions = {}
+    for field, aliases in CSV_COLUMNS.items():
+        for alias in aliases:
+            if alias in header:
+                positions[field] = header.index(alias)
+                break
+    missing = [field for field in ('date', 'description', 'amount') if field not in positions]
+    if missing:
+        raise StatementParseError(f"CSV header is missing required columns: {', '.join(missing)}")
+
+    for row in reader:
+        if not row:
+            continue
+        yield reader.line_num, {
+            field: row[position].strip() if position < len(row) else ''
+            for field, position in positions.items()
+        }
+
+
+OFX_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<\r\n]*)')
+
+
+def parse_ofx(stream):
+    """Yield (line, record) pairs from the STMTTRN blocks of an OFX (SGML or XML) file"""
+    current = None
+    for line_number, line in enumerate(stream, start=1):
+        for closing, tag, value in OFX_TAG.findall(line):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if closing and current is not None:
+                    yield current.pop('line'), current
+                    current = None
+                elif not closing:
+                    current = {'line': line_number}
+            elif current is not None and not closing:
+                value = value.strip()
+                if tag == 'DTPOSTED':
+                    current['date'] = value[:8]
+                elif tag == 'TRNAMT':
+                    current['amount'] = value
+                elif tag in ('NAME', 'MEMO', 'PAYEE') and value:
+                    current['description'] = f"{current['description']} {value}" if current.get('description') else value
+    if current is not None:
+        yield current.pop('line'), current
+
+
+def parse_qif(stream):
+    """Yield (line, record) pairs from a QIF bank register"""
+    current = {}
+    start_line = None
+    for line_number, line in enumerate(stream, start=1):
+        line = line.rstrip('\r\n')
+        if not line or line.startswith('!'):
+            continue
+        code, value = line[0], line[1:].strip()
+        if code == '^':
+            if current:
+                yield start_line, current
+            current, start_line = {}, None
+            continue
+
+        start_line = start_line or line_number
+        if code == 'D':
+            current['date'] = value.replace("'", '/').replace(' ', '')
+        elif code in ('T', 'U'):
+            current['amount'] = value.replace(',', '')
+        elif code in ('P', 'M') and value:
+            current['description'] = f"{current['description']} {value}" if current.get('description') else value
+        elif code == 'L':
+            current['category'] = value
+    if current:
+        yield start_line, current
+
+
+PARSERS = {
+    'csv': parse_csv,
+    'ofx': parse_ofx,
+    'qif': parse_qif,
+}
+
+
+def detect_format(filename):
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return extension if extension in FORMATS else None
+
+
+def import_hash(row_date, amount, description, occurrence=0, run=0):
+    """
+    Stable fingerprint of a statement row. `occurrence` separates identical
+    rows within one run of rows on a date, `run` the runs on the same date.
+    """
+    normalized = ' '.join(description.split()).casefold()
+    key = f"{row_date.isoformat()}|{amount:.2f}|{normalized}|{occurrence}"
+    if run:
+        key += f"|{run}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+class StatementImporter:
+    def __init__(self, chunk_size=5000, date_format=None, categorizer=None):
+        self.chunk_size = chunk_size
+        self.date_formats = (date_format,) if date_format else DATE_FORMATS
+        # Suggests categories for rows without one (see categorizer.py)
+        self.categorizer = categorizer
+        self.created = 0
+        self.categorized = 0
+        self.duplicates = 0
+        self.error_count = 0
+        self.errors = []
+
+        self._dates = {}
+        # date -> runs of consecutive rows on it seen so far in this file
+        self._date_runs = {}
+        self._run_date = None
+        self._run = 0
+        # (amount, normalized description) -> rows seen so far in the current run
+        self._occurrences = {}
+        self._categories = {
+            (name.casefold(), type_): category_id
+            for category_id, name, type_ in Category.objects.values_list('id', 'name', 'type')
+        }
+        self._periods = periods.get_index()
+
+    def run(self, records):
+        """Import an iterable of (line, record) pairs and return a summary dict"""
+        chunk = []
+        for line, record in records:
+            chunk.append((line, record))
+            if len(chunk) >= self.chunk_size:
+                self._import_chunk(chunk)
+                chunk = []
+        if chunk:
+            self._import_chunk(chunk)
+        return self.summary()
+
+    def summary(self):
+        return {
+            'created': self.created,
+            'duplicates': self.duplicates,
+            'categorized': self.categorized,
+            'error_count': self.error_count,
+            'errors': self.errors,
+        }
+
+    def _error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    def _import_chunk(self, chunk):
+        pending = {}
+        for line, record in chunk:
+            row = self._validate(line, record)
+            if row is not None:
+                pending[row['import_hash']] = row
+
+        if not pending:
+            return
+
+        rows = list(pending.values())
+        categorized = {row['import_hash'] for row in rows if row.pop('categorized')}
+        # Each chunk commits on its own: the calendar, the ledger rows and their rollup deltas
+        with transaction.atomic(using=router.db_for_write(Transaction)):
+            if periods.extend_calendar(max(row['date'] for row in rows)):
+                self._periods = periods.get_index()
+            period_ids = self._periods.resolve_many([row['date'] for row in rows])
+            created = Transaction.objects.bulk_create(
+                [Transaction(budget_period_id=period_id, **row) for row, period_id in zip(rows, period_ids)],
+                batch_size=INSERT_BATCH_SIZE, ignore_conflicts=True,
+            )
+
+        self.duplicates += len(rows) - len(created)
+        self.created += len(created)
+        self.categorized += sum(instance.import_hash in categorized for instance in created)
+
+    def _validate(self, line, record):
+        row_date = self._parse_date(record.get('date', ''))
+        if row_date is None:
+            self._error(line, f"Invalid date: {record.get('date', '')!r}")
+            return None
+
+        try:
+            amount = Decimal(record.get('amount', '')).quantize(Decimal('0.01'))
+        except InvalidOperation:
+            amount = None
+        if amount is None or not amount.is_finite() or amount == 0:
+            self._error(line, f"Invalid amount: {record.get('amount', '')!r}")
+            return None
+
+        description = ' '.join(record.get('description', '').split())
+        if not description:
+            self._error(line, 'Missing description')
+            return None
+
+        type_ = (record.get('type') or '').lower()
+        if type_ not in ('income', 'expense'):
+            type_ = 'expense' if amount < 0 else 'income'
+
+        prediction = None
+        if not record.get('category') and self.categorizer is not None:
+            prediction = self.categorizer.predict(description, abs(amount), type_)
+        if prediction is not None:
+            category_id = prediction[0]
+        else:
+            category_id = self._category_id(record.get('category') or 'other', type_)
+
+        run, occurrence = self._next_occurrence(row_date, amount, description)
+
+        return {
+            'type': type_,
+            'category_id': category_id,
+            'amount': abs(amount),
+            'description': description[:DESCRIPTION_MAX_LENGTH],
+            'date': row_date,
+            'import_hash': import_hash(row_date, amount, description, occurrence, run),
+            'categorized': prediction is not None,
+        }
+
+    def _next_occurrence(self, row_date, amount, description):
+        """(run, occurrence) of a row: its run of rows on `row_date`, and its number among identical rows in it"""
+        if row_date != self._run_date:
+            self._run = self._date_runs.get(row_date, -1) + 1
+            self._date_runs[row_date] = self._run
+            self._run_date = row_date
+            self._occurrences = {}
+        signature = (amount, ' '.join(description.split()).casefold())
+        occurrence = self._occurrences.get(signature, 0)
+        self._occurrences[signature] = occurrence + 1
+        return self._run, occurrence
+
+    def _parse_date(self, value):
+        if value in self._dates:
+            return self._dates[value]
+        parsed = None
+        for date_format in self.date_formats:
+            try:
+                parsed = datetime.strptime(value, date_format).date()
+                break
+            except ValueError:
+                continue
+        if parsed is None and len(value) == 8 and value.isdigit():
+            # OFX DTPOSTED (YYYYMMDD)
+            try:
+                parsed = datetime.strptime(value, '%Y%m%d').date()
+            except ValueError:
+                pass
+        self._dates[value] = parsed
+        return parsed
+
+    def _category_id(self, name, type_):
+        key = (name.casefold(), type_)
+        category_id = self._categories.get(key)
+        if category_id is None:
+            category_id = self._categories.get(('other', type_))
+        if category_id is None:
+            category, _ = Category.objects.get_or_create(
+                name='other', type=type_, user=None,
+                defaults={'is_custom': False, 'color': '#6b7280'},
+            )
+            category_id = self._categories[('other', type_)] = category.id
+        return category_id
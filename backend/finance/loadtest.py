@@ -0,0 +1,314 @@
+"""
+Load generator replaying scripted frontend sessions against a running server.
+
+Each virtual user keeps one HTTP/1.1 keep-alive connection and, like the
+frontend's ApiService, revalidates GETs with If-None-Match. It runs scenarios
+picked by weight, separated by a random think time, until the test ends.
+Requests that the frontend sends concurrently (e.g. the budget page's
+Promise.all) are sent concurrently on extra connections.
+
+The client is a minimal HTTP/1.1 implementation on asyncio streams, so the
+harness needs nothing beyond the standard library and never leaves the
+machine. Every request is recorded under a stable endpoint name with its
+latency and status; `summarize` turns the records into throughput and
+p50/p95/p99 latency per endpoint. 5xx responses, SQLite's "database is
+locked" among them, are counted as errors.
+"""
+import asyncio
+import gzip
+import json
+import math
+import random
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+ACCEPT_ENCODING = 'br, gzip' if brotli is not None else 'gzip'
+
+# Rows per page of the transaction list, as TRANSACTIONS_PAGE_SIZE in frontend/lib/api.js
+PAGE_SIZE = 50
+
+# Next pages of the list a dashboard session scrolls through
+SCROLL_PAGES = 2
+
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection, reopened when the server closes it"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=None, headers=None):
+        """(status, headers, body) of one request; retried once on a stale connection"""
+        for attempt in range(2):
+            if self.writer is None:
+                self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+            try:
+                return await self._exchange(method, path, body, headers or {})
+            except (ConnectionError, asyncio.IncompleteReadError):
+                await self.close()
+                if attempt:
+                    raise
+
+    async def _exchange(self, method, path, body, headers):
+        lines = [
+            f'{method} {path} HTTP/1.1',
+            f'Host: {self.host}:{self.port}',
+            'Accept: application/json',
+            f'Accept-Encoding: {ACCEPT_ENCODING}',
+        ]
+        lines += [f'{name}: {value}' for name, value in headers.items()]
+        if body is not None:
+            lines += ['Content-Type: application/json', f'Content-Length: {len(body)}']
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + (body or b''))
+        await self.writer.drain()
+
+        status_line = await self.reader.readuntil(b'\r\n')
+        if not status_line.strip():
+            raise ConnectionResetError('empty response')
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = await self.reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+
+        if status in (204, 304) or method == 'HEAD':
+            content = b''
+        elif response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            content = await self._read_chunked()
+        elif 'content-length' in response_headers:
+            content = await self.reader.readexactly(int(response_headers['content-length']))
+        else:
+            content = await self.reader.read()
+            await self.close()
+
+        if response_headers.get('connection', '').lower() == 'close' and self.writer is not None:
+            await self.close()
+
+        encoding = response_headers.get('content-encoding')
+        if encoding == 'gzip':
+            content = gzip.decompress(content)
+        elif encoding == 'br':
+            content = brotli.decompress(content)
+        return status, response_headers, content
+
+    async def _read_chunked(self):
+        chunks = []
+        while True:
+            size = int((await self.reader.readuntil(b'\r\n')).split(b';')[0], 16)
+            if size == 0:
+                await self.reader.readuntil(b'\r\n')
+                return b''.join(chunks)
+            chunks.append(await self.reader.readexactly(size))
+            await self.reader.readexactly(2)
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)  # endpoint -> [(seconds, status)]
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def add(self, endpoint, seconds, status):
+        self.samples[endpoint].append((seconds, status))
+
+
+class Session:
+    """One virtual user: its connections, ETag cache and what it has learned about the data"""
+
+    def __init__(self, host, port, recorder, scroll_pages, rng):
+        self.host = host
+        self.port = port
+        self.recorder = recorder
+        self.scroll_pages = scroll_pages
+        self.rng = rng
+        self.connections = [Connection(host, port)]
+        self.etags = {}
+        self.category_ids = []
+
+    async def close(self):
+        for connection in self.connections:
+            await connection.close()
+
+    async def call(self, endpoint, method, path, data=None, connection=None):
+        """Send one request, record it under `endpoint`, and return its decoded JSON (or None)"""
+        connection = connection or self.connections[0]
+        headers = {}
+        if method == 'GET' and path in self.etags:
+            headers['If-None-Match'] = self.etags[path][0]
+        body = json.dumps(data).encode('utf-8') if data is not None else None
+
+        start = time.perf_counter()
+        try:
+            status, response_headers, content = await connection.request(method, path, body, headers)
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            self.recorder.add(endpoint, time.perf_counter() - start, 'error')
+            return None
+        self.recorder.add(endpoint, time.perf_counter() - start, status)
+
+        if status == 304 and path in self.etags:
+            return self.etags[path][1]
+        if status >= 400 or not content or 'json' not in response_headers.get('content-type', ''):
+            return None
+        payload = json.loads(content)
+        if method == 'GET' and 'etag' in response_headers:
+            self.etags[path] = (response_headers['etag'], payload)
+        return payload
+
+    async def gather(self, *calls):
+        """Run (endpoint, method, path) calls concurrently, one connection each"""
+        while len(self.connections) < len(calls):
+            self.connections.append(Connection(self.host, self.port))
+        return await asyncio.gather(*(
+            self.call(*call, connection=connection) for call, connection in zip(calls, self.connections)
+        ))
+
+    async def scroll(self, page):
+        """Follow the list's cursor from `page` for up to `scroll_pages` pages, as scrolling the list does"""
+        for _ in range(self.scroll_pages):
+            if not page or not page.get('next'):
+                return
+            next_url = urlsplit(page['next'])
+            page = await self.call('transactions.list', 'GET', f'{next_url.path}?{next_url.query}')
+
+
+async def dashboard(session):
+    """app/page.js on load: the dashboard bootstrap with the first page of the list, then a little scrolling"""
+    data = await session.call('dashboard', 'GET', f'/api/dashboard/?page_size={PAGE_SIZE}')
+    if not data:
+        return
+    session.category_ids = [category['id'] for category in data['categories'] if category.get('type') == 'expense']
+    await session.scroll(data['transactions'])
+
+
+async def add_transaction(session):
+    """Add an expense, reload the first page of the ledger, then delete it again"""
+    if not session.category_ids:
+        await dashboard(session)
+    if not session.category_ids:
+        return
+    created = await session.call('transactions.create', 'POST', '/api/transactions/', {
+        'type': 'expense',
+        'category': session.rng.choice(session.category_ids),
+        'amount': f'{session.rng.uniform(1, 80):.2f}',
+        'description': 'Load test',
+        'date': time.strftime('%Y-%m-%d'),
+    })
+    await session.call('transactions.list', 'GET', f'/api/transactions/?page_size={PAGE_SIZE}')
+    if created and 'id' in created:
+        await session.call('transactions.delete', 'DELETE', f"/api/transactions/{created['id']}/")
+
+
+async def analytics(session):
+    """The Analytics page"""
+    await session.gather(
+        ('transactions.analytics', 'GET', '/api/transactions/analytics/?range=3m'),
+        ('budget.current_budget', 'GET', '/api/budget/current_budget/'),
+    )
+
+
+async def budget(session):
+    """The budget management page"""
+    await session.gather(
+        ('budget.current_budget', 'GET', '/api/budget/current_budget/'),
+        ('budget_periods.list', 'GET', '/api/budget-periods/'),
+        ('budget_periods.current', 'GET', '/api/budget-periods/current/'),
+        ('budget.budget_analysis', 'GET', '/api/budget/budget_analysis/'),
+    )
+
+
+async def report(session):
+    """Generating a PDF report from the Analytics page"""
+    await session.call('budget.report_data', 'GET', '/api/budget/report_data/?months_back=3')
+
+
+# name -> (scenario, relative weight)
+SCENARIOS = {
+    'dashboard': (dashboard, 5),
+    'add_transaction': (add_transaction, 2),
+    'analytics': (analytics, 2),
+    'budget': (budget, 1),
+    'report': (report, 1),
+}
+
+
+async def virtual_user(base_url, recorder, deadline, scenarios, think_time, scroll_pages, rng):
+    parts = urlsplit(base_url)
+    session = Session(parts.hostname, parts.port or 80, recorder, scroll_pages, rng)
+    names = list(scenarios)
+    weights = [SCENARIOS[name][1] for name in names]
+    try:
+        # Stagger the start so users do not arrive in lockstep
+        await asyncio.sleep(rng.uniform(0, think_time))
+        while time.perf_counter() < deadline:
+            scenario = rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            await SCENARIOS[scenario][0](session)
+            recorder.add(f'scenario:{scenario}', time.perf_counter() - start, 200)
+            await asyncio.sleep(rng.uniform(0, 2 * think_time))
+    finally:
+        await session.close()
+
+
+async def run(base_url, users=20, duration=30.0, scenarios=None, think_time=0.5, scroll_pages=SCROLL_PAGES, seed=0):
+    """Drive `users` virtual users for `duration` seconds; returns the Recorder"""
+    recorder = Recorder()
+    deadline = time.perf_counter() + duration
+    rng = random.Random(seed)
+    await asyncio.gather(*(
+        virtual_user(base_url, recorder, deadline, scenarios or list(SCENARIOS), think_time,
+                     scroll_pages, random.Random(rng.random()))
+        for _ in range(users)
+    ))
+    recorder.finished = time.perf_counter()
+    return recorder
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(fraction * len(sorted_values)), 1)
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(recorder):
+    """{endpoint: {requests, errors, statuses, throughput, p50_ms, p95_ms, p99_ms, max_ms}}"""
+    elapsed = (recorder.finished or time.perf_counter()) - recorder.started
+    results = {}
+    for endpoint, samples in sorted(recorder.samples.items()):
+        latencies = sorted(seconds * 1000 for seconds, _ in samples)
+        statuses = defaultdict(int)
+        for _, status in samples:
+            statuses[str(status)] += 1
+        errors = sum(count for status, count in statuses.items() if status == 'error' or int(status) >= 500)
+        results[endpoint] = {
+            'requests': len(samples),
+            'errors': errors,
+            'statuses': dict(statuses),
+            'throughput': round(len(samples) / elapsed, 2) if elapsed else None,
+            'p50_ms': round(percentile(latencies, 0.50), 2),
+            'p95_ms': round(percentile(latencies, 0.95), 2),
+            'p99_ms': round(percentile(latencies, 0.99), 2),
+            'max_ms': round(latencies[-1], 2),
+        }
+    return {'duration_seconds': round(elapsed, 2), 'endpoints': results}
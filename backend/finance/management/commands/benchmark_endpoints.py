@@ -0,0 +1,93 @@
+import json
+import platform
+import subprocess
+from pathlib import Path
+
+import django
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (setup_databases, setup_test_environment, teardown_databases,
+                               teardown_test_environment)
+from django.utils import timezone
+
+from finance.benchmarks import compare, run_endpoints
+from finance.synthetic import seed
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Time every read endpoint against synthetic ledgers of several sizes, in a throwaway test '
+        'database, and write the results as JSON (optionally failing on regressions against a baseline)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,100000', help='Comma separated ledger sizes')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per endpoint; the median is kept')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the synthetic data')
+        parser.add_argument('--output', default='benchmark-results.json', help='Where to write the results')
+        parser.add_argument('--compare', help='Results of an earlier run to check for regressions')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Allowed growth of the median, as a fraction (default 0.2)')
+        parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                            help='Slowdowns smaller than this are never regressions')
+        parser.add_argument('--query-threshold', type=int, default=0, help='Allowed extra queries per endpoint')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',') if size]
+        except ValueError:
+            raise CommandError('--sizes must be a comma separated list of integers')
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be at least 1')
+        baseline = None
+        if options['compare']:
+            baseline = json.loads(Path(options['compare']).read_text())
+
+        results = {
+            'created_at': timezone.now().isoformat(),
+            'commit': _commit(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'seed': options['seed'],
+            'repeat': options['repeat'],
+            'sizes': {},
+        }
+
+        # Never touch the configured databases: seed throwaway test databases instead, set up
+        # for every alias as the test runner does (the read alias mirrors the default one)
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False, serialized_aliases=set())
+        try:
+            for size in sizes:
+                call_command('flush', interactive=False, verbosity=0)
+                self.stdout.write(f'Seeding {size} transactions...')
+                seed(size, seed=options['seed'])
+                results['sizes'][str(size)] = endpoints = run_endpoints(options['repeat'])
+                for name, result in endpoints.items():
+                    self.stdout.write(
+                        f"  {name:<32} {result['median_ms']:9.2f} ms  {result['queries']:3d} queries  "
+                        f"warm {result['warm_ms']:7.2f} ms  [{result['status']}]"
+                    )
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        Path(options['output']).write_text(json.dumps(results, indent=2))
+        self.stdout.write(f"Results written to {options['output']}")
+
+        if baseline is not None:
+            regressions = compare(
+                baseline, results, options['threshold'], options['min_delta_ms'], options['query_threshold'],
+            )
+            if regressions:
+                raise CommandError('Regressions against ' + options['compare'] + ':\n  ' + '\n  '.join(regressions))
+            self.stdout.write('No regressions against ' + options['compare'])
@@ -0,0 +1,69 @@
+import gzip
+import time
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from finance.middleware import BROTLI_QUALITY, GZIP_LEVEL, brotli
+from finance.models import BudgetPeriod, Category, Transaction
+from finance.renderers import ORJSONRenderer
+from finance.serializers import TransactionSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compare render time and bytes on the wire for a synthetic transaction list'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50000, help='Number of transactions in the list')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement; the fastest is reported')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        repeat = max(options['repeat'], 1)
+
+        # Unsaved instances: this measures rendering and compression, not the database
+        categories = [
+            Category(id=index + 1, name=f'category {index}', type='expense', color='#6b7280')
+            for index in range(12)
+        ]
+        period = BudgetPeriod(id=1, name='Monthly Budget - January 2024')
+        created_at = datetime(2024, 1, 1, 9, 30, 15, 123456, tzinfo=timezone.utc)
+        transactions = [
+            Transaction(
+                id=index + 1, type='expense', category=categories[index % len(categories)],
+                amount=Decimal(index % 10000) / 100, description=f'Card payment #{index}',
+                date=date(2024, 1, 1) + timedelta(days=index % 365),
+                budget_period=period, created_at=created_at,
+            )
+            for index in range(rows)
+        ]
+
+        def best(function):
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                result = function()
+                timings.append(time.perf_counter() - start)
+            return min(timings), result
+
+        serialize_time, data = best(lambda: TransactionSerializer(transactions, many=True).data)
+        self.stdout.write(f'{rows} transactions, serializer: {serialize_time * 1000:.0f} ms')
+
+        payloads = {}
+        for name, renderer in (('JSONRenderer', JSONRenderer()), ('ORJSONRenderer', ORJSONRenderer())):
+            render_time, payloads[name] = best(lambda: renderer.render(data))
+            self.stdout.write(f'  {name:<16} render {render_time * 1000:7.1f} ms  {len(payloads[name]):>10,} bytes')
+
+        body = payloads['ORJSONRenderer']
+        encoders = [('gzip', lambda: gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0))]
+        if brotli is not None:
+            encoders.append(('br', lambda: brotli.compress(body, quality=BROTLI_QUALITY)))
+        for name, encode in encoders:
+            encode_time, encoded = best(encode)
+            self.stdout.write(
+                f'  {name:<16} encode {encode_time * 1000:7.1f} ms  {len(encoded):>10,} bytes '
+                f'({len(encoded) / len(body):.1%} of raw)'
+            )
+
@@ -0,0 +1,67 @@
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+
+from finance.models import Category
+from finance.periods import generate_calendar
+
+# name, type, color, icon of the categories a new installation starts with
+DEFAULT_CATEGORIES = (
+    ('salary', 'income', '#10b981', '💼'),
+    ('freelance', 'income', '#3b82f6', '💻'),
+    ('investments', 'income', '#8b5cf6', '📈'),
+    ('gifts', 'income', '#ec4899', '🎁'),
+    ('Dividends', 'income', '#ec4899', '💰'),
+    ('food', 'expense', '#ef4444', '🍕'),
+    ('transportation', 'expense', '#f97316', '🚗'),
+    ('entertainment', 'expense', '#f59e0b', '🎬'),
+    ('shopping', 'expense', '#84cc16', '🛍️'),
+    ('healthcare', 'expense', '#06b6d4', '🏥'),
+    ('education', 'expense', '#8b5cf6', '📚'),
+    ('travel', 'expense', '#ec4899', '✈️'),
+    ('utilities', 'expense', '#f59e0b', '💡'),
+    ('other', 'expense', '#6b7280', '📦'),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Prepare the database for serving in one process: apply pending migrations, seed the default '
+        'categories into an empty installation, create the budget period calendar and collect static files'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skip-static', action='store_true', help='Do not run collectstatic')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        verbosity = options['verbosity']
+
+        connection = connections[DEFAULT_DB_ALIAS]
+        executor = MigrationExecutor(connection)
+        plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+        if plan:
+            self.stdout.write(f'Applying {len(plan)} migrations...')
+            call_command('migrate', interactive=False, verbosity=max(verbosity - 1, 0))
+        else:
+            self.stdout.write('No migrations to apply')
+
+        # Only a new installation gets the defaults, so deleted ones stay deleted;
+        # the unique constraint makes two containers booting at once harmless
+        if not Category.objects.exists():
+            Category.objects.bulk_create([
+                Category(name=name, type=type_, color=color, icon=icon, is_custom=False)
+                for name, type_, color, icon in DEFAULT_CATEGORIES
+            ], ignore_conflicts=True)
+            self.stdout.write(f'Created {len(DEFAULT_CATEGORIES)} default categories')
+
+        created = generate_calendar('monthly')
+        self.stdout.write(f'Created {created} monthly budget periods')
+
+        if not options['skip_static']:
+            call_command('collectstatic', interactive=False, verbosity=0)
+
+        self.stdout.write(f'Bootstrap finished in {(time.perf_counter() - started) * 1000:.0f} ms')
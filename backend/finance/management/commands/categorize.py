@@ -0,0 +1,64 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from finance import categorizer
+
+
+class Command(BaseCommand):
+    help = ('Categorize uncategorized transactions (those in an "other" category) from the category rules and '
+            'the words of categorized ones, after reporting precision on a held-out split')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', dest='everything',
+                            help='Reclassify every transaction, not only uncategorized ones')
+        parser.add_argument('--min-confidence', type=float, default=categorizer.MIN_CONFIDENCE,
+                            help='Probability a suggestion from description words needs to be applied')
+        parser.add_argument('--holdout-every', type=int, default=categorizer.HOLDOUT_EVERY,
+                            help='Hold out every Nth labelled transaction (by id) for the precision report; '
+                                 '0 skips the report')
+        parser.add_argument('--batch-size', type=int, default=categorizer.BATCH_SIZE,
+                            help='Transactions read and updated per batch')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would change without writing')
+        parser.add_argument('--evaluate-only', action='store_true', help='Only report precision')
+        parser.add_argument('--output', help='Also write the report as JSON to this file')
+
+    def handle(self, *args, **options):
+        if not 0 <= options['min_confidence'] <= 1:
+            raise CommandError('--min-confidence must be between 0 and 1')
+        if options['holdout_every'] == 1 or options['holdout_every'] < 0 or options['batch_size'] < 1:
+            raise CommandError('--holdout-every must be 0 or at least 2, and --batch-size at least 1')
+
+        report = {}
+        if options['holdout_every']:
+            started = time.perf_counter()
+            evaluation = report['evaluation'] = categorizer.evaluate(
+                options['holdout_every'], options['min_confidence'])
+            precision = evaluation['precision']
+            self.stdout.write(
+                f"Held-out precision {'n/a' if precision is None else f'{precision:.1%}'} "
+                f"on {evaluation['predicted']} of {evaluation['held_out']} held-out transactions "
+                f"(trained on {evaluation['trained_on']}, {time.perf_counter() - started:.1f}s)"
+            )
+            for source, counts in evaluation['sources'].items():
+                if counts['predicted']:
+                    self.stdout.write(f"  {source}: {counts['correct']}/{counts['predicted']} correct")
+
+        if not options['evaluate_only']:
+            started = time.perf_counter()
+            summary = report['reclassify'] = categorizer.reclassify(
+                categorizer.Categorizer(categorizer.active_rules(), categorizer.train(), options['min_confidence']),
+                everything=options['everything'], batch_size=options['batch_size'], dry_run=options['dry_run'],
+            )
+            elapsed = time.perf_counter() - started
+            summary['seconds'] = round(elapsed, 2)
+            self.stdout.write(
+                f"{'Would change' if options['dry_run'] else 'Changed'} {summary['changed']} of "
+                f"{summary['scanned']} transactions ({summary['rule']} by rule, {summary['model']} by model) "
+                f"in {elapsed:.1f}s ({summary['scanned'] / elapsed if elapsed else 0:,.0f} rows/s)"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from finance.periods import PERIOD_MONTHS, generate_calendar
+
+
+class Command(BaseCommand):
+    help = 'Create the shared budget periods for the current period and the next N (safe to run repeatedly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--type', default='monthly', choices=sorted(PERIOD_MONTHS), help='Period type')
+        parser.add_argument('--ahead', type=int, default=12, help='Number of periods to create after the current one')
+        parser.add_argument(
+            '--start',
+            help='Start from the period containing this date (YYYY-MM-DD). Defaults to today.',
+        )
+
+    def handle(self, *args, **options):
+        start = None
+        if options['start']:
+            start = parse_date(options['start'])
+            if start is None:
+                raise CommandError('--start must be in YYYY-MM-DD format')
+        if options['ahead'] < 0:
+            raise CommandError('--ahead must not be negative')
+
+        created = generate_calendar(options['type'], options['ahead'], start)
+        self.stdout.write(f"Created {created} {options['type']} budget periods")
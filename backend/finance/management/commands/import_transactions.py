@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from finance import categorizer
+from finance.importers import FORMATS, PARSERS, StatementImporter, StatementParseError, detect_format
+
+
+class Command(BaseCommand):
+    help = 'Stream a CSV, OFX or QIF bank statement into the ledger, skipping rows imported before'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Statement file to import')
+        parser.add_argument('--format', choices=FORMATS, help='Statement format (defaults to the file extension)')
+        parser.add_argument('--date-format', help='strptime format for dates, e.g. %%d/%%m/%%Y')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows validated and committed per batch')
+        parser.add_argument('--categorize', action='store_true',
+                            help='Suggest categories for rows without one from the category rules and the ledger')
+
+    def handle(self, *args, **options):
+        statement_format = options['format'] or detect_format(options['path'])
+        if statement_format is None:
+            raise CommandError('Cannot tell the statement format from the file name; pass --format')
+
+        importer = StatementImporter(
+            chunk_size=options['chunk_size'], date_format=options['date_format'],
+            categorizer=categorizer.load() if options['categorize'] else None,
+        )
+        started = time.perf_counter()
+        try:
+            with open(options['path'], encoding='utf-8-sig', errors='replace', newline='') as stream:
+                result = importer.run(PARSERS[statement_format](stream))
+        except OSError as exc:
+            raise CommandError(str(exc))
+        except StatementParseError as exc:
+            raise CommandError(str(exc))
+        elapsed = time.perf_counter() - started
+
+        for error in result['errors']:
+            self.stderr.write(f"line {error['line']}: {error['error']}")
+        self.stdout.write(
+            f"Imported {result['created']} transactions in {elapsed:.1f}s "
+            f"({result['duplicates']} duplicates skipped, {result['error_count']} invalid rows, "
+            f"{result['categorized']} categorized automatically)"
+        )
@@ -0,0 +1,109 @@
+import asyncio
+import importlib.util
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from urllib.error import URLError
+from urllib.request import urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from finance.loadtest import SCENARIOS, SCROLL_PAGES, run, summarize
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay concurrent dashboard sessions (load, add a transaction, analytics, budget, report) against '
+        'a server and report throughput and p50/p95/p99 latency per endpoint'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help='Server to load; by default one is started on a free local port')
+        parser.add_argument('--workers', type=int, default=4, help='Worker processes of the started server')
+        parser.add_argument('--users', type=int, default=20, help='Concurrent virtual users')
+        parser.add_argument('--duration', type=float, default=30.0, help='Seconds to run')
+        parser.add_argument('--think-time', type=float, default=0.5,
+                            help='Mean pause between a user\'s scenarios, in seconds')
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                            help=f"Comma separated subset of: {', '.join(SCENARIOS)}")
+        parser.add_argument('--scroll-pages', type=int, default=SCROLL_PAGES,
+                            help='Next pages of the transaction list a dashboard session scrolls through '
+                                 f'(default {SCROLL_PAGES})')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the users\' choices')
+        parser.add_argument('--output', help='Also write the results as JSON to this file')
+
+    def handle(self, *args, **options):
+        scenarios = [name for name in options['scenarios'].split(',') if name]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown or not scenarios:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown)) or '(none)'}")
+        if options['users'] < 1 or options['duration'] <= 0:
+            raise CommandError('--users and --duration must be positive')
+        if options['scroll_pages'] < 0:
+            raise CommandError('--scroll-pages cannot be negative')
+
+        server = None
+        url = options['url']
+        if url is None:
+            url, server = self.start_server(options['workers'])
+        try:
+            self.stdout.write(
+                f"Running {options['users']} users for {options['duration']:g}s against {url} "
+                f"({', '.join(scenarios)})"
+            )
+            recorder = asyncio.run(run(
+                url.rstrip('/'), options['users'], options['duration'], scenarios,
+                options['think_time'], options['scroll_pages'], options['seed'],
+            ))
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=10)
+
+        results = summarize(recorder)
+        results.update({'url': url, 'users': options['users'], 'scenarios': scenarios})
+        self.stdout.write(f"{'endpoint':<34} {'reqs':>6} {'err':>4} {'req/s':>7} "
+                          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for name, result in results['endpoints'].items():
+            self.stdout.write(
+                f"{name:<34} {result['requests']:6d} {result['errors']:4d} {result['throughput']:7.1f} "
+                f"{result['p50_ms']:8.1f} {result['p95_ms']:8.1f} {result['p99_ms']:8.1f}"
+            )
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(results, indent=2))
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def start_server(self, workers):
+        """Start the app on a free port, with gunicorn when it is installed; returns (url, process)"""
+        port = _free_port()
+        if importlib.util.find_spec('gunicorn') is not None:
+            command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'finance_tracker.wsgi:application',
+                       '--bind', f'127.0.0.1:{port}', '--workers', str(workers), '--log-level', 'warning']
+        else:
+            self.stderr.write('gunicorn is not installed; falling back to the threaded development server')
+            command = [sys.executable, 'manage.py', 'runserver', '--noreload', f'127.0.0.1:{port}']
+        server = subprocess.Popen(command, cwd=settings.BASE_DIR, env=os.environ.copy(),
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        url = f'http://127.0.0.1:{port}'
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'The server exited with status {server.returncode}')
+            try:
+                urlopen(f'{url}/api/categories/', timeout=2).close()
+                return url, server
+            except (URLError, OSError):
+                time.sleep(0.2)
+        server.terminate()
+        raise CommandError('The server did not start within 30 seconds')
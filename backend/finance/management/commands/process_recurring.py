@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from finance.periods import generate_calendar
+from finance.recurring import process_due
+
+
+class Command(BaseCommand):
+    help = ('Generate all due occurrences of active recurring transactions and keep the budget calendar '
+            'a year ahead (safe to run from cron)')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            help='Process occurrences due on or before this date (YYYY-MM-DD). Defaults to today.',
+        )
+
+    def handle(self, *args, **options):
+        today = timezone.now().date()
+        if options['date']:
+            today = parse_date(options['date'])
+            if today is None:
+                raise CommandError('--date must be in YYYY-MM-DD format')
+
+        # Long-running containers are not rebooted often, so the calendar rolls forward here
+        created = generate_calendar('monthly', start=today)
+        if created:
+            self.stdout.write(f'Created {created} monthly budget periods')
+
+        result = process_due(today)
+        self.stdout.write(
+            f"Processed {result['rules_processed']} rules: "
+            f"created {result['transactions_created']} transactions, "
+            f"deactivated {result['rules_deactivated']} rules"
+        )
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from finance import rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the monthly rollup table from the transaction ledger and verify it'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only verify the rollup table against the ledger, without rebuilding it',
+        )
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            written = rollups.rebuild()
+            self.stdout.write(f'Rebuilt {written} rollup rows')
+
+        mismatches = rollups.verify()
+        for (month, type_, category_id, budget_period_id), expected, actual in mismatches[:20]:
+            self.stderr.write(
+                f'{month:%Y-%m} {type_} category={category_id} period={budget_period_id}: '
+                f'expected {expected}, found {actual}'
+            )
+        if mismatches:
+            raise CommandError(f'{len(mismatches)} rollup rows do not match the ledger')
+
+        self.stdout.write(self.style.SUCCESS('Rollup table matches the ledger'))
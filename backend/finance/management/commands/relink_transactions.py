@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from finance.periods import relink_transactions
+
+
+class Command(BaseCommand):
+    help = 'Link every transaction to the active budget period covering its date'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', help='Only relink transactions on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--date-to', help='Only relink transactions on or before this date (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        bounds = []
+        for option in ('date_from', 'date_to'):
+            value = options[option]
+            if value and parse_date(value) is None:
+                raise CommandError(f"--{option.replace('_', '-')} must be in YYYY-MM-DD format")
+            bounds.append(parse_date(value) if value else None)
+
+        changed = relink_transactions(*bounds)
+        self.stdout.write(f'Relinked {changed} transactions')
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from finance.synthetic import seed
+
+
+class Command(BaseCommand):
+    help = 'Generate a deterministic synthetic ledger (users, categories, periods, recurring rules, transactions)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=10000, help='Number of transactions to create')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same data')
+        parser.add_argument('--users', type=int, default=3, help='Number of synthetic users')
+        parser.add_argument('--months', type=int, default=24, help='Number of months the ledger spans')
+        parser.add_argument('--end', help='Last day of the ledger (YYYY-MM-DD). Defaults to today.')
+
+    def handle(self, *args, **options):
+        end = None
+        if options['end']:
+            end = parse_date(options['end'])
+            if end is None:
+                raise CommandError('--end must be in YYYY-MM-DD format')
+        if options['size'] < 0 or options['users'] < 1 or options['months'] < 1:
+            raise CommandError('--size must not be negative, --users and --months must be at least 1')
+
+        step = max(options['size'] // 10, 1)
+
+        def progress(count):
+            if count % step < 5000:
+                self.stdout.write(f'  {count} transactions')
+
+        created = seed(
+            options['size'], seed=options['seed'], users=options['users'],
+            end=end, months=options['months'], progress=progress,
+        )
+        self.stdout.write(f'Created {created} transactions')
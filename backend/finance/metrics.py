@@ -0,0 +1,189 @@
+"""
+Per-endpoint request metrics: request count, a latency histogram, and the
+number and total time of SQL queries, keyed by the resolved view and action
+(e.g. TransactionViewSet.monthly_summary).
+
+Queries are timed through an execute_wrapper on every database alias, also in
+the fanout threads (`database.query_wrappers`), which costs one extra Python
+call per statement; everything else is a handful of dict and list
+updates per request under a lock, so the middleware can stay on permanently.
+
+Metrics are kept in process memory, so with several worker processes each
+reports its own totals (as Prometheus expects from a per-process target).
+SQL run while a streaming response is being consumed (the export) happens
+after the middleware returns and is not counted.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+from rest_framework.renderers import BaseRenderer
+
+from .caching import cache_stats
+from .database import query_wrappers
+
+# Upper bounds of the latency buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+_endpoints = {}
+
+
+class EndpointMetrics:
+    __slots__ = ('requests', 'errors', 'buckets', 'latency_seconds', 'queries', 'query_seconds')
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        # One count per bucket plus the +Inf overflow, not cumulative
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_seconds = 0.0
+        self.queries = 0
+        self.query_seconds = 0.0
+
+
+class QueryTimer:
+    """execute_wrapper that counts and times the statements of one request, from any thread"""
+    __slots__ = ('count', 'seconds', 'lock')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.seconds += elapsed
+                self.count += 1
+
+
+def endpoint_for(request):
+    """(view, action) label of a request: the viewset action for DRF viewsets, else the URL name"""
+    method = request.method.lower()
+    match = request.resolver_match
+    if match is None:
+        return 'unmatched', method
+    actions = getattr(match.func, 'actions', None)
+    if actions:
+        return match.func.cls.__name__, actions.get(method, method)
+    return match.view_name or match._func_path, method
+
+
+def record(endpoint, status_code, seconds, timer):
+    with _lock:
+        metrics = _endpoints.get(endpoint)
+        if metrics is None:
+            metrics = _endpoints[endpoint] = EndpointMetrics()
+        metrics.requests += 1
+        if status_code >= 500:
+            metrics.errors += 1
+        metrics.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        metrics.latency_seconds += seconds
+        metrics.queries += timer.count
+        metrics.query_seconds += timer.seconds
+
+
+def reset():
+    with _lock:
+        _endpoints.clear()
+
+
+def snapshot():
+    """Current metrics of this process as plain data, for JSON or the Prometheus renderer"""
+    with _lock:
+        endpoints = [
+            (view, action, metrics.requests, metrics.errors, list(metrics.buckets),
+             metrics.latency_seconds, metrics.queries, metrics.query_seconds)
+            for (view, action), metrics in sorted(_endpoints.items())
+        ]
+
+    data = []
+    for view, action, requests, errors, buckets, latency_seconds, queries, query_seconds in endpoints:
+        cumulative = 0
+        histogram = {}
+        for bound, count in zip((*LATENCY_BUCKETS, '+Inf'), buckets):
+            cumulative += count
+            histogram[str(bound)] = cumulative
+        data.append({
+            'view': view,
+            'action': action,
+            'requests': requests,
+            'errors': errors,
+            'latency_seconds': {'sum': round(latency_seconds, 6), 'buckets': histogram},
+            'sql_queries': queries,
+            'sql_seconds': round(query_seconds, 6),
+        })
+    return {'endpoints': data, 'cache': cache_stats()}
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        start = time.perf_counter()
+        with query_wrappers([timer]):
+            response = self.get_response(request)
+        record(endpoint_for(request), response.status_code, time.perf_counter() - start, timer)
+        return response
+
+
+def _label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_label_value(value)}"' for name, value in labels.items()) + '}'
+
+
+class PrometheusRenderer(BaseRenderer):
+    """Renders a `snapshot()` in the Prometheus text exposition format"""
+    media_type = 'text/plain'
+    format = 'prometheus'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.extend(samples)
+
+        endpoints = [(endpoint, _labels(view=endpoint['view'], action=endpoint['action']))
+                     for endpoint in data['endpoints']]
+        family('finance_http_requests_total', 'counter', 'Requests served per view and action.', [
+            f'finance_http_requests_total{labels} {endpoint["requests"]}' for endpoint, labels in endpoints
+        ])
+        family('finance_http_errors_total', 'counter', 'Requests answered with a 5xx status.', [
+            f'finance_http_errors_total{labels} {endpoint["errors"]}' for endpoint, labels in endpoints
+        ])
+
+        samples = []
+        for endpoint, labels in endpoints:
+            latency = endpoint['latency_seconds']
+            for bound, count in latency['buckets'].items():
+                bucket_labels = _labels(view=endpoint['view'], action=endpoint['action'], le=bound)
+                samples.append(f'finance_http_request_duration_seconds_bucket{bucket_labels} {count}')
+            samples.append(f'finance_http_request_duration_seconds_sum{labels} {latency["sum"]}')
+            samples.append(f'finance_http_request_duration_seconds_count{labels} {endpoint["requests"]}')
+        family('finance_http_request_duration_seconds', 'histogram', 'Request latency in seconds.', samples)
+
+        family('finance_db_queries_total', 'counter', 'SQL statements executed while serving requests.', [
+            f'finance_db_queries_total{labels} {endpoint["sql_queries"]}' for endpoint, labels in endpoints
+        ])
+        family('finance_db_query_seconds_total', 'counter', 'Time spent executing SQL, in seconds.', [
+            f'finance_db_query_seconds_total{labels} {endpoint["sql_seconds"]}' for endpoint, labels in endpoints
+        ])
+        family('finance_cache_lookups_total', 'counter', 'Summary cache lookups per cached name and result.', [
+            f'finance_cache_lookups_total{_labels(name=name, result=result)} {counts[result + "s"]}'
+            for name, counts in sorted(data['cache'].items())
+            for result in ('hit', 'miss')
+        ])
+        return ('\n'.join(lines) + '\n').encode(self.charset)
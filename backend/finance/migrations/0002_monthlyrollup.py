@@ -0,0 +1,46 @@
+# Generated by Django 5.2.4 on 2026-10-17 05:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def backfill_rollups(apps, schema_editor):
+    Transaction = apps.get_model('finance', 'Transaction')
+    MonthlyRollup = apps.get_model('finance', 'MonthlyRollup')
+    grouped = (
+        Transaction.objects
+        .order_by()
+        .annotate(month=TruncMonth('date'))
+        .values('month', 'type', 'category_id', 'budget_period_id')
+        .annotate(total=Sum('amount'), count=Count('id'))
+    )
+    MonthlyRollup.objects.bulk_create([MonthlyRollup(**row) for row in grouped], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('type', models.CharField(choices=[('income', 'Income'), ('expense', 'Expense')], max_length=10)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('budget_period', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='finance.budgetperiod')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='finance.category')),
+            ],
+            options={
+                'ordering': ['month', 'type'],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('budget_period__isnull', False)), fields=('month', 'type', 'category', 'budget_period'), name='unique_rollup_with_period'), models.UniqueConstraint(condition=models.Q(('budget_period__isnull', True)), fields=('month', 'type', 'category'), name='unique_rollup_without_period')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.4 on 2026-10-17 06:00
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def detach_duplicate_occurrences(apps, schema_editor):
+    """
+    Older versions could process the same occurrence twice. Keep the money in
+    the ledger but unlink all but the first copy from its recurring rule so the
+    new constraint can be created.
+    """
+    Transaction = apps.get_model('finance', 'Transaction')
+    duplicates = (
+        Transaction.objects
+        .filter(recurring_transaction__isnull=False)
+        .order_by()
+        .values('recurring_transaction_id', 'date')
+        .annotate(first_id=Min('id'), copies=Count('id'))
+        .filter(copies__gt=1)
+    )
+    for row in duplicates:
+        Transaction.objects.filter(
+            recurring_transaction_id=row['recurring_transaction_id'],
+            date=row['date'],
+        ).exclude(id=row['first_id']).update(recurring_transaction=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0002_monthlyrollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(detach_duplicate_occurrences, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='transaction',
+            constraint=models.UniqueConstraint(condition=models.Q(('recurring_transaction__isnull', False)), fields=('recurring_transaction', 'date'), name='unique_recurring_occurrence'),
+        ),
+    ]
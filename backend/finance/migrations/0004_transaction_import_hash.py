@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 06:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0003_unique_recurring_occurrence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='import_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=40, null=True),
+        ),
+    ]
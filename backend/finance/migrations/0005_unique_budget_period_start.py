@@ -0,0 +1,78 @@
+# Generated by Django 5.2.4 on 2026-10-17 06:20
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_periods(apps, schema_editor):
+    """
+    Periods used to be created lazily inside GET requests, so concurrent loads
+    could create the same period twice. Fold every duplicate into the oldest
+    period with the same owner, type and start date, moving its transactions,
+    budget and rollup totals along, so the new constraints can be created.
+    """
+    BudgetPeriod = apps.get_model('finance', 'BudgetPeriod')
+    Budget = apps.get_model('finance', 'Budget')
+    MonthlyRollup = apps.get_model('finance', 'MonthlyRollup')
+    Transaction = apps.get_model('finance', 'Transaction')
+
+    duplicates = (
+        BudgetPeriod.objects
+        .order_by()
+        .values('user_id', 'period_type', 'start_date')
+        .annotate(keep_id=Min('id'), copies=Count('id'))
+        .filter(copies__gt=1)
+    )
+    for row in duplicates:
+        keep_id = row['keep_id']
+        extra_ids = list(
+            BudgetPeriod.objects
+            .filter(user_id=row['user_id'], period_type=row['period_type'], start_date=row['start_date'])
+            .exclude(id=keep_id)
+            .values_list('id', flat=True)
+        )
+
+        Transaction.objects.filter(budget_period_id__in=extra_ids).update(budget_period_id=keep_id)
+
+        for budget in Budget.objects.filter(budget_period_id__in=extra_ids):
+            if Budget.objects.filter(user_id=budget.user_id, budget_period_id=keep_id).exists():
+                budget.delete()
+            else:
+                budget.budget_period_id = keep_id
+                budget.save(update_fields=['budget_period'])
+
+        for rollup in MonthlyRollup.objects.filter(budget_period_id__in=extra_ids):
+            target = MonthlyRollup.objects.filter(
+                month=rollup.month, type=rollup.type, category_id=rollup.category_id, budget_period_id=keep_id,
+            ).first()
+            if target is None:
+                rollup.budget_period_id = keep_id
+                rollup.save(update_fields=['budget_period'])
+            else:
+                target.total += rollup.total
+                target.count += rollup.count
+                target.save(update_fields=['total', 'count'])
+                rollup.delete()
+
+        BudgetPeriod.objects.filter(id__in=extra_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0004_transaction_import_hash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_periods, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='budgetperiod',
+            constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', False)), fields=('user', 'period_type', 'start_date'), name='unique_user_budget_period'),
+        ),
+        migrations.AddConstraint(
+            model_name='budgetperiod',
+            constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', True)), fields=('period_type', 'start_date'), name='unique_shared_budget_period'),
+        ),
+    ]
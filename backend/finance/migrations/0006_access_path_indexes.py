@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-17 06:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0005_unique_budget_period_start'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recurringtransaction',
+            index=models.Index(fields=['is_active', 'next_occurrence'], name='recurring_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['date', 'created_at', 'id'], name='transaction_ledger_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['type', 'date'], name='transaction_type_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['category', 'date'], name='transaction_category_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['budget_period', 'type'], name='transaction_period_type_idx'),
+        ),
+    ]
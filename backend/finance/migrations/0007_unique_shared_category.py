@@ -0,0 +1,69 @@
+# Generated by Django 5.2.4 on 2026-10-17 06:46
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_categories(apps, schema_editor):
+    """
+    unique_together never applied to shared categories (NULL user), so the
+    defaults could be created twice. Fold every duplicate into the oldest
+    shared category with the same name and type, moving its transactions,
+    recurring rules and rollup totals along, so the constraint can be created.
+    """
+    Category = apps.get_model('finance', 'Category')
+    MonthlyRollup = apps.get_model('finance', 'MonthlyRollup')
+    RecurringTransaction = apps.get_model('finance', 'RecurringTransaction')
+    Transaction = apps.get_model('finance', 'Transaction')
+
+    duplicates = (
+        Category.objects
+        .filter(user__isnull=True)
+        .order_by()
+        .values('name', 'type')
+        .annotate(keep_id=Min('id'), copies=Count('id'))
+        .filter(copies__gt=1)
+    )
+    for row in duplicates:
+        keep_id = row['keep_id']
+        extra_ids = list(
+            Category.objects
+            .filter(user__isnull=True, name=row['name'], type=row['type'])
+            .exclude(id=keep_id)
+            .values_list('id', flat=True)
+        )
+
+        Transaction.objects.filter(category_id__in=extra_ids).update(category_id=keep_id)
+        RecurringTransaction.objects.filter(category_id__in=extra_ids).update(category_id=keep_id)
+
+        for rollup in MonthlyRollup.objects.filter(category_id__in=extra_ids):
+            target = MonthlyRollup.objects.filter(
+                month=rollup.month, type=rollup.type, category_id=keep_id, budget_period_id=rollup.budget_period_id,
+            ).first()
+            if target is None:
+                rollup.category_id = keep_id
+                rollup.save(update_fields=['category'])
+            else:
+                target.total += rollup.total
+                target.count += rollup.count
+                target.save(update_fields=['total', 'count'])
+                rollup.delete()
+
+        Category.objects.filter(id__in=extra_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0006_access_path_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_categories, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='category',
+            constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', True)), fields=('name', 'type'), name='unique_shared_category'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+from django.db import migrations
+
+FTS_TABLE = 'finance_transaction_fts'
+
+CREATE = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "description, content='finance_transaction', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON finance_transaction BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, description) VALUES (new.id, new.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON finance_transaction BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description) VALUES ('delete', old.id, old.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF description ON finance_transaction "
+    f"BEGIN INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description) VALUES ('delete', old.id, old.description); "
+    f"INSERT INTO {FTS_TABLE}(rowid, description) VALUES (new.id, new.description); END",
+    # Index the descriptions already in the ledger
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+DROP = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_insert',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_delete',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_update',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+
+def has_fts5(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def create_search_index(apps, schema_editor):
+    """
+    FTS5 index over transaction descriptions (see finance/fulltext.py); only
+    on SQLite built with FTS5, elsewhere search falls back to substring matches
+    """
+    if not has_fts5(schema_editor.connection):
+        return
+    for statement in CREATE:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0007_unique_shared_category'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
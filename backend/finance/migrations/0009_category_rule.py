@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-17 07:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0008_transaction_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('match_type', models.CharField(choices=[('keyword', 'Keyword'), ('regex', 'Regular expression')], default='keyword', max_length=10)),
+                ('pattern', models.CharField(max_length=200)),
+                ('min_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('max_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('priority', models.IntegerField(default=100)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='finance.category')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['priority', 'id'],
+            },
+        ),
+    ]
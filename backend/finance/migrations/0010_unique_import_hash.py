@@ -0,0 +1,45 @@
+# Generated by Django 5.2.4 on 2026-10-17 07:38
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def forget_duplicate_hashes(apps, schema_editor):
+    """
+    Two imports running at once could both insert a statement row. Keep the
+    fingerprint on the oldest copy only, so the constraint can be created; the
+    rows themselves stay in the ledger.
+    """
+    Transaction = apps.get_model('finance', 'Transaction')
+    duplicates = (
+        Transaction.objects
+        .filter(import_hash__isnull=False)
+        .order_by()
+        .values('import_hash')
+        .annotate(keep_id=Min('id'), copies=Count('id'))
+        .filter(copies__gt=1)
+    )
+    for row in duplicates:
+        Transaction.objects.filter(import_hash=row['import_hash']).exclude(id=row['keep_id']).update(import_hash=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0009_category_rule'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(forget_duplicate_hashes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='transaction',
+            name='import_hash',
+            field=models.CharField(blank=True, editable=False, max_length=40, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='transaction',
+            constraint=models.UniqueConstraint(condition=models.Q(('import_hash__isnull', False)), fields=('import_hash',), name='unique_import_hash'),
+        ),
+    ]
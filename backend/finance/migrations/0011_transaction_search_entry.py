@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-17 07:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0010_unique_import_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransactionSearchEntry',
+            fields=[
+                ('transaction', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='finance.transaction')),
+                ('description', models.TextField()),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'finance_transaction_fts',
+                'managed': False,
+            },
+        ),
+    ]
@@ -1,5 +1,6 @@
-from django.db import models
+from django.db import models, router, transaction
 from django.contrib.auth.models import User
+import calendar
 from datetime import date, timedelta
 
 class Category(models.Model):
@@ -19,10 +20,46 @@ class Category(models.Model):
     class Meta:
         ordering = ['type', 'name']
         unique_together = ['name', 'type', 'user']
+        constraints = [
+            # unique_together does not cover shared categories, whose user is NULL
+            models.UniqueConstraint(
+                fields=['name', 'type'],
+                condition=models.Q(user__isnull=True),
+                name='unique_shared_category',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.type})"
 
+class CategoryRule(models.Model):
+    """
+    Files transactions whose description matches `pattern` (and whose amount
+    is within the optional bounds) under `category`. Applied by
+    finance.categorizer, lowest priority first.
+    """
+    MATCH_TYPES = [
+        ('keyword', 'Keyword'),
+        ('regex', 'Regular expression'),
+    ]
+    
+    name = models.CharField(max_length=100)
+    match_type = models.CharField(max_length=10, choices=MATCH_TYPES, default='keyword')
+    pattern = models.CharField(max_length=200)
+    min_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    max_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    priority = models.IntegerField(default=100)
+    is_active = models.BooleanField(default=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['priority', 'id']
+    
+    def __str__(self):
+        return f"{self.name}: {self.pattern} -> {self.category.name}"
+
 class BudgetPeriod(models.Model):
     PERIOD_TYPES = [
         ('monthly', 'Monthly'),
@@ -40,6 +77,19 @@ class BudgetPeriod(models.Model):
     
     class Meta:
         ordering = ['-start_date']
+        constraints = [
+            # One period of each type per start date, so calendar generation can run concurrently
+            models.UniqueConstraint(
+                fields=['user', 'period_type', 'start_date'],
+                condition=models.Q(user__isnull=False),
+                name='unique_user_budget_period',
+            ),
+            models.UniqueConstraint(
+                fields=['period_type', 'start_date'],
+                condition=models.Q(user__isnull=True),
+                name='unique_shared_budget_period',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.start_date} - {self.end_date})"
@@ -74,6 +124,10 @@ class RecurringTransaction(models.Model):
     
     class Meta:
         ordering = ['next_occurrence']
+        indexes = [
+            # Due rules: is_active=True, next_occurrence <= today
+            models.Index(fields=['is_active', 'next_occurrence'], name='recurring_due_idx'),
+        ]
     
     def save(self, *args, **kwargs):
         if not self.next_occurrence:
@@ -87,24 +141,92 @@ class RecurringTransaction(models.Model):
         elif self.frequency == 'weekly':
             return self.next_occurrence + timedelta(weeks=1)
         elif self.frequency == 'monthly':
-            if self.next_occurrence.month == 12:
-                return self.next_occurrence.replace(year=self.next_occurrence.year + 1, month=1)
-            else:
-                return self.next_occurrence.replace(month=self.next_occurrence.month + 1)
+            return self._shift_months(1)
         elif self.frequency == 'quarterly':
-            month = self.next_occurrence.month + 3
-            year = self.next_occurrence.year
-            if month > 12:
-                month -= 12
-                year += 1
-            return self.next_occurrence.replace(year=year, month=month)
+            return self._shift_months(3)
         elif self.frequency == 'yearly':
-            return self.next_occurrence.replace(year=self.next_occurrence.year + 1)
+            return self._shift_months(12)
         return self.next_occurrence
     
+    def _shift_months(self, months):
+        # Clamp to the last day of shorter months from the start date's day, so a clamped
+        # occurrence does not carry over (Jan 31 -> Feb 29 -> Mar 31)
+        month_index = self.next_occurrence.year * 12 + self.next_occurrence.month - 1 + months
+        year, month = divmod(month_index, 12)
+        day = min(self.start_date.day, calendar.monthrange(year, month + 1)[1])
+        return self.next_occurrence.replace(year=year, month=month + 1, day=day)
+    
     def __str__(self):
         return f"{self.name} - {self.frequency} - ${self.amount}"
 
+# Keep `import_hash__in` lists below SQLite's bound-parameter limit
+HASH_LOOKUP_SIZE = 900
+
+class TransactionQuerySet(models.QuerySet):
+    """
+    Bulk operations that keep MonthlyRollup in step with the ledger, in one
+    transaction on the write alias. `self.db` would be the read alias of a
+    fresh queryset under ReadWriteRouter; once default is in a transaction
+    the router sends the reads made here to default as well.
+    """
+    
+    def _write_db(self):
+        return self._db or router.db_for_write(self.model, **self._hints)
+    
+    def bulk_create(self, objs, *args, **kwargs):
+        """
+        With ignore_conflicts, every row needs an import_hash: rows whose hash
+        is already stored (or repeated earlier in `objs`) are skipped, and only
+        the rows actually inserted are returned and added to the rollup.
+        """
+        from .rollups import record_bulk_create
+        
+        if kwargs.get('update_conflicts'):
+            raise ValueError('Transaction.bulk_create cannot track rollups for updated rows')
+        objs = list(objs)
+        using = self._write_db()
+        with transaction.atomic(using=using):
+            if kwargs.get('ignore_conflicts'):
+                objs = self.using(using)._without_stored_hashes(objs)
+            created = super().bulk_create(objs, *args, **kwargs)
+            record_bulk_create(created)
+        return created
+    
+    def _without_stored_hashes(self, objs):
+        # Runs in the write transaction opened by bulk_create: SQLite has one writer at a
+        # time, so no other import can store these hashes between this check and our insert
+        if any(not obj.import_hash for obj in objs):
+            raise ValueError('Transaction.bulk_create(ignore_conflicts=True) needs an import_hash on every row')
+        hashes = list(dict.fromkeys(obj.import_hash for obj in objs))
+        stored = set()
+        for start in range(0, len(hashes), HASH_LOOKUP_SIZE):
+            stored.update(
+                self.filter(import_hash__in=hashes[start:start + HASH_LOOKUP_SIZE])
+                .values_list('import_hash', flat=True)
+            )
+        new = []
+        for obj in objs:
+            if obj.import_hash not in stored:
+                stored.add(obj.import_hash)
+                new.append(obj)
+        return new
+    
+    def update(self, **kwargs):
+        from .rollups import tracked_update
+        
+        using = self._write_db()
+        with transaction.atomic(using=using):
+            return tracked_update(
+                self.using(using), kwargs, lambda: super(TransactionQuerySet, self).update(**kwargs))
+    
+    def delete(self):
+        from .rollups import apply_deltas, deltas_from_queryset
+        
+        using = self._write_db()
+        with transaction.atomic(using=using):
+            apply_deltas(deltas_from_queryset(self.using(using), sign=-1))
+            return super().delete()
+
 class Transaction(models.Model):
     TRANSACTION_TYPES = [
         ('income', 'Income'),
@@ -119,15 +241,117 @@ class Transaction(models.Model):
     date = models.DateField()
     budget_period = models.ForeignKey(BudgetPeriod, on_delete=models.CASCADE, null=True, blank=True)
     recurring_transaction = models.ForeignKey(RecurringTransaction, on_delete=models.CASCADE, null=True, blank=True)
+    # Fingerprint of the statement row this transaction was imported from
+    import_hash = models.CharField(max_length=40, null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = TransactionQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-date', '-created_at']
+        constraints = [
+            # One generated transaction per recurring rule and date, so catch-up runs are idempotent
+            models.UniqueConstraint(
+                fields=['recurring_transaction', 'date'],
+                condition=models.Q(recurring_transaction__isnull=False),
+                name='unique_recurring_occurrence',
+            ),
+            # A statement row is imported once, even by two imports running at the same time
+            models.UniqueConstraint(
+                fields=['import_hash'],
+                condition=models.Q(import_hash__isnull=False),
+                name='unique_import_hash',
+            ),
+        ]
+        indexes = [
+            # Ledger order and keyset pagination, and plain date ranges
+            models.Index(fields=['date', 'created_at', 'id'], name='transaction_ledger_idx'),
+            models.Index(fields=['type', 'date'], name='transaction_type_date_idx'),
+            models.Index(fields=['category', 'date'], name='transaction_category_date_idx'),
+            models.Index(fields=['budget_period', 'type'], name='transaction_period_type_idx'),
+        ]
+    
+    def save(self, *args, **kwargs):
+        # Keep the monthly rollup in step with the ledger in the same DB transaction
+        from .rollups import record_save
+        
+        with transaction.atomic():
+            previous = None
+            if self.pk is not None:
+                previous = Transaction.objects.filter(pk=self.pk).values(
+                    'date', 'type', 'category_id', 'budget_period_id', 'amount'
+                ).first()
+            super().save(*args, **kwargs)
+            record_save(previous, self)
+    
+    def delete(self, *args, **kwargs):
+        from .rollups import record_delete
+        
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            record_delete(self)
+        return result
     
     def __str__(self):
         return f"{self.type.title()}: {self.description} - ${self.amount}"
 
+class SearchMatch(models.Lookup):
+    """`column MATCH query` against an FTS5 table"""
+    lookup_name = 'match'
+    
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+class TransactionSearchEntry(models.Model):
+    """
+    A row of the FTS5 index over transaction descriptions, which finance.fulltext
+    creates and keeps in step with triggers; read-only. It lets searches join
+    the index and order by its BM25 `rank` through the ORM.
+    """
+    transaction = models.OneToOneField(
+        Transaction, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid', related_name='search_entry')
+    description = models.TextField()
+    rank = models.FloatField()
+    
+    class Meta:
+        managed = False
+        db_table = 'finance_transaction_fts'
+
+TransactionSearchEntry._meta.get_field('description').register_lookup(SearchMatch)
+
+class MonthlyRollup(models.Model):
+    """
+    Pre-aggregated transaction totals per (month, type, category, budget period).
+    Maintained incrementally by finance.rollups; rebuild with `manage.py rebuild_rollups`.
+    """
+    month = models.DateField()  # First day of the month
+    type = models.CharField(max_length=10, choices=Transaction.TRANSACTION_TYPES)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    budget_period = models.ForeignKey(BudgetPeriod, on_delete=models.CASCADE, null=True, blank=True)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        ordering = ['month', 'type']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['month', 'type', 'category', 'budget_period'],
+                condition=models.Q(budget_period__isnull=False),
+                name='unique_rollup_with_period',
+            ),
+            models.UniqueConstraint(
+                fields=['month', 'type', 'category'],
+                condition=models.Q(budget_period__isnull=True),
+                name='unique_rollup_without_period',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.month:%Y-%m} {self.type} {self.category_id}: {self.total} ({self.count})"
+
 class Budget(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
     budget_period = models.ForeignKey(BudgetPeriod, on_delete=models.CASCADE, null=True, blank=True)
@@ -0,0 +1,139 @@
+import base64
+import binascii
+from datetime import date, datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class TransactionCursorPagination(BasePagination):
+    """
+    Keyset pagination over the transaction ledger ordering (-date, -created_at).
+
+    The cursor carries the (date, created_at, id) of the last row served, so
+    every page is a single indexed range scan regardless of how deep it is.
+    `id` breaks ties between rows created in the same instant.
+    """
+    page_size = 50
+    max_page_size = 500
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        position, reverse = self.decode_cursor(request)
+
+        if reverse:
+            queryset = queryset.order_by('date', 'created_at', 'id')
+        else:
+            queryset = queryset.order_by('-date', '-created_at', '-id')
+
+        if position is not None:
+            queryset = queryset.filter(self.keyset_filter(position, reverse))
+
+        # Fetch one extra row to learn whether another page follows
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+
+        if reverse:
+            rows.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        self.first_row = rows[0] if rows else None
+        self.last_row = rows[-1] if rows else None
+        return rows
+
+    def keyset_filter(self, position, reverse):
+        row_date, created_at, pk = position
+        if reverse:
+            return (
+                Q(date__gt=row_date) |
+                Q(date=row_date, created_at__gt=created_at) |
+                Q(date=row_date, created_at=created_at, id__gt=pk)
+            )
+        return (
+            Q(date__lt=row_date) |
+            Q(date=row_date, created_at__lt=created_at) |
+            Q(date=row_date, created_at=created_at, id__lt=pk)
+        )
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+
+        try:
+            decoded = base64.urlsafe_b64decode(encoded.encode('ascii')).decode('ascii')
+            direction, row_date, created_at, pk = decoded.split('|')
+            position = (
+                date.fromisoformat(row_date),
+                datetime.fromisoformat(created_at),
+                int(pk),
+            )
+        except (TypeError, ValueError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+        if direction not in ('n', 'p'):
+            raise NotFound(self.invalid_cursor_message)
+        return position, direction == 'p'
+
+    def encode_cursor(self, row, reverse):
+        raw = '|'.join([
+            'p' if reverse else 'n',
+            row.date.isoformat(),
+            row.created_at.isoformat(),
+            str(row.pk),
+        ])
+        encoded = base64.urlsafe_b64encode(raw.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or self.last_row is None:
+            return None
+        return self.encode_cursor(self.last_row, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.first_row is None:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.first_row, reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
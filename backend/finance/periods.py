@@ -0,0 +1,217 @@
+"""
+Resolution of the active BudgetPeriod that contains a date.
+
+Active periods are flattened into a sorted list of non-overlapping segments,
+each mapped to the period that wins there (the one with the latest start
+date, as the former `.order_by('-start_date').first()` queries picked), so a
+lookup is one bisect. The index is built once per process and rebuilt when a
+BudgetPeriod changes: signals invalidate it in-process straight away, and the
+budget_periods scope, bumped on commit in the version store that every process
+shares (finance/caching.py), tells the other workers and commands to rebuild.
+
+Periods are created ahead of time by `generate_calendar` rather than lazily
+by the requests that need them: on boot, on every process_recurring run, and
+by `extend_calendar` when a write is dated after the last period.
+`relink_transactions` re-points the ledger at the periods covering each date
+in one UPDATE per index segment.
+"""
+import heapq
+from bisect import bisect_right
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .analytics import add_months
+from .caching import BUDGET_PERIODS_SCOPE, bump_on_commit, get_versions
+from .models import BudgetPeriod, Transaction
+
+PERIOD_MONTHS = {
+    'monthly': 1,
+    'quarterly': 3,
+    'yearly': 12,
+}
+
+
+class PeriodIndex:
+    def __init__(self, periods):
+        """`periods` is an iterable of (id, start_date, end_date) for active periods"""
+        self.starts = []
+        self.period_ids = []
+
+        periods = sorted(periods, key=lambda period: period[1])
+        boundaries = sorted(
+            {start for _, start, _ in periods} | {end + timedelta(days=1) for _, _, end in periods}
+        )
+        active = []  # heap of (-start ordinal, id, end): latest start first, lowest id on ties
+        position = 0
+        for boundary in boundaries:
+            while position < len(periods) and periods[position][1] <= boundary:
+                period_id, start, end = periods[position]
+                heapq.heappush(active, (-start.toordinal(), period_id, end))
+                position += 1
+            while active and active[0][2] < boundary:
+                heapq.heappop(active)
+
+            period_id = active[0][1] if active else None
+            if not self.period_ids or self.period_ids[-1] != period_id:
+                self.starts.append(boundary)
+                self.period_ids.append(period_id)
+
+    def resolve(self, day):
+        """Id of the active period containing `day`, or None"""
+        position = bisect_right(self.starts, day) - 1
+        return self.period_ids[position] if position >= 0 else None
+
+    def resolve_many(self, days):
+        """Period ids for each of `days`, in order; each distinct date is looked up once"""
+        resolved = {}
+        ids = []
+        for day in days:
+            if day not in resolved:
+                resolved[day] = self.resolve(day)
+            ids.append(resolved[day])
+        return ids
+
+
+_cached = None
+
+
+def invalidate():
+    global _cached
+    _cached = None
+
+
+def get_index():
+    global _cached
+    version = get_versions([BUDGET_PERIODS_SCOPE])[0]
+    cached = _cached
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    index = PeriodIndex(
+        BudgetPeriod.objects.filter(is_active=True).values_list('id', 'start_date', 'end_date')
+    )
+    _cached = (version, index)
+    return index
+
+
+def resolve(day):
+    return get_index().resolve(day)
+
+
+def resolve_many(days):
+    return get_index().resolve_many(days)
+
+
+def period_for(day):
+    """The active BudgetPeriod containing `day`, or None"""
+    period_id = resolve(day)
+    if period_id is None:
+        return None
+    return BudgetPeriod.objects.filter(pk=period_id).first()
+
+
+def current_period(today=None):
+    """The active BudgetPeriod containing today, extending the calendar first when it has run out"""
+    today = today or timezone.now().date()
+    extend_calendar(today)
+    return period_for(today)
+
+
+def period_start(period_type, day):
+    """First day of the calendar period of `period_type` containing `day`"""
+    if period_type == 'yearly':
+        return date(day.year, 1, 1)
+    if period_type == 'quarterly':
+        return date(day.year, (day.month - 1) // 3 * 3 + 1, 1)
+    return day.replace(day=1)
+
+
+def period_name(period_type, start):
+    if period_type == 'yearly':
+        return f"Yearly Budget - {start.year}"
+    if period_type == 'quarterly':
+        return f"Quarterly Budget - Q{(start.month - 1) // 3 + 1} {start.year}"
+    return f"Monthly Budget - {start.strftime('%B %Y')}"
+
+
+def generate_calendar(period_type='monthly', ahead=12, start=None):
+    """
+    Create the shared periods of `period_type` from the one containing `start`
+    (default today) through `ahead` more, skipping those that already exist.
+    Concurrent runs are safe: the unique (period_type, start_date) constraint
+    drops whichever insert comes second. Returns the number of periods created.
+    """
+    months = PERIOD_MONTHS[period_type]
+    first = period_start(period_type, start or timezone.now().date())
+    starts = [add_months(first, months * offset) for offset in range(ahead + 1)]
+
+    existing = set(
+        BudgetPeriod.objects
+        .filter(user=None, period_type=period_type, start_date__in=starts)
+        .values_list('start_date', flat=True)
+    )
+    new_periods = [
+        BudgetPeriod(
+            name=period_name(period_type, period_start_date),
+            period_type=period_type,
+            start_date=period_start_date,
+            end_date=add_months(period_start_date, months) - timedelta(days=1),
+            is_active=True,
+        )
+        for period_start_date in starts
+        if period_start_date not in existing
+    ]
+    if new_periods:
+        # bulk_create sends no signals, so refresh the index here
+        BudgetPeriod.objects.bulk_create(new_periods, ignore_conflicts=True)
+        invalidate()
+        bump_on_commit([BUDGET_PERIODS_SCOPE])
+    return len(new_periods)
+
+
+def extend_calendar(day, period_type='monthly', ahead=12):
+    """
+    Generate the calendar from the period containing `day` when `day` falls
+    after the last active period, or there is none. Dates before the calendar
+    or in a gap inside it are left alone. Costs no query when nothing is
+    missing. Returns the number of periods created.
+    """
+    index = get_index()
+    if index.starts and day < index.starts[-1]:
+        return 0
+    return generate_calendar(period_type, ahead, start=day)
+
+
+def relink_transactions(start_date=None, end_date=None):
+    """
+    Point every transaction dated within [start_date, end_date] (both optional)
+    at the active period covering its date, with one UPDATE per index segment.
+    Transactions outside every active period keep their current link. The
+    rollup follows through TransactionQuerySet.update. Returns the number of
+    transactions changed.
+    """
+    index = get_index()
+    changed = 0
+    with transaction.atomic():
+        for position, period_id in enumerate(index.period_ids):
+            if period_id is None:
+                continue
+            segment_start = index.starts[position]
+            # A segment with a period is always followed by another boundary
+            segment_end = index.starts[position + 1] - timedelta(days=1)
+            if start_date is not None:
+                segment_start = max(segment_start, start_date)
+            if end_date is not None:
+                segment_end = min(segment_end, end_date)
+            if segment_start > segment_end:
+                continue
+
+            changed += (
+                Transaction.objects
+                .filter(date__gte=segment_start, date__lte=segment_end)
+                .exclude(budget_period_id=period_id)
+                .update(budget_period_id=period_id)
+            )
+    return changed
@@ -0,0 +1,219 @@
+"""
+Opt-in request profiling.
+
+A request is profiled when it carries `X-Profile: <PROFILING_SECRET>`, when a
+staff user sends `X-Profile: 1`, or when it is drawn by PROFILING_SAMPLE_RATE (0 to 1, off by default). The view
+runs under cProfile with every SQL statement and its time logged (on every
+alias, and from the fanout threads too), and the result is written to
+PROFILING_DIR as `<id>.prof` (pstats data, e.g. for snakeviz) and `<id>.json`
+(request, timings, query log and the top functions).
+Only the newest PROFILING_MAX_PROFILES are kept.
+
+Profiles are listed and downloaded from /api/profiles, which takes the same
+header or a staff session. The secret is only read from the header, never
+from the query string, where it would end up in access logs and browser
+history. One request is profiled at a time per process; a
+request that asks while another is being profiled is served unprofiled.
+"""
+import cProfile
+import json
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
+
+from .database import query_wrappers
+from .metrics import endpoint_for
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+
+# The profile endpoints take the same token, but are never profiled themselves
+PROFILES_PATH = '/api/profiles'
+
+PROFILE_ID = re.compile(r'^\d{8}T\d{12}-[0-9a-f]{8}$')
+
+# Queries kept per profile; the count and total time still cover every query
+MAX_LOGGED_QUERIES = 1000
+TOP_FUNCTIONS = 30
+
+_profiling = threading.Lock()
+
+
+def profile_dir():
+    return str(settings.PROFILING_DIR)
+
+
+def request_token(request):
+    return request.META.get(PROFILE_HEADER)
+
+
+def has_secret(request):
+    secret = settings.PROFILING_SECRET
+    token = request_token(request)
+    return bool(secret and token) and constant_time_compare(token, secret)
+
+
+def is_staff(request):
+    user = getattr(request, 'user', None)
+    return user is not None and user.is_staff
+
+
+def can_read_profiles(request):
+    return has_secret(request) or is_staff(request)
+
+
+def is_requested(request):
+    """Whether the request explicitly asks to be profiled, and may"""
+    return has_secret(request) or (bool(request_token(request)) and is_staff(request))
+
+
+def should_profile(request):
+    if request.path_info.startswith(PROFILES_PATH):
+        return False
+    if is_requested(request):
+        return True
+    rate = settings.PROFILING_SAMPLE_RATE
+    return rate > 0 and random.random() < rate
+
+
+class QueryLog:
+    """execute_wrapper that logs each statement of one request with its time and alias, from any thread"""
+
+    def __init__(self):
+        self.queries = []
+        self.count = 0
+        self.seconds = 0.0
+        self.lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.count += 1
+                self.seconds += elapsed
+                if len(self.queries) < MAX_LOGGED_QUERIES:
+                    self.queries.append({'sql': sql, 'params': repr(params)[:500], 'many': many,
+                                         'alias': context['connection'].alias, 'seconds': round(elapsed, 6)})
+
+
+def _top_functions(profiler):
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, function), (calls, _, own, cumulative, _) in stats.stats.items():
+        rows.append({
+            'function': f'{filename}:{line}({function})',
+            'calls': calls,
+            'own_seconds': round(own, 6),
+            'cumulative_seconds': round(cumulative, 6),
+        })
+    rows.sort(key=lambda row: row['cumulative_seconds'], reverse=True)
+    return rows[:TOP_FUNCTIONS]
+
+
+def save(profiler, request, response, seconds, query_log, sampled):
+    """Write one profile and trim the ring buffer; returns the profile id"""
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    profile_id = f'{datetime.now(timezone.utc):%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}'
+
+    view, action = endpoint_for(request)
+    summary = {
+        'id': profile_id,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'method': request.method,
+        'path': request.get_full_path(),
+        'view': view,
+        'action': action,
+        'status': response.status_code,
+        'sampled': sampled,
+        'seconds': round(seconds, 6),
+        'sql_queries': query_log.count,
+        'sql_seconds': round(query_log.seconds, 6),
+        'top_functions': _top_functions(profiler),
+        'queries': query_log.queries,
+    }
+    profiler.dump_stats(os.path.join(directory, f'{profile_id}.prof'))
+    temporary = os.path.join(directory, f'.{profile_id}.json')
+    with open(temporary, 'w', encoding='utf-8') as handle:
+        json.dump(summary, handle)
+    os.replace(temporary, os.path.join(directory, f'{profile_id}.json'))
+
+    trim(settings.PROFILING_MAX_PROFILES)
+    return profile_id
+
+
+def profile_ids():
+    """Stored profile ids, oldest first (ids start with their UTC timestamp)"""
+    try:
+        names = os.listdir(profile_dir())
+    except FileNotFoundError:
+        return []
+    return sorted(name[:-5] for name in names if name.endswith('.json') and PROFILE_ID.match(name[:-5]))
+
+
+def trim(keep):
+    ids = profile_ids()
+    for profile_id in ids[:max(len(ids) - keep, 0)]:
+        for suffix in ('.json', '.prof'):
+            try:
+                os.remove(os.path.join(profile_dir(), profile_id + suffix))
+            except FileNotFoundError:
+                pass
+
+
+def load(profile_id):
+    """The stored summary of `profile_id`, or None"""
+    if not PROFILE_ID.match(profile_id):
+        return None
+    try:
+        with open(os.path.join(profile_dir(), f'{profile_id}.json'), encoding='utf-8') as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return None
+
+
+def stats_path(profile_id):
+    """Path of the pstats file of `profile_id`, or None"""
+    if not PROFILE_ID.match(profile_id):
+        return None
+    path = os.path.join(profile_dir(), f'{profile_id}.prof')
+    return path if os.path.exists(path) else None
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not should_profile(request):
+            return self.get_response(request)
+        # cProfile cannot run two profilers at once
+        if not _profiling.acquire(blocking=False):
+            return self.get_response(request)
+
+        try:
+            sampled = not is_requested(request)
+            query_log = QueryLog()
+            profiler = cProfile.Profile()
+            start = time.perf_counter()
+            with query_wrappers([query_log]):
+                profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    profiler.disable()
+            seconds = time.perf_counter() - start
+            response['X-Profile-Id'] = save(profiler, request, response, seconds, query_log, sampled)
+            return response
+        finally:
+            _profiling.release()
@@ -0,0 +1,38 @@
+"""
+JSON renderer backed by orjson.
+
+orjson encodes dicts, lists, strings and numbers in native code, which is most
+of the time spent rendering large ledger and report payloads. Values it does
+not handle natively (Decimal, dates and datetimes, lazy strings, querysets)
+go through DRF's own JSONEncoder, so the output matches JSONRenderer's.
+Without orjson installed the renderer is plain JSONRenderer.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+_drf_default = JSONEncoder().default
+
+
+class ORJSONRenderer(JSONRenderer):
+    # Dates and datetimes are passed through to DRF's encoder so their format
+    # (e.g. millisecond precision, trailing Z) stays exactly as before.
+    options = (
+        orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if orjson is not None else 0
+    )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+
+        options = self.options
+        if self.get_indent(accepted_media_type or '', renderer_context or {}):
+            options |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=_drf_default, option=options)
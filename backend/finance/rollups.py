@@ -0,0 +1,309 @@
+"""
+Incremental maintenance of the MonthlyRollup table.
+
+Every write path on Transaction (Model.save/delete and the TransactionQuerySet
+bulk operations) feeds its changes through here inside the same database
+transaction, so the rollup always matches the ledger it summarizes. Cache
+scopes (see caching.py) for the ledger and the changed months are bumped on
+commit.
+"""
+import calendar
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Model, Sum
+from django.db.models.functions import TruncMonth
+
+from .caching import LEDGER_SCOPE, TRANSACTIONS_SCOPE, bump_on_commit, month_scope
+from .models import MonthlyRollup, Transaction
+
+# Transaction fields that decide which rollup row a transaction belongs to
+ROLLUP_FIELDS = {'date', 'type', 'category', 'category_id', 'budget_period', 'budget_period_id', 'amount'}
+
+GROUP_FIELDS = ('month', 'type', 'category_id', 'budget_period_id')
+
+CENT = Decimal('0.01')
+
+# Keep `pk__in` lists below SQLite's bound-parameter limit
+PK_CHUNK_SIZE = 900
+
+
+def month_start(value):
+    return value.replace(day=1)
+
+
+def month_end(value):
+    return value.replace(day=calendar.monthrange(value.year, value.month)[1])
+
+
+def _row_key(row):
+    return (month_start(row['date']), row['type'], row['category_id'], row['budget_period_id'])
+
+
+def _instance_row(instance):
+    return {
+        'date': instance.date,
+        'type': instance.type,
+        'category_id': instance.category_id,
+        'budget_period_id': instance.budget_period_id,
+        'amount': instance.amount,
+    }
+
+
+def _cents(value):
+    # SQLite sums decimals as floats; round back to the stored precision
+    return Decimal(value).quantize(CENT)
+
+
+def _new_deltas():
+    return defaultdict(lambda: [Decimal('0'), 0])
+
+
+def deltas_from_rows(rows, sign=1, deltas=None):
+    """Accumulate (total, count) deltas from dicts holding date/type/category_id/budget_period_id/amount"""
+    deltas = _new_deltas() if deltas is None else deltas
+    for row in rows:
+        delta = deltas[_row_key(row)]
+        delta[0] += sign * Decimal(str(row['amount']))
+        delta[1] += sign
+    return deltas
+
+
+def deltas_from_queryset(queryset, sign=1, deltas=None):
+    """Accumulate deltas for every transaction in `queryset` with a single grouped query"""
+    deltas = _new_deltas() if deltas is None else deltas
+    grouped = (
+        queryset
+        .order_by()
+        .annotate(month=TruncMonth('date'))
+        .values(*GROUP_FIELDS)
+        .annotate(total=Sum('amount'), count=Count('id'))
+    )
+    for row in grouped:
+        delta = deltas[(row['month'], row['type'], row['category_id'], row['budget_period_id'])]
+        delta[0] += sign * _cents(row['total'])
+        delta[1] += sign * row['count']
+    return deltas
+
+
+def apply_deltas(deltas):
+    """Add the accumulated deltas to MonthlyRollup, creating or pruning rows as needed"""
+    pruned = False
+    changed_months = set()
+    for (month, type_, category_id, budget_period_id), (total, count) in deltas.items():
+        if not total and not count:
+            continue
+        changed_months.add(month)
+
+        lookup = {
+            'month': month,
+            'type': type_,
+            'category_id': category_id,
+            'budget_period_id': budget_period_id,
+        }
+        updated = MonthlyRollup.objects.filter(**lookup).update(
+            total=F('total') + total,
+            count=F('count') + count,
+        )
+        if count < 0:
+            pruned = True
+        if updated or count <= 0:
+            # A missing row on removal means the rollup row was cascaded away
+            # together with its category or budget period.
+            continue
+
+        try:
+            with transaction.atomic():
+                MonthlyRollup.objects.create(total=total, count=count, **lookup)
+        except IntegrityError:
+            # Lost a race with a concurrent writer creating the same row
+            MonthlyRollup.objects.filter(**lookup).update(
+                total=F('total') + total,
+                count=F('count') + count,
+            )
+
+    if pruned:
+        MonthlyRollup.objects.filter(count=0).delete()
+
+    scopes = [TRANSACTIONS_SCOPE]
+    if changed_months:
+        scopes += [LEDGER_SCOPE] + [month_scope(month) for month in changed_months]
+    bump_on_commit(scopes)
+
+
+def record_save(previous, instance):
+    deltas = _new_deltas()
+    if previous is not None:
+        deltas_from_rows([previous], sign=-1, deltas=deltas)
+    deltas_from_rows([_instance_row(instance)], deltas=deltas)
+    apply_deltas(deltas)
+
+
+def record_delete(instance):
+    apply_deltas(deltas_from_rows([_instance_row(instance)], sign=-1))
+
+
+def record_bulk_create(instances):
+    apply_deltas(deltas_from_rows(_instance_row(instance) for instance in instances))
+
+
+def tracked_update(queryset, values, perform_update):
+    """
+    Run `perform_update()` (a QuerySet.update) and move the affected totals
+    between rollup rows. Constant values are remapped from one grouped query;
+    expressions (e.g. the Case/When built by bulk_update) are resolved by
+    re-aggregating the affected primary keys after the update.
+    """
+    changes = {name: value for name, value in values.items() if name in ROLLUP_FIELDS}
+    if not changes:
+        bump_on_commit([TRANSACTIONS_SCOPE])
+        return perform_update()
+
+    if any(hasattr(value, 'resolve_expression') for value in changes.values()):
+        pks = list(queryset.values_list('pk', flat=True))
+        deltas = _new_deltas()
+        for chunk in _chunks(pks):
+            deltas_from_queryset(Transaction.objects.filter(pk__in=chunk), sign=-1, deltas=deltas)
+        updated = perform_update()
+        for chunk in _chunks(pks):
+            deltas_from_queryset(Transaction.objects.filter(pk__in=chunk), deltas=deltas)
+        apply_deltas(deltas)
+        return updated
+
+    # As stored: update() also takes date strings and plain primary keys
+    changes = {name: _stored_value(name, value) for name, value in changes.items()}
+    replacements = {}
+    for name, value in changes.items():
+        if name == 'date':
+            replacements['month'] = month_start(value)
+        elif name in ('category', 'budget_period'):
+            replacements[f'{name}_id'] = value
+        elif name != 'amount':
+            replacements[name] = value
+
+    before = deltas_from_queryset(queryset, sign=-1)
+    updated = perform_update()
+
+    deltas = _new_deltas()
+    for key, (total, count) in before.items():
+        deltas[key][0] += total
+        deltas[key][1] += count
+        new_row = dict(zip(GROUP_FIELDS, key), **replacements)
+        new_key = tuple(new_row[field] for field in GROUP_FIELDS)
+        new_total = -total
+        if 'amount' in changes:
+            new_total = changes['amount'] * -count
+        deltas[new_key][0] += new_total
+        deltas[new_key][1] -= count
+    apply_deltas(deltas)
+    return updated
+
+
+def _stored_value(name, value):
+    """The Python value of Transaction field `name` once `value` is stored; relations give the primary key"""
+    field = Transaction._meta.get_field(name)
+    if field.is_relation:
+        if isinstance(value, Model):
+            value = value.pk
+        return None if value is None else field.target_field.to_python(value)
+    return field.to_python(value)
+
+
+def _chunks(items, size=PK_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def summarize(start_date=None, end_date=None, fields=('month', 'type'), **filters):
+    """
+    Sum and count transactions dated within the inclusive range, grouped by
+    `fields` (any of month, type, category_id, category__name, category__color,
+    budget_period_id). Whole months are read from MonthlyRollup; partial months
+    at either edge of the range are aggregated from the ledger by date range.
+
+    Returns a list of dicts with the group fields plus `total` and `count`.
+    """
+    results = {}
+
+    def merge(rows):
+        for row in rows:
+            key = tuple(row[field] for field in fields)
+            entry = results.setdefault(key, dict(zip(fields, key), total=Decimal('0'), count=0))
+            entry['total'] += _cents(row['total'] or 0)
+            entry['count'] += row['count'] or 0
+
+    full_from, full_to, edges = _split_range(start_date, end_date)
+
+    if full_from is None or full_to is None or full_from <= full_to:
+        rollups = MonthlyRollup.objects.filter(**filters)
+        if full_from is not None:
+            rollups = rollups.filter(month__gte=full_from)
+        if full_to is not None:
+            rollups = rollups.filter(month__lte=full_to)
+        merge(rollups.order_by().values(*fields).annotate(total=Sum('total'), count=Sum('count')))
+
+    for edge_start, edge_end in edges:
+        ledger = Transaction.objects.filter(date__gte=edge_start, date__lte=edge_end, **filters)
+        if 'month' in fields:
+            ledger = ledger.annotate(month=TruncMonth('date'))
+        merge(ledger.order_by().values(*fields).annotate(total=Sum('amount'), count=Count('id')))
+
+    return list(results.values())
+
+
+def _split_range(start_date, end_date):
+    """Split an inclusive date range into whole months plus partial edge ranges"""
+    edges = []
+    full_from = start_date
+    full_to = end_date
+
+    if start_date is not None and start_date.day != 1:
+        edge_end = month_end(start_date)
+        if end_date is not None and end_date < edge_end:
+            edge_end = end_date
+        edges.append((start_date, edge_end))
+        full_from = month_end(start_date) + timedelta(days=1)
+
+    if end_date is not None and end_date != month_end(end_date):
+        edge_start = month_start(end_date)
+        if full_from is None or edge_start >= full_from:
+            edges.append((edge_start, end_date))
+        full_to = edge_start - timedelta(days=1)
+
+    return full_from, full_to, edges
+
+
+def expected_rollups():
+    """Aggregate the ledger into rollup keys, as the rollup table should hold them"""
+    return {key: (total, count) for key, (total, count) in deltas_from_queryset(Transaction.objects.all()).items()}
+
+
+def rebuild():
+    """Recompute the rollup table from the ledger. Returns the number of rows written."""
+    with transaction.atomic():
+        MonthlyRollup.objects.all().delete()
+        rows = [
+            MonthlyRollup(
+                month=month, type=type_, category_id=category_id,
+                budget_period_id=budget_period_id, total=total, count=count,
+            )
+            for (month, type_, category_id, budget_period_id), (total, count) in expected_rollups().items()
+        ]
+        MonthlyRollup.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
+
+
+def verify():
+    """Compare the rollup table with the ledger. Returns a list of (key, expected, actual) mismatches."""
+    expected = expected_rollups()
+    actual = {
+        (row['month'], row['type'], row['category_id'], row['budget_period_id']): (row['total'], row['count'])
+        for row in MonthlyRollup.objects.values(*GROUP_FIELDS, 'total', 'count')
+    }
+    mismatches = []
+    for key in sorted(set(expected) | set(actual), key=lambda k: (k[0], k[1], k[2], k[3] or 0)):
+        if expected.get(key) != actual.get(key):
+            mismatches.append((key, expected.get(key), actual.get(key)))
+    return mismatches
@@ -1,17 +1,69 @@
 from rest_framework import serializers
-from .models import Transaction, Budget, Goal, Category, BudgetPeriod, RecurringTransaction
+from . import periods
+from .categorizer import pattern_error
+from .models import Transaction, Budget, Goal, Category, BudgetPeriod, RecurringTransaction, CategoryRule
 
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ['id', 'name', 'type', 'is_custom', 'color', 'icon', 'created_at']
         read_only_fields = ['id', 'created_at']
+    
+    def validate(self, attrs):
+        # As for budget periods, DRF skips the unique constraints that involve `user`
+        instance = self.instance
+        name = attrs.get('name', instance.name if instance else None)
+        category_type = attrs.get('type', instance.type if instance else None)
+        duplicates = Category.objects.filter(user=instance.user_id if instance else None, name=name, type=category_type)
+        if instance:
+            duplicates = duplicates.exclude(pk=instance.pk)
+        if duplicates.exists():
+            raise serializers.ValidationError({'name': 'A category with this name and type already exists.'})
+        return attrs
+
+class CategoryRuleSerializer(serializers.ModelSerializer):
+    category_name = serializers.CharField(source='category.name', read_only=True)
+    
+    class Meta:
+        model = CategoryRule
+        fields = ['id', 'name', 'match_type', 'pattern', 'min_amount', 'max_amount', 'category', 'category_name',
+                 'priority', 'is_active', 'created_at']
+        read_only_fields = ['id', 'created_at']
+    
+    def validate(self, attrs):
+        instance = self.instance
+        match_type = attrs.get('match_type', instance.match_type if instance else 'keyword')
+        pattern = attrs.get('pattern', instance.pattern if instance else '')
+        error = pattern_error(match_type, pattern)
+        if error:
+            raise serializers.ValidationError({'pattern': error})
+        min_amount = attrs.get('min_amount', instance.min_amount if instance else None)
+        max_amount = attrs.get('max_amount', instance.max_amount if instance else None)
+        if min_amount is not None and max_amount is not None and min_amount > max_amount:
+            raise serializers.ValidationError({'max_amount': 'Must not be less than min_amount.'})
+        return attrs
 
 class BudgetPeriodSerializer(serializers.ModelSerializer):
     class Meta:
         model = BudgetPeriod
         fields = ['id', 'name', 'period_type', 'start_date', 'end_date', 'is_active', 'created_at']
         read_only_fields = ['id', 'created_at']
+    
+    def validate(self, attrs):
+        # DRF skips the conditional unique constraints because `user` is not a
+        # serializer field, so check the one that applies to this period here
+        instance = self.instance
+        period_type = attrs.get('period_type', instance.period_type if instance else 'monthly')
+        start_date = attrs.get('start_date', instance.start_date if instance else None)
+        duplicates = BudgetPeriod.objects.filter(
+            user=instance.user_id if instance else None, period_type=period_type, start_date=start_date,
+        )
+        if instance:
+            duplicates = duplicates.exclude(pk=instance.pk)
+        if duplicates.exists():
+            raise serializers.ValidationError(
+                {'start_date': 'A budget period of this type already starts on this date.'})
+        return attrs
 
 class RecurringTransactionSerializer(serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
@@ -37,6 +89,48 @@ class TransactionSerializer(serializers.ModelSerializer):
                  'recurring_transaction_name', 'created_at']
         read_only_fields = ['id', 'created_at']
 
+COLUMN_FIELDS = ['id', 'type', 'category', 'amount', 'description', 'date', 'budget_period',
+                 'recurring_transaction', 'created_at']
+
+def transaction_columns(transactions):
+    """
+    Compact form of a page of transactions: one array per field, with the
+    related categories, budget periods and recurring transactions listed once
+    in lookup tables keyed by id instead of being repeated on every row.
+    """
+    amount_field = serializers.DecimalField(max_digits=10, decimal_places=2)
+    date_field = serializers.DateField()
+    datetime_field = serializers.DateTimeField()
+    
+    columns = {field: [] for field in COLUMN_FIELDS}
+    for transaction in transactions:
+        columns['id'].append(transaction.pk)
+        columns['type'].append(transaction.type)
+        columns['category'].append(transaction.category_id)
+        columns['amount'].append(amount_field.to_representation(transaction.amount))
+        columns['description'].append(transaction.description)
+        columns['date'].append(date_field.to_representation(transaction.date))
+        columns['budget_period'].append(transaction.budget_period_id)
+        columns['recurring_transaction'].append(transaction.recurring_transaction_id)
+        columns['created_at'].append(datetime_field.to_representation(transaction.created_at))
+    
+    def lookup(model, column, fields):
+        ids = {pk for pk in columns[column] if pk is not None}
+        if not ids:
+            return {}
+        return {
+            str(row.pop('id')): row
+            for row in model.objects.filter(pk__in=ids).order_by().values('id', *fields)
+        }
+    
+    return {
+        'count': len(columns['id']),
+        'columns': columns,
+        'categories': lookup(Category, 'category', ('name', 'color', 'type')),
+        'budget_periods': lookup(BudgetPeriod, 'budget_period', ('name',)),
+        'recurring_transactions': lookup(RecurringTransaction, 'recurring_transaction', ('name',)),
+    }
+
 class BudgetSerializer(serializers.ModelSerializer):
     budget_period_name = serializers.CharField(source='budget_period.name', read_only=True)
     
@@ -54,3 +148,111 @@ class GoalSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'description', 'target_amount', 'current_amount', 'target_date', 
                  'completed', 'progress_percentage', 'created_at', 'updated_at']
         read_only_fields = ['id', 'completed', 'progress_percentage', 'created_at', 'updated_at']
+
+
+class CachedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Primary key field that resolves ids from a {pk: instance} map in the
+    serializer context instead of issuing one query per value.
+    """
+    
+    def __init__(self, context_key, **kwargs):
+        self.context_key = context_key
+        super().__init__(**kwargs)
+    
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return self.context[self.context_key][pk]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+
+class BatchTransactionSerializer(TransactionSerializer):
+    category = CachedPrimaryKeyRelatedField('categories', queryset=Category.objects.all())
+    budget_period = CachedPrimaryKeyRelatedField(
+        'budget_periods', queryset=BudgetPeriod.objects.all(), allow_null=True, required=False)
+    recurring_transaction = CachedPrimaryKeyRelatedField(
+        'recurring_transactions', queryset=RecurringTransaction.objects.all(), allow_null=True, default=None)
+
+class TransactionOperationListSerializer(serializers.ListSerializer):
+    def validate(self, attrs):
+        seen = set()
+        for operation in attrs:
+            if operation['op'] == 'create':
+                continue
+            if operation['id'] in seen:
+                raise serializers.ValidationError(
+                    f"Transaction {operation['id']} appears in more than one operation.")
+            seen.add(operation['id'])
+        self._default_budget_periods([
+            operation['validated'] for operation in attrs
+            if operation['op'] == 'create' and operation['validated'].get('budget_period') is None
+        ])
+        return attrs
+    
+    def _default_budget_periods(self, creates):
+        """Give creates without a budget period the one containing their date, generating the calendar ahead"""
+        if not creates:
+            return
+        periods.extend_calendar(max(validated['date'] for validated in creates))
+        period_ids = periods.resolve_many([validated['date'] for validated in creates])
+        budget_periods = self.context['budget_periods']
+        missing = set(period_ids) - set(budget_periods) - {None}
+        if missing:
+            budget_periods.update(BudgetPeriod.objects.in_bulk(list(missing)))
+        for validated, period_id in zip(creates, period_ids):
+            if period_id is None:
+                continue
+            if period_id not in budget_periods:
+                raise serializers.ValidationError(f'Budget period {period_id} not found.')
+            validated['budget_period'] = budget_periods[period_id]
+
+class TransactionOperationSerializer(serializers.Serializer):
+    """
+    One operation of a /transactions/batch/ request:
+        {"op": "create", "data": {...}}
+        {"op": "update", "id": 12, "data": {...partial fields...}}
+        {"op": "delete", "id": 12}
+    """
+    op = serializers.ChoiceField(choices=['create', 'update', 'delete'])
+    id = serializers.IntegerField(required=False)
+    data = serializers.DictField(required=False)
+    
+    class Meta:
+        list_serializer_class = TransactionOperationListSerializer
+    
+    def validate(self, attrs):
+        op = attrs['op']
+        if op != 'create':
+            instance = self.context['instances'].get(attrs.get('id'))
+            if instance is None:
+                raise serializers.ValidationError({'id': 'Transaction not found.'})
+            attrs['instance'] = instance
+        
+        if op == 'delete':
+            return attrs
+        
+        if 'data' not in attrs:
+            raise serializers.ValidationError({'data': 'This field is required.'})
+        
+        transaction_serializer = BatchTransactionSerializer(
+            attrs.get('instance'),
+            data=attrs['data'],
+            partial=(op == 'update'),
+            context=self.context,
+        )
+        if not transaction_serializer.is_valid():
+            raise serializers.ValidationError({'data': transaction_serializer.errors})
+        attrs['validated'] = transaction_serializer.validated_data
+        return attrs
+
+class CategorizeItemSerializer(serializers.Serializer):
+    """One transaction to categorize in a /transactions/categorize/ request"""
+    description = serializers.CharField(max_length=200)
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, allow_null=True)
+    type = serializers.ChoiceField(choices=Transaction.TRANSACTION_TYPES, default='expense')
@@ -0,0 +1,77 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import fulltext, periods
+from .caching import (BUDGET_PERIODS_SCOPE, BUDGETS_SCOPE, CATEGORIES_SCOPE, CATEGORY_RULES_SCOPE, GOALS_SCOPE,
+                      LEDGER_SCOPE, RECURRING_SCOPE, TRANSACTIONS_SCOPE, bump_on_commit, month_scope)
+from .models import (Budget, BudgetPeriod, Category, CategoryRule, Goal, MonthlyRollup, RecurringTransaction,
+                     Transaction)
+from .rollups import apply_deltas, deltas_from_queryset
+
+
+# Cascading deletes from these parents fast-delete transactions without going
+# through TransactionQuerySet, so remove their totals from the rollup first.
+# Category and BudgetPeriod need no handler: their rollup rows cascade with them.
+
+@receiver(pre_delete, sender=RecurringTransaction)
+def remove_recurring_transactions_from_rollup(sender, instance, **kwargs):
+    apply_deltas(deltas_from_queryset(Transaction.objects.filter(recurring_transaction=instance), sign=-1))
+
+
+@receiver(pre_delete, sender=User)
+def remove_user_transactions_from_rollup(sender, instance, **kwargs):
+    apply_deltas(deltas_from_queryset(Transaction.objects.filter(user=instance), sign=-1))
+
+
+
+# Cache invalidation for the summary endpoints (see caching.py). Ledger writes
+# bump their scopes from apply_deltas, which sees every write path including
+# the bulk ones that send no model signals.
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_categories(sender, **kwargs):
+    bump_on_commit([CATEGORIES_SCOPE])
+
+
+@receiver([post_save, post_delete], sender=BudgetPeriod)
+def invalidate_budget_periods(sender, **kwargs):
+    periods.invalidate()
+    bump_on_commit([BUDGET_PERIODS_SCOPE])
+
+
+@receiver([post_save, post_delete], sender=Budget)
+def invalidate_budgets(sender, **kwargs):
+    bump_on_commit([BUDGETS_SCOPE])
+
+
+@receiver([post_save, post_delete], sender=RecurringTransaction)
+def invalidate_recurring(sender, **kwargs):
+    bump_on_commit([RECURRING_SCOPE])
+
+
+@receiver([post_save, post_delete], sender=Goal)
+def invalidate_goals(sender, **kwargs):
+    bump_on_commit([GOALS_SCOPE])
+
+
+@receiver([post_save, post_delete], sender=CategoryRule)
+def invalidate_category_rules(sender, **kwargs):
+    bump_on_commit([CATEGORY_RULES_SCOPE])
+
+
+@receiver(pre_delete, sender=Category)
+@receiver(pre_delete, sender=BudgetPeriod)
+def invalidate_cascaded_months(sender, instance, **kwargs):
+    # Transactions and rollup rows cascade away with these without reaching
+    # apply_deltas, so bump the months they covered here.
+    field = 'category' if sender is Category else 'budget_period'
+    months = MonthlyRollup.objects.filter(**{field: instance}).values_list('month', flat=True).distinct()
+    bump_on_commit([TRANSACTIONS_SCOPE, LEDGER_SCOPE] + [month_scope(month) for month in months])
+
+
+# Table rebuilds in later migrations drop the search index triggers
+@receiver(post_migrate)
+def ensure_search_index(sender, using, **kwargs):
+    if sender.name == 'finance':
+        fulltext.ensure_index(using)
@@ -0,0 +1,175 @@
+"""
+Deterministic synthetic ledgers for benchmarks and local load testing.
+
+`seed()` creates users, the default categories, a monthly budget period
+calendar with a budget each, a few recurring rules per user (whose
+occurrences come from `recurring.process_due`), and then day-to-day spending
+and income until the ledger holds the requested number of transactions. The
+same seed, size and end date always produce the same rows.
+
+Day-to-day transactions are generated in date order as plain tuples and
+written with one executemany INSERT per batch, skipping model instances
+altogether (the ORM's bulk_create costs ~0.2 ms per row, which is most of
+the time at millions of rows). Each batch moves the MonthlyRollup in the
+same DB transaction, the way bulk_create does, and since batches are in
+date order each touches only a few rollup rows.
+"""
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import periods, recurring, rollups
+from .analytics import add_months
+from .models import Budget, BudgetPeriod, Category, RecurringTransaction, Transaction
+
+BATCH_SIZE = 5000
+
+INSERT_COLUMNS = ('user_id', 'type', 'category_id', 'amount', 'description', 'date',
+                  'budget_period_id', 'created_at', 'updated_at')
+
+# name, type, color, relative frequency, (min, max) amount
+CATEGORIES = (
+    ('salary', 'income', '#10b981', 0, (2500, 6000)),
+    ('freelance', 'income', '#3b82f6', 2, (150, 1500)),
+    ('investments', 'income', '#8b5cf6', 1, (20, 400)),
+    ('gifts', 'income', '#ec4899', 1, (20, 200)),
+    ('food', 'expense', '#ef4444', 40, (4, 90)),
+    ('transportation', 'expense', '#f97316', 15, (2, 60)),
+    ('entertainment', 'expense', '#f59e0b', 8, (8, 120)),
+    ('shopping', 'expense', '#84cc16', 10, (10, 300)),
+    ('healthcare', 'expense', '#06b6d4', 3, (15, 250)),
+    ('education', 'expense', '#8b5cf6', 2, (10, 400)),
+    ('travel', 'expense', '#ec4899', 2, (60, 1500)),
+    ('utilities', 'expense', '#f59e0b', 4, (30, 200)),
+    ('other', 'expense', '#6b7280', 5, (1, 150)),
+)
+
+DESCRIPTIONS = {
+    'freelance': ('Client invoice', 'Consulting', 'Design project'),
+    'investments': ('Dividend', 'Interest', 'Fund distribution'),
+    'gifts': ('Birthday gift', 'Gift'),
+    'food': ('Grocery store', 'Coffee shop', 'Restaurant', 'Bakery', 'Takeaway'),
+    'transportation': ('Metro ticket', 'Fuel', 'Taxi', 'Parking'),
+    'entertainment': ('Cinema', 'Concert tickets', 'Streaming service', 'Board games'),
+    'shopping': ('Clothing store', 'Online order', 'Electronics', 'Bookshop'),
+    'healthcare': ('Pharmacy', 'Dentist', 'Doctor visit'),
+    'education': ('Online course', 'Textbooks'),
+    'travel': ('Flight', 'Hotel', 'Train ticket'),
+    'utilities': ('Electricity bill', 'Water bill', 'Internet', 'Phone bill'),
+    'other': ('Bank fee', 'Charity', 'Miscellaneous'),
+}
+
+# name, category, frequency, amount, description
+RECURRING_RULES = (
+    ('Salary', 'salary', 'monthly', Decimal('4200.00'), 'Monthly salary'),
+    ('Rent', 'utilities', 'monthly', Decimal('1350.00'), 'Rent'),
+    ('Gym', 'entertainment', 'monthly', Decimal('39.90'), 'Gym membership'),
+    ('Insurance', 'healthcare', 'quarterly', Decimal('210.00'), 'Health insurance'),
+)
+
+
+def ensure_categories():
+    """The shared default categories by name, created where missing"""
+    existing = {category.name: category for category in Category.objects.filter(user=None)}
+    missing = [
+        Category(name=name, type=type_, color=color, is_custom=False)
+        for name, type_, color, _, _ in CATEGORIES
+        if name not in existing
+    ]
+    Category.objects.bulk_create(missing)
+    return {category.name: category for category in Category.objects.filter(user=None)}
+
+
+def _budgets(start, end):
+    """One budget per monthly period in [start, end] that has none yet"""
+    budgeted = Budget.objects.values_list('budget_period_id', flat=True)
+    new_budgets = []
+    for period in BudgetPeriod.objects.filter(
+            period_type='monthly', start_date__gte=start, start_date__lte=end).exclude(id__in=budgeted):
+        income = Decimal('5000.00')
+        # bulk_create skips Budget.save, so apply its 50/30/20 split here
+        new_budgets.append(Budget(
+            budget_period=period, monthly_income=income, needs_budget=income * Decimal('0.50'),
+            wants_budget=income * Decimal('0.30'), savings_goal=income * Decimal('0.20'),
+        ))
+    Budget.objects.bulk_create(new_budgets)
+
+
+def _insert(rows):
+    """INSERT `rows` (tuples in INSERT_COLUMNS order, less the timestamps) and update the rollup"""
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        connection.ops.quote_name(Transaction._meta.db_table),
+        ', '.join(connection.ops.quote_name(column) for column in INSERT_COLUMNS),
+        ', '.join(['%s'] * len(INSERT_COLUMNS)),
+    )
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, [(*row[:3], str(row[3]), *row[4:], now, now) for row in rows])
+        rollups.apply_deltas(rollups.deltas_from_rows(
+            {'type': row[1], 'category_id': row[2], 'amount': row[3], 'date': row[5], 'budget_period_id': row[6]}
+            for row in rows
+        ))
+
+
+def seed(size, seed=0, users=3, end=None, months=24, progress=None):
+    """
+    Add `size` transactions ending on `end` (default today) and spread over
+    `months` months, together with everything they refer to. `progress` is
+    called with the running count after every batch. Returns the number of
+    transactions created.
+    """
+    rng = random.Random(seed)
+    end = end or timezone.now().date()
+    start = add_months(end.replace(day=1), 1 - months)
+
+    owners = [
+        User.objects.get_or_create(username=f'synthetic-{seed}-{index}')[0]
+        for index in range(users)
+    ]
+    categories = ensure_categories()
+    periods.generate_calendar('monthly', ahead=months - 1, start=start)
+    _budgets(start, end)
+
+    created = 0
+    with transaction.atomic():
+        rules = [
+            RecurringTransaction(
+                user=owner, name=name, type=categories[category].type, category=categories[category],
+                amount=amount, description=description, frequency=frequency,
+                start_date=start, next_occurrence=start,
+            )
+            for owner in owners
+            for name, category, frequency, amount, description in RECURRING_RULES
+        ]
+        RecurringTransaction.objects.bulk_create(rules)
+        created += recurring.process_due(end)['transactions_created']
+
+    weighted = [entry for entry in CATEGORIES if entry[3]]
+    weights = [entry[3] for entry in weighted]
+    days = (end - start).days + 1
+    remaining = max(size - created, 0)
+
+    # Spread the remaining rows evenly over the days, in date order
+    batch = []
+    for position in range(remaining):
+        day = start + timedelta(days=position * days // remaining)
+        name, type_, _, _, (low, high) = rng.choices(weighted, weights)[0]
+        batch.append([
+            rng.choice(owners).id, type_, categories[name].id,
+            Decimal(rng.randrange(low * 100, high * 100 + 1)) / 100,
+            rng.choice(DESCRIPTIONS[name]), day, None,
+        ])
+        if len(batch) == BATCH_SIZE or position == remaining - 1:
+            for row, period_id in zip(batch, periods.resolve_many(row[5] for row in batch)):
+                row[6] = period_id
+            _insert(batch)
+            created += len(batch)
+            batch = []
+            if progress:
+                progress(created)
+    return created
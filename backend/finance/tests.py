@@ -1,3 +1,1875 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import json
+import random
+import re
+import tempfile
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.admin.sites import site as admin_site
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError, connection, connections
+from django.db.utils import ConnectionHandler
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from . import (benchmarks, caching, categorizer, database, fanout, fulltext, importers, loadtest, metrics, periods,
+               profiling, recurring, rollups, synthetic)
+from .analytics import add_months
+from .middleware import brotli
+from .models import (Budget, BudgetPeriod, Category, CategoryRule, Goal, MonthlyRollup, RecurringTransaction,
+                     Transaction)
+from .renderers import ORJSONRenderer
+from .rollups import month_end, month_start
+from .serializers import TransactionSerializer
+
+
+def clear_caches():
+    # Version tokens live in files that outlast each test's rolled back transaction
+    cache.clear()
+    caching.version_store().clear()
+
+
+class TransactionListTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.food = Category.objects.create(name='food', type='expense')
+        self.salary = Category.objects.create(name='salary', type='income')
+        start = date(2024, 1, 1)
+        for i in range(12):
+            Transaction.objects.create(
+                type='expense',
+                category=self.food,
+                amount=Decimal('10.00') + i,
+                description=f'Groceries {i}',
+                date=start + timedelta(days=i // 3),
+            )
+        Transaction.objects.create(
+            type='income', category=self.salary, amount=Decimal('3000.00'),
+            description='Salary', date=date(2024, 1, 31),
+        )
+
+    def test_cursor_pages_cover_ledger_without_overlap(self):
+        seen = []
+        url = '/api/transactions/?page_size=5'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+
+        expected = list(Transaction.objects.order_by('-date', '-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_previous_link_returns_preceding_page(self):
+        first = self.client.get('/api/transactions/?page_size=4').data
+        self.assertIsNone(first['previous'])
+        second = self.client.get(first['next']).data
+        back = self.client.get(second['previous']).data
+        self.assertEqual(
+            [row['id'] for row in back['results']],
+            [row['id'] for row in first['results']],
+        )
+
+    def test_filters(self):
+        response = self.client.get('/api/transactions/', {'type': 'income'})
+        self.assertEqual([row['description'] for row in response.data['results']], ['Salary'])
+
+        response = self.client.get('/api/transactions/', {
+            'date_from': '2024-01-02', 'date_to': '2024-01-03', 'min_amount': '15',
+        })
+        self.assertEqual(len(response.data['results']), 4)
+
+        response = self.client.get('/api/transactions/', {'category': f'{self.salary.id},{self.food.id}'})
+        self.assertEqual(len(response.data['results']), 13)
+
+    def test_invalid_filter_is_rejected(self):
+        response = self.client.get('/api/transactions/', {'date_from': '2024-02-30', 'max_amount': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('date_from', response.data)
+        self.assertIn('max_amount', response.data)
+
+    def test_invalid_cursor_is_404(self):
+        response = self.client.get('/api/transactions/', {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_list_query_count_does_not_grow_with_rows(self):
+        period = BudgetPeriod.objects.create(name='Jan', start_date=date(2024, 1, 1), end_date=date(2024, 1, 31))
+        for i in range(20):
+            category = Category.objects.create(name=f'extra {i}', type='expense')
+            rule = RecurringTransaction.objects.create(
+                name=f'rule {i}', type='expense', category=category, amount=Decimal('1'),
+                description='rule', frequency='monthly', start_date=date(2024, 1, 1),
+                next_occurrence=date(2024, 2, 1),
+            )
+            Transaction.objects.create(
+                type='expense', category=category, amount=Decimal('1'), description='linked',
+                date=date(2024, 1, 20), budget_period=period, recurring_transaction=rule,
+            )
+
+        clear_caches()
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/transactions/', {'page_size': 100})
+        self.assertEqual(len(response.data['results']), 33)
+        linked = [row for row in response.data['results'] if row['description'] == 'linked']
+        self.assertEqual({row['budget_period_name'] for row in linked}, {'Jan'})
+
+        # The page plus one lookup each for categories, budget periods and recurring transactions
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/transactions/', {'page_size': 100, 'shape': 'columns'})
+        self.assertEqual(response.data['results']['count'], 33)
+        self.assertEqual(len(response.data['results']['categories']), 22)
+
+    def test_columns_shape_matches_rows(self):
+        rows = self.client.get('/api/transactions/', {'page_size': 5}).data
+        columns = self.client.get('/api/transactions/', {'page_size': 5, 'shape': 'columns'}).data
+        self.assertEqual(columns['next'].replace('&shape=columns', ''), rows['next'])
+
+        table = columns['results']
+        for index, row in enumerate(rows['results']):
+            for field in ('id', 'type', 'category', 'amount', 'description', 'date', 'created_at'):
+                self.assertEqual(table['columns'][field][index], row[field])
+            category = table['categories'][str(row['category'])]
+            self.assertEqual((category['name'], category['color']), (row['category_name'], row['category_color']))
+        self.assertEqual((table['budget_periods'], table['recurring_transactions']), ({}, {}))
+
+        self.assertEqual(self.client.get('/api/transactions/', {'shape': 'table'}).status_code, 400)
+
+
+class AnalyticsTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.food = Category.objects.create(name='food', type='expense', color='#ef4444')
+        self.rent = Category.objects.create(name='rent', type='expense', color='#8b5cf6')
+        self.salary = Category.objects.create(name='salary', type='income')
+
+    def add(self, category, amount, day):
+        return Transaction.objects.create(
+            type=category.type, category=category, amount=Decimal(amount),
+            description=category.name, date=day,
+        )
+
+    def test_custom_range_aggregates(self):
+        self.add(self.salary, '3000', date(2024, 1, 31))
+        self.add(self.food, '100', date(2024, 1, 5))
+        self.add(self.rent, '1200', date(2024, 2, 1))
+        self.add(self.food, '50', date(2024, 2, 20))
+        self.add(self.food, '999', date(2024, 3, 1))  # outside the range
+
+        response = self.client.get('/api/transactions/analytics/', {
+            'range': 'custom', 'date_from': '2024-01-01', 'date_to': '2024-02-29',
+        })
+        self.assertEqual(response.status_code, 200)
+        data = response.data
+        self.assertEqual(data['monthlyTrend'], [
+            {'month': 'Jan 2024', 'income': 3000.0, 'expenses': 100.0},
+            {'month': 'Feb 2024', 'income': 0, 'expenses': 1250.0},
+        ])
+        self.assertEqual(
+            [(row['name'], row['amount']) for row in data['categoryBreakdown']],
+            [('rent', 1200.0), ('food', 150.0)],
+        )
+        insights = data['insights']
+        self.assertEqual(insights['totalExpenses'], 1350.0)
+        self.assertEqual(insights['netWorthChange'], 1650.0)
+        self.assertEqual(insights['avgMonthlySpending'], 675.0)
+        self.assertEqual(insights['largestCategory'], {'category': 'rent', 'amount': 1200.0})
+
+    def test_summary_endpoints_read_current_month(self):
+        today = timezone.now().date()
+        self.add(self.salary, '3000', today)
+        self.add(self.food, '100', today)
+        self.add(self.rent, '900', today.replace(day=1))
+
+        summary = self.client.get('/api/transactions/monthly_summary/').data
+        self.assertEqual(summary['monthly_income'], 3000.0)
+        self.assertEqual(summary['monthly_expenses'], 1000.0)
+        self.assertEqual(summary['expense_breakdown']['rent'], {'amount': 900.0, 'color': '#8b5cf6', 'count': 1})
+        self.assertEqual(list(summary['income_breakdown']), ['salary'])
+        self.assertEqual(summary['transaction_count'], 3)
+
+        trend = self.client.get('/api/transactions/six_month_trend/').data
+        self.assertEqual(len(trend), 6)
+        self.assertEqual(trend[-1]['savings'], 2000.0)
+
+        report = self.client.get('/api/budget/report_data/').data
+        self.assertEqual(report['analytics']['insights']['totalExpenses'], 1000.0)
+
+    def test_invalid_range(self):
+        self.assertEqual(self.client.get('/api/transactions/analytics/', {'range': '5y'}).status_code, 400)
+        response = self.client.get('/api/transactions/analytics/', {'range': 'custom', 'date_from': '2024-01-01'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ReportDataTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.food = Category.objects.create(name='food', type='expense')
+        self.today = timezone.now().date()
+
+    def add(self, amount, day):
+        return Transaction.objects.create(
+            type='expense', category=self.food, amount=Decimal(amount), description='food', date=day,
+        )
+
+    def report(self, **params):
+        response = self.client.get('/api/budget/report_data/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_range_uses_calendar_months(self):
+        period = self.report(months_back=2)['period']
+        self.assertEqual(period['start_date'], add_months(self.today, -2).isoformat())
+        self.assertEqual(period['end_date'], self.today.isoformat())
+
+        budget_period = BudgetPeriod.objects.create(
+            name='Q1', start_date=date(2024, 1, 1), end_date=date(2024, 3, 31),
+        )
+        self.add('10', date(2024, 2, 10))
+        report = self.report(period_id=budget_period.id)
+        self.assertEqual(report['period']['start_date'], '2024-01-01')
+        self.assertEqual(report['analytics']['insights']['avgMonthlySpending'], 10 / 3)
+
+        self.assertEqual(self.client.get('/api/budget/report_data/', {'months_back': 'x'}).status_code, 400)
+
+    def test_cached_until_a_write_touches_the_range(self):
+        self.add('40', self.today)
+        self.assertEqual(self.report()['analytics']['insights']['totalExpenses'], 40.0)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.report()
+        self.assertFalse(any('finance_monthlyrollup' in query['sql'] for query in queries))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add('2', self.today)
+        self.assertEqual(self.report()['analytics']['insights']['totalExpenses'], 42.0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.food.name = 'groceries'
+            self.food.save()
+        self.assertEqual(self.report()['analytics']['categoryBreakdown'][0]['name'], 'groceries')
+
+    def test_detail_rows_are_keyset_paginated(self):
+        for day in range(60):
+            self.add('1', self.today - timedelta(days=day % 20))
+
+        first = self.report()
+        self.assertEqual(len(first['transactions']), 50)
+        self.assertIsNotNone(first['transactions_next'])
+
+        rest = self.client.get(first['transactions_next']).data
+        self.assertEqual(len(rest['transactions']), 10)
+        self.assertIsNone(rest['transactions_next'])
+        seen = {row['id'] for row in first['transactions'] + rest['transactions']}
+        self.assertEqual(len(seen), 60)
+
+
+class SummaryCacheTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        caching.stats.clear()
+        self.client = APIClient()
+        self.food = Category.objects.create(name='food', type='expense')
+        self.today = timezone.now().date()
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_repeat_loads_run_no_sql_until_a_write_commits(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Transaction.objects.create(
+                type='expense', category=self.food, amount=Decimal('8'), description='x', date=self.today,
+            )
+        self.assertEqual(self.get('/api/transactions/monthly_summary/')['X-Cache'], 'miss')
+        with self.assertNumQueries(0):
+            response = self.get('/api/transactions/monthly_summary/')
+        self.assertEqual((response['X-Cache'], response.data['monthly_expenses']), ('hit', 8.0))
+
+        # Bulk writes send no model signals but still invalidate through the rollup
+        with self.captureOnCommitCallbacks(execute=True):
+            Transaction.objects.update(amount=Decimal('5'))
+        response = self.get('/api/transactions/monthly_summary/')
+        self.assertEqual((response['X-Cache'], response.data['monthly_expenses']), ('miss', 5.0))
+        self.assertEqual(caching.cache_stats()['monthly_summary'], {'hits': 1, 'misses': 2})
+
+    def test_model_signals_bump_their_scopes(self):
+        self.get('/api/categories/by_type/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.get('/api/budget/current_budget/').data['monthly_income'], '5000.00')
+        self.assertEqual(self.get('/api/categories/by_type/')['X-Cache'], 'hit')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name='salary', type='income')
+        self.assertEqual(len(self.get('/api/categories/by_type/').data['income']), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/budget/update_income/', {'monthly_income': 7000}, format='json')
+        response = self.get('/api/budget/current_budget/')
+        self.assertEqual((response['X-Cache'], response.data['monthly_income']), ('miss', '7000.00'))
+
+    def test_bumps_from_other_processes_invalidate(self):
+        # Another instance on the same files stands in for another worker, or a cron job
+        other_process = caches.create_connection(caching.VERSIONS_CACHE)
+        self.assertIsNot(other_process, caching.version_store())
+        computed = []
+
+        def compute():
+            computed.append(None)
+            return len(computed)
+
+        self.assertEqual(caching.cached('shared', [caching.GOALS_SCOPE], compute), 1)
+        self.assertEqual(caching.cached('shared', [caching.GOALS_SCOPE], compute), 1)
+        with mock.patch.object(caching, 'version_store', return_value=other_process):
+            caching.bump([caching.GOALS_SCOPE])
+        self.assertEqual(caching.cached('shared', [caching.GOALS_SCOPE], compute), 2)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.food = Category.objects.create(name='food', type='expense')
+        self.transaction = Transaction.objects.create(
+            type='expense', category=self.food, amount=Decimal('3'), description='tea', date=date(2024, 1, 2),
+        )
+
+    def revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_list_returns_304_without_queries(self):
+        for url in ('/api/transactions/', '/api/categories/', '/api/goals/', '/api/transactions/monthly_summary/'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('Last-Modified', response)
+            with self.assertNumQueries(0):
+                self.assertEqual(self.revalidate(url, response).status_code, 304)
+
+    def test_any_transaction_write_changes_the_etag(self):
+        response = self.client.get('/api/transactions/')
+
+        # A description-only edit leaves every total alone but still counts
+        with self.captureOnCommitCallbacks(execute=True):
+            self.transaction.description = 'green tea'
+            self.transaction.save()
+        changed = self.revalidate('/api/transactions/', response)
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.data['results'][0]['description'], 'green tea')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.food.name = 'drinks'
+            self.food.save()
+        self.assertEqual(self.revalidate('/api/transactions/', changed).status_code, 200)
+
+        other_page = self.client.get('/api/transactions/', {'type': 'income'}, HTTP_IF_NONE_MATCH=changed['ETag'])
+        self.assertEqual(other_page.status_code, 200)
+
+
+class MonthlyRollupTests(TestCase):
+    def setUp(self):
+        self.food = Category.objects.create(name='food', type='expense')
+        self.rent = Category.objects.create(name='rent', type='expense')
+        self.period = BudgetPeriod.objects.create(
+            name='Jan', start_date=date(2024, 1, 1), end_date=date(2024, 1, 31),
+        )
+
+    def add(self, amount, day, category=None, **kwargs):
+        return Transaction.objects.create(
+            type='expense', category=category or self.food, amount=Decimal(amount),
+            description='test', date=day, **kwargs,
+        )
+
+    def assertRollupMatchesLedger(self):
+        self.assertEqual(rollups.verify(), [])
+
+    def test_save_and_delete_keep_rollup_in_sync(self):
+        first = self.add('10.00', date(2024, 1, 5), budget_period=self.period)
+        self.add('5.50', date(2024, 1, 20), budget_period=self.period)
+        row = MonthlyRollup.objects.get()
+        self.assertEqual((row.total, row.count), (Decimal('15.50'), 2))
+
+        first.date = date(2024, 2, 1)
+        first.category = self.rent
+        first.amount = Decimal('12.00')
+        first.save()
+        self.assertEqual(MonthlyRollup.objects.count(), 2)
+        self.assertRollupMatchesLedger()
+
+        first.delete()
+        row = MonthlyRollup.objects.get()
+        self.assertEqual((row.month, row.total, row.count), (date(2024, 1, 1), Decimal('5.50'), 1))
+
+    def test_bulk_operations_keep_rollup_in_sync(self):
+        Transaction.objects.bulk_create([
+            Transaction(type='expense', category=self.food, amount=Decimal(i), description='bulk', date=date(2024, 1, i + 1))
+            for i in range(1, 6)
+        ])
+        self.assertRollupMatchesLedger()
+
+        Transaction.objects.filter(date__lte=date(2024, 1, 3)).update(budget_period=self.period)
+        self.assertRollupMatchesLedger()
+
+        Transaction.objects.filter(amount__gte=4).update(amount=Decimal('1.00'), category=self.rent)
+        self.assertRollupMatchesLedger()
+
+        rows = list(Transaction.objects.all())
+        for row in rows:
+            row.date = date(2024, 3, row.date.day)
+        Transaction.objects.bulk_update(rows, ['date'])
+        self.assertRollupMatchesLedger()
+
+        Transaction.objects.filter(category=self.rent).delete()
+        self.assertRollupMatchesLedger()
+
+    def test_updates_with_date_strings_and_primary_keys(self):
+        self.add('10.00', date(2024, 1, 5))
+        self.add('5.00', date(2024, 1, 6))
+        for values in ({'date': '2024-05-01'}, {'category': self.rent.id}, {'category_id': str(self.food.id)},
+                       {'budget_period': str(self.period.id)}, {'budget_period_id': None}, {'amount': '2.5'}):
+            with self.subTest(values=values):
+                Transaction.objects.filter(amount__gte=5).update(**values)
+                self.assertRollupMatchesLedger()
+        row = MonthlyRollup.objects.get()
+        self.assertEqual((row.month, row.category_id, row.total, row.count),
+                         (date(2024, 5, 1), self.food.id, Decimal('5.00'), 2))
+
+    def test_cascading_deletes(self):
+        rule = RecurringTransaction.objects.create(
+            name='Gym', type='expense', category=self.food, amount=Decimal('30'), description='Gym',
+            frequency='monthly', start_date=date(2024, 1, 1), next_occurrence=date(2024, 1, 1),
+        )
+        self.add('30', date(2024, 1, 1), recurring_transaction=rule)
+        self.add('20', date(2024, 1, 2), budget_period=self.period)
+        self.add('40', date(2024, 1, 3), category=self.rent)
+
+        rule.delete()
+        self.assertRollupMatchesLedger()
+        self.period.delete()
+        self.assertRollupMatchesLedger()
+        self.rent.delete()
+        self.assertRollupMatchesLedger()
+        self.assertFalse(MonthlyRollup.objects.exists())
+
+    def test_summarize_combines_whole_and_partial_months(self):
+        self.add('1', date(2024, 1, 10))
+        self.add('2', date(2024, 1, 20))
+        self.add('4', date(2024, 2, 15))
+        self.add('8', date(2024, 3, 5))
+        self.add('16', date(2024, 3, 25))
+
+        def total(start, end):
+            return sum(row['total'] for row in rollups.summarize(start, end, fields=('type',)))
+
+        self.assertEqual(total(date(2024, 1, 15), date(2024, 3, 10)), Decimal('14'))
+        self.assertEqual(total(date(2024, 1, 1), date(2024, 2, 29)), Decimal('7'))
+        self.assertEqual(total(date(2024, 3, 2), date(2024, 3, 20)), Decimal('8'))
+        self.assertEqual(total(None, None), Decimal('31'))
+
+    def test_rebuild_command(self):
+        self.add('10', date(2024, 1, 5))
+        MonthlyRollup.objects.update(total=Decimal('999'))
+        self.assertEqual(len(rollups.verify()), 1)
+
+        call_command('rebuild_rollups', stdout=StringIO())
+        self.assertRollupMatchesLedger()
+
+
+class TrendTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.food = Category.objects.create(name='food', type='expense')
+        self.salary = Category.objects.create(name='salary', type='income')
+
+    def add(self, category, amount, day):
+        Transaction.objects.create(
+            type=category.type, category=category, amount=Decimal(amount), description='x', date=day,
+        )
+
+    def test_buckets_are_calendar_months_and_zero_filled(self):
+        today = timezone.now().date()
+        this_month = today.replace(day=1)
+        self.add(self.salary, '1000', this_month)
+        self.add(self.food, '250', this_month)
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/transactions/trend/', {'months': 24})
+        buckets = response.data
+        self.assertEqual(len(buckets), 24)
+        self.assertEqual(len({bucket['period'] for bucket in buckets}), 24)
+        self.assertEqual(buckets[-1]['period'], this_month.isoformat())
+        self.assertEqual(buckets[-1]['savings'], 750.0)
+        self.assertTrue(all(bucket['income'] == 0 for bucket in buckets[:-1]))
+
+    def test_week_and_quarter_granularity(self):
+        today = timezone.now().date()
+        self.add(self.food, '40', today)
+
+        weeks = self.client.get('/api/transactions/trend/', {'months': 3, 'granularity': 'week'}).data
+        self.assertTrue(12 <= len(weeks) <= 15)
+        self.assertEqual(sum(bucket['expenses'] for bucket in weeks), 40.0)
+
+        quarters = self.client.get('/api/transactions/trend/', {'months': 12, 'granularity': 'quarter'}).data
+        self.assertIn(len(quarters), (4, 5))
+        self.assertTrue(all(bucket['label'].startswith('Q') for bucket in quarters))
+        self.assertEqual(quarters[-1]['expenses'], 40.0)
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get('/api/transactions/trend/', {'months': 0}).status_code, 400)
+        self.assertEqual(self.client.get('/api/transactions/trend/', {'granularity': 'day'}).status_code, 400)
+
+
+class PeriodIndexTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.food = Category.objects.create(name='food', type='expense')
+        self.year = BudgetPeriod.objects.create(
+            name='2024', period_type='yearly', start_date=date(2024, 1, 1), end_date=date(2024, 12, 31),
+        )
+        self.march = BudgetPeriod.objects.create(
+            name='March', start_date=date(2024, 3, 1), end_date=date(2024, 3, 31),
+        )
+        BudgetPeriod.objects.create(
+            name='Archived', start_date=date(2024, 6, 1), end_date=date(2024, 6, 30), is_active=False,
+        )
+
+    def test_latest_starting_active_period_wins(self):
+        days = [date(2023, 12, 31), date(2024, 2, 29), date(2024, 3, 1), date(2024, 3, 31),
+                date(2024, 4, 1), date(2024, 6, 15), date(2025, 1, 1)]
+        expected = [None, self.year.id, self.march.id, self.march.id, self.year.id, self.year.id, None]
+        with self.assertNumQueries(1):
+            self.assertEqual(periods.resolve_many(days), expected)
+        with self.assertNumQueries(0):
+            self.assertEqual([periods.resolve(day) for day in days], expected)
+
+    def test_index_follows_budget_period_changes(self):
+        self.assertEqual(periods.resolve(date(2025, 1, 5)), None)
+        next_year = BudgetPeriod.objects.create(name='2025', start_date=date(2025, 1, 1), end_date=date(2025, 12, 31))
+        self.assertEqual(periods.resolve(date(2025, 1, 5)), next_year.id)
+
+        self.march.is_active = False
+        self.march.save()
+        self.assertEqual(periods.resolve(date(2024, 3, 10)), self.year.id)
+
+    def test_new_transactions_use_the_period_of_their_own_date(self):
+        response = self.client.post('/api/transactions/', {
+            'type': 'expense', 'category': self.food.id, 'amount': '12.00',
+            'description': 'Dinner', 'date': '2024-03-05',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['budget_period'], self.march.id)
+
+        response = self.client.post('/api/transactions/batch/', {'operations': [
+            {'op': 'create', 'data': {'type': 'expense', 'category': self.food.id, 'amount': '3.00',
+                                      'description': 'Tea', 'date': '2024-04-02'}},
+        ]}, format='json')
+        self.assertEqual(response.data['results'][0]['transaction']['budget_period_name'], '2024')
+
+
+class PeriodCalendarTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.food = Category.objects.create(name='food', type='expense')
+
+    def test_calendar_is_generated_once(self):
+        created = periods.generate_calendar('quarterly', ahead=4, start=date(2024, 11, 20))
+        self.assertEqual(created, 5)
+        self.assertEqual(periods.generate_calendar('quarterly', ahead=5, start=date(2024, 11, 20)), 1)
+
+        first = BudgetPeriod.objects.order_by('start_date').first()
+        self.assertEqual(
+            (first.name, first.start_date, first.end_date),
+            ('Quarterly Budget - Q4 2024', date(2024, 10, 1), date(2024, 12, 31)),
+        )
+        self.assertEqual(periods.resolve(date(2026, 3, 31)), BudgetPeriod.objects.latest('start_date').id)
+
+    def test_reads_do_not_create_periods(self):
+        self.assertEqual(self.client.get('/api/budget-periods/current/').status_code, 404)
+        self.assertFalse(BudgetPeriod.objects.exists())
+
+        call_command('generate_periods', ahead=0, stdout=StringIO())
+        response = self.client.get('/api/budget-periods/current/')
+        self.assertEqual(response.data['start_date'], timezone.now().date().replace(day=1).isoformat())
+
+    def test_current_budget_is_created_with_the_period(self):
+        response = self.client.get('/api/budget/current_budget/')
+        self.assertEqual(response.data['monthly_income'], '5000.00')
+        period = periods.period_for(timezone.now().date())
+        self.assertEqual(response.data['budget_period'], period.id)
+        self.assertEqual(BudgetPeriod.objects.count(), 13)
+        self.assertEqual(self.client.get('/api/budget/current_budget/').data['id'], response.data['id'])
+
+    def test_writes_past_the_calendar_extend_it(self):
+        periods.generate_calendar('monthly', ahead=1, start=date(2024, 1, 1))
+        periods.get_index()
+        # Dates inside the calendar, or before it, cost no query once the index is built
+        with self.assertNumQueries(0):
+            self.assertEqual(periods.extend_calendar(date(2024, 2, 29)), 0)
+            self.assertEqual(periods.extend_calendar(date(2023, 6, 1)), 0)
+
+        response = self.client.post('/api/transactions/', {
+            'type': 'expense', 'category': self.food.id, 'amount': '5.00', 'description': 'x',
+            'date': '2024-05-10',
+        }, format='json')
+        self.assertEqual(response.data['budget_period_name'], 'Monthly Budget - May 2024')
+        self.assertEqual(BudgetPeriod.objects.latest('start_date').start_date, date(2025, 5, 1))
+        # The gap before the write stays as it was
+        self.assertIsNone(periods.resolve(date(2024, 3, 15)))
+
+    def test_process_recurring_rolls_the_calendar_forward(self):
+        out = StringIO()
+        call_command('process_recurring', stdout=out)
+        self.assertIn('Created 13 monthly budget periods', out.getvalue())
+        self.assertIsNotNone(periods.period_for(timezone.now().date() + timedelta(days=330)))
+
+    def test_relink_moves_transactions_to_the_period_of_their_date(self):
+        stale = BudgetPeriod.objects.create(
+            name='Stale', start_date=date(2023, 1, 1), end_date=date(2023, 1, 31), is_active=False,
+        )
+        days = [date(2024, 1, 31), date(2024, 2, 1), date(2024, 3, 15), date(2024, 6, 1)]
+        Transaction.objects.bulk_create([
+            Transaction(type='expense', category=self.food, amount=Decimal('10'), description='x',
+                        date=day, budget_period=stale)
+            for day in days
+        ])
+        rollups.rebuild()
+        periods.generate_calendar('monthly', ahead=2, start=date(2024, 1, 1))
+
+        self.assertEqual(periods.relink_transactions(end_date=date(2024, 2, 29)), 2)
+        out = StringIO()
+        call_command('relink_transactions', stdout=out)
+        self.assertEqual(out.getvalue().strip(), 'Relinked 1 transactions')
+
+        linked = dict(Transaction.objects.values_list('date', 'budget_period__start_date'))
+        self.assertEqual(linked, {
+            date(2024, 1, 31): date(2024, 1, 1),
+            date(2024, 2, 1): date(2024, 2, 1),
+            date(2024, 3, 15): date(2024, 3, 1),
+            date(2024, 6, 1): date(2023, 1, 1),
+        })
+        self.assertEqual(rollups.verify(), [])
+
+    def test_duplicate_periods_are_rejected(self):
+        data = {'name': 'Jan', 'start_date': '2024-01-01', 'end_date': '2024-01-31'}
+        self.assertEqual(self.client.post('/api/budget-periods/', data, format='json').status_code, 201)
+        self.assertEqual(self.client.post('/api/budget-periods/', data, format='json').status_code, 400)
+
+
+class ProcessDueTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.rent = Category.objects.create(name='rent', type='expense')
+        self.rule = RecurringTransaction.objects.create(
+            name='Rent', type='expense', category=self.rent, amount=Decimal('900'), description='Rent',
+            frequency='monthly', start_date=date(2024, 1, 31), next_occurrence=date(2024, 1, 31),
+            end_date=date(2024, 6, 30),
+        )
+
+    def test_catch_up_generates_all_missed_occurrences_once(self):
+        result = recurring.process_due(date(2024, 8, 15))
+        self.assertEqual(result, {'rules_processed': 1, 'transactions_created': 6, 'rules_deactivated': 1})
+        self.assertEqual(
+            list(Transaction.objects.order_by('date').values_list('date', flat=True)),
+            [date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31),
+             date(2024, 4, 30), date(2024, 5, 31), date(2024, 6, 30)],
+        )
+        self.rule.refresh_from_db()
+        self.assertFalse(self.rule.is_active)
+        self.assertEqual(rollups.verify(), [])
+
+        # A second run has nothing left to do
+        self.assertEqual(recurring.process_due(date(2024, 8, 15))['transactions_created'], 0)
+
+    def test_skips_occurrences_created_by_a_concurrent_run(self):
+        Transaction.objects.create(
+            type='expense', category=self.rent, amount=Decimal('900'), description='Rent',
+            date=date(2024, 1, 31), recurring_transaction=self.rule,
+        )
+        result = recurring.process_due(date(2024, 2, 29))
+        self.assertEqual(result['transactions_created'], 1)
+        self.assertEqual(Transaction.objects.count(), 2)
+
+    def test_process_occurrence_of_a_generated_date_conflicts(self):
+        Transaction.objects.create(
+            type='expense', category=self.rent, amount=Decimal('900'), description='Rent',
+            date=date(2024, 1, 31), recurring_transaction=self.rule,
+        )
+        url = f'/api/recurring-transactions/{self.rule.id}/process_occurrence/'
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['next_occurrence'], date(2024, 2, 29))
+        # The rule moved past it, so the next call generates the following occurrence
+        self.assertEqual(self.client.post(url).status_code, 200)
+        self.assertEqual(Transaction.objects.count(), 2)
+        self.assertEqual(rollups.verify(), [])
+
+    def test_process_due_action(self):
+        response = self.client.post('/api/recurring-transactions/process_due/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['transactions_created'], 6)
+
+
+class StatementImportTests(TestCase):
+    CSV = (
+        "Date,Description,Amount,Category\n"
+        "2024-01-05,Coffee  Shop,-3.50,food\n"
+        "2024-01-05,Coffee Shop,-3.50,food\n"
+        "2024-01-06,ACME Payroll,2500.00,salary\n"
+        "2024-01-07,Broken row,abc,\n"
+    )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.food = Category.objects.create(name='food', type='expense')
+        self.salary = Category.objects.create(name='salary', type='income')
+        self.period = BudgetPeriod.objects.create(
+            name='Jan', start_date=date(2024, 1, 1), end_date=date(2024, 1, 31),
+        )
+
+    def upload(self, content, name='statement.csv'):
+        return self.client.post(
+            '/api/transactions/import/',
+            {'file': SimpleUploadedFile(name, content.encode('utf-8'))},
+            format='multipart',
+        )
+
+    def test_csv_import_is_idempotent(self):
+        response = self.upload(self.CSV)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual(response.data['error_count'], 1)
+        self.assertEqual(response.data['errors'][0]['line'], 5)
+
+        coffee = Transaction.objects.filter(category=self.food)
+        self.assertEqual(coffee.count(), 2)
+        self.assertTrue(all(row.amount == Decimal('3.50') and row.type == 'expense' for row in coffee))
+        self.assertEqual(Transaction.objects.get(category=self.salary).budget_period, self.period)
+        self.assertEqual(rollups.verify(), [])
+
+        again = self.upload(self.CSV)
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual((again.data['created'], again.data['duplicates']), (0, 3))
+
+    def test_ofx_and_qif(self):
+        ofx = (
+            "OFXHEADER:100\n<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>\n"
+            "<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240110120000<TRNAMT>-42.10<NAME>GROCER</STMTTRN>\n"
+            "<STMTTRN>\n<TRNTYPE>CREDIT\n<DTPOSTED>20240111\n<TRNAMT>100.00\n<NAME>REFUND\n</STMTTRN>\n"
+            "</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n"
+        )
+        self.assertEqual(self.upload(ofx, 'statement.ofx').data['created'], 2)
+
+        qif = "!Type:Bank\nD01/12/2024\nT-9.99\nPStreaming\nLfood\n^\nD01/13'2024\nT-1,200.00\nPRent\n^\n"
+        self.assertEqual(self.upload(qif, 'statement.qif').data['created'], 2)
+        self.assertEqual(
+            Transaction.objects.get(description='Streaming').category, self.food,
+        )
+        self.assertEqual(Transaction.objects.get(description='Rent').amount, Decimal('1200.00'))
+
+    def test_identical_rows_are_numbered_over_the_whole_file(self):
+        # The repeat of the first row comes after rows on 70 other dates
+        rows = ['2024-01-05,Coffee Shop,-3.50,food']
+        rows += [f'{date(2024, 2, 1) + timedelta(days=day)},Lunch,-8.00,food' for day in range(70)]
+        rows += ['2024-01-05,Coffee Shop,-3.50,food']
+        content = 'Date,Description,Amount,Category\n' + '\n'.join(rows) + '\n'
+
+        importer = importers.StatementImporter(chunk_size=10)
+        self.assertEqual(importer.run(importers.parse_csv(StringIO(content)))['created'], 72)
+        # Only the current run of rows on one date is counted row by row
+        self.assertEqual(len(importer._occurrences), 1)
+        again = importers.StatementImporter(chunk_size=10).run(importers.parse_csv(StringIO(content)))
+        self.assertEqual((again['created'], again['duplicates']), (0, 72))
+        self.assertEqual(rollups.verify(), [])
+
+    def test_identical_rows_on_one_date_keep_their_hashes(self):
+        content = 'Date,Description,Amount\n' + '2024-01-05,Coffee  Shop,-3.50\n' * 2 + '2024-01-06,Coffee Shop,-3.50\n'
+        importers.StatementImporter().run(importers.parse_csv(StringIO(content)))
+        self.assertEqual(set(Transaction.objects.values_list('import_hash', flat=True)), {
+            importers.import_hash(date(2024, 1, 5), Decimal('-3.50'), 'Coffee Shop'),
+            importers.import_hash(date(2024, 1, 5), Decimal('-3.50'), 'Coffee Shop', 1),
+            importers.import_hash(date(2024, 1, 6), Decimal('-3.50'), 'Coffee Shop'),
+        })
+
+    def test_rows_stored_by_another_import_are_skipped(self):
+        self.upload(self.CSV)
+        row = Transaction.objects.get(category=self.salary)
+        copy = Transaction(type=row.type, category=self.salary, amount=row.amount, description=row.description,
+                           date=row.date, import_hash=row.import_hash)
+        fresh = Transaction(type='expense', category=self.food, amount=Decimal('1.00'), description='new',
+                            date=row.date, import_hash='f' * 40)
+        self.assertEqual(Transaction.objects.bulk_create([copy, fresh, copy], ignore_conflicts=True), [fresh])
+        self.assertEqual(Transaction.objects.filter(import_hash=row.import_hash).count(), 1)
+        self.assertEqual(rollups.verify(), [])
+
+        with self.assertRaises(IntegrityError):
+            Transaction.objects.bulk_create([copy])
+
+    def test_rejects_unusable_files(self):
+        self.assertEqual(self.upload('when,what\n1,2\n').status_code, 400)
+        self.assertEqual(self.upload('x', 'statement.pdf').status_code, 400)
+
+
+class BatchTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.food = Category.objects.create(name='food', type='expense')
+        self.shopping = Category.objects.create(name='shopping', type='expense')
+        Transaction.objects.bulk_create([
+            Transaction(type='expense', category=self.food, amount=Decimal('5.00'),
+                        description=f'Item {i}', date=date(2024, 1, 1 + i % 28))
+            for i in range(1200)
+        ])
+
+    def post(self, operations):
+        return self.client.post('/api/transactions/batch/', {'operations': operations}, format='json')
+
+    def test_mixed_operations(self):
+        first, second = Transaction.objects.order_by('id')[:2]
+        response = self.post([
+            {'op': 'create', 'data': {
+                'type': 'expense', 'category': self.shopping.id, 'amount': '19.99',
+                'description': 'Shoes', 'date': '2024-02-03',
+            }},
+            {'op': 'update', 'id': first.id, 'data': {'amount': '7.25'}},
+            {'op': 'delete', 'id': second.id},
+        ])
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual([row['status'] for row in response.data['results']], ['created', 'updated', 'deleted'])
+        self.assertEqual(response.data['results'][0]['transaction']['category_name'], 'shopping')
+
+        first.refresh_from_db()
+        self.assertEqual(first.amount, Decimal('7.25'))
+        self.assertFalse(Transaction.objects.filter(id=second.id).exists())
+        self.assertTrue(Transaction.objects.filter(description='Shoes').exists())
+        self.assertEqual(rollups.verify(), [])
+
+    def test_bulk_recategorize_uses_a_handful_of_queries(self):
+        operations = [
+            {'op': 'update', 'id': pk, 'data': {'category': self.shopping.id}}
+            for pk in Transaction.objects.values_list('id', flat=True)
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(operations)
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(len(queries), 30)
+        self.assertEqual(Transaction.objects.filter(category=self.shopping).count(), 1200)
+        self.assertEqual(rollups.verify(), [])
+
+    def test_invalid_batch_changes_nothing(self):
+        pk = Transaction.objects.values_list('id', flat=True).first()
+        response = self.post([
+            {'op': 'delete', 'id': pk},
+            {'op': 'update', 'id': 999999, 'data': {'amount': '1'}},
+            {'op': 'create', 'data': {'type': 'expense', 'category': 999999}},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[1], {'id': ['Transaction not found.']})
+        self.assertIn('category', response.data[2]['data'])
+        self.assertTrue(Transaction.objects.filter(id=pk).exists())
+
+        response = self.post([{'op': 'delete', 'id': pk}, {'op': 'update', 'id': pk, 'data': {}}])
+        self.assertEqual(response.status_code, 400)
+
+    def test_unknown_budget_periods_are_rejected(self):
+        create = {'op': 'create', 'data': {
+            'type': 'expense', 'category': self.food.id, 'amount': '1', 'description': 'x', 'date': '2024-02-03'}}
+        response = self.post([{**create, 'data': {**create['data'], 'budget_period': 999999}}])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('budget_period', response.data[0]['data'])
+
+        # A period resolved from the date that no longer exists
+        with mock.patch.object(periods, 'resolve_many', return_value=[999999]):
+            response = self.post([create])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Transaction.objects.filter(description='x').count(), 0)
+
+    def test_only_referenced_rows_are_read(self):
+        for index in range(50):
+            Category.objects.create(name=f'spare {index}', type='expense')
+        pk = Transaction.objects.values_list('id', flat=True).first()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post([{'op': 'update', 'id': pk, 'data': {'category': self.shopping.id}}])
+        self.assertEqual(response.status_code, 200)
+        reads = [query['sql'] for query in queries if query['sql'].startswith('SELECT')
+                 and re.search(r'FROM "finance_(category|budgetperiod|recurringtransaction)"', query['sql'])]
+        self.assertTrue(reads)
+        self.assertTrue(all(' IN (' in sql for sql in reads), reads)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.food = Category.objects.create(name='food', type='expense')
+        Transaction.objects.bulk_create([
+            Transaction(type='expense', category=self.food, amount=Decimal('2.50'),
+                        description=f'Lunch, day "{i}"', date=date(2024, 1, 1 + i))
+            for i in range(5)
+        ])
+
+    def content(self, response):
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_csv_export_streams_filtered_rows(self):
+        response = self.client.get('/api/transactions/export/', {'format': 'csv', 'date_from': '2024-01-03'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+
+        rows = list(csv.reader(StringIO(self.content(response))))
+        self.assertEqual(rows[0][:5], ['id', 'date', 'type', 'category', 'amount'])
+        self.assertEqual([row[1] for row in rows[1:]], ['2024-01-03', '2024-01-04', '2024-01-05'])
+        self.assertEqual(rows[1][3:6], ['food', '2.50', 'Lunch, day "2"'])
+
+    def test_ndjson_export(self):
+        response = self.client.get('/api/transactions/export/', {'format': 'ndjson'})
+        self.assertEqual(response.status_code, 200)
+        records = [json.loads(line) for line in self.content(response).splitlines()]
+        self.assertEqual(len(records), 5)
+        self.assertEqual(records[0]['amount'], '2.50')
+        self.assertEqual(records[0]['budget_period'], None)
+
+    def test_invalid_filters_and_formats(self):
+        self.assertEqual(self.client.get('/api/transactions/export/', {'date_from': 'soon'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/transactions/export/', {'format': 'xml'}).status_code, 404)
+
+
+class RenderingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        food = Category.objects.create(name='food', type='expense')
+        Transaction.objects.bulk_create([
+            Transaction(type='expense', category=food, amount=Decimal('4.20'),
+                        description=f'Snack {i}', date=date(2024, 1, 1))
+            for i in range(40)
+        ])
+
+    def test_orjson_output_matches_json_renderer(self):
+        payload = {
+            'amount': Decimal('12.50'),
+            'date': date(2024, 2, 29),
+            'created_at': timezone.now(),
+            'rows': TransactionSerializer(Transaction.objects.all()[:3], many=True).data,
+            1: 'integer key',
+        }
+        self.assertEqual(ORJSONRenderer().render(payload), JSONRenderer().render(payload))
+
+    def test_large_responses_are_compressed(self):
+        plain = self.client.get('/api/transactions/')
+        self.assertNotIn('Content-Encoding', plain)
+
+        for encoding, decompress in (('br', brotli.decompress), ('gzip', gzip.decompress)):
+            response = self.client.get('/api/transactions/', HTTP_ACCEPT_ENCODING=f'{encoding}, deflate')
+            self.assertEqual(response['Content-Encoding'], encoding)
+            self.assertIn('Accept-Encoding', response['Vary'])
+            self.assertTrue(response['ETag'].startswith('W/'))
+            self.assertEqual(decompress(response.content), plain.content)
+
+        small = self.client.get('/api/categories/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotIn('Content-Encoding', small)
+
+    def test_streaming_export_is_compressed(self):
+        response = self.client.get('/api/transactions/export/', {'format': 'csv'}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        csv_text = gzip.decompress(b''.join(response.streaming_content)).decode('utf-8')
+        self.assertEqual(len(csv_text.splitlines()), 41)
+
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        caching.stats.clear()
+        metrics.reset()
+        self.client = APIClient()
+        self.food = Category.objects.create(name='food', type='expense')
+
+    def endpoint(self, data, view, action):
+        return next(row for row in data['endpoints'] if (row['view'], row['action']) == (view, action))
+
+    def test_requests_are_recorded_per_view_and_action(self):
+        self.client.get('/api/transactions/')
+        self.client.get('/api/transactions/monthly_summary/')
+        self.client.get('/api/transactions/monthly_summary/')
+        self.client.post('/api/categories/', {'name': 'rent', 'type': 'expense'}, format='json')
+
+        data = self.client.get('/api/metrics?format=json').json()
+        listing = self.endpoint(data, 'TransactionViewSet', 'list')
+        self.assertEqual(listing['requests'], 1)
+        self.assertGreater(listing['sql_queries'], 0)
+        self.assertEqual(listing['latency_seconds']['buckets']['+Inf'], 1)
+
+        summary = self.endpoint(data, 'TransactionViewSet', 'monthly_summary')
+        self.assertEqual(summary['requests'], 2)
+        self.assertEqual(self.endpoint(data, 'CategoryViewSet', 'create')['requests'], 1)
+        self.assertEqual(data['cache']['monthly_summary'], {'hits': 1, 'misses': 1})
+
+    def test_queries_are_timed_on_every_alias_and_fanout_thread(self):
+        timer = metrics.QueryTimer()
+
+        def select():
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            # The production profile's read alias is covered too
+            return all(timer in connections[alias].execute_wrappers for alias in connections)
+
+        with database.query_wrappers([timer]):
+            self.assertTrue(select())
+            self.assertTrue(
+                fanout.executor().submit(fanout._run, select, database.active_query_wrappers()).result()
+            )
+        self.assertEqual(timer.count, 2)
+
+        # Nothing is left installed once the block ends, in either thread
+        self.assertFalse(select())
+        self.assertFalse(fanout.executor().submit(fanout._run, select, database.active_query_wrappers()).result())
+        self.assertEqual(timer.count, 2)
+
+    def test_prometheus_text_format(self):
+        self.client.get('/api/goals/active_goals/')
+        response = self.client.get('/api/metrics')
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+
+        text = response.content.decode()
+        labels = '{view="GoalViewSet",action="active_goals"}'
+        self.assertIn('# TYPE finance_http_request_duration_seconds histogram', text)
+        self.assertIn(f'finance_http_requests_total{labels} 1', text)
+        self.assertIn('finance_http_request_duration_seconds_bucket'
+                      '{view="GoalViewSet",action="active_goals",le="+Inf"} 1', text)
+        self.assertIn(f'finance_db_queries_total{labels} 1', text)
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(
+            PROFILING_DIR=directory.name, PROFILING_SECRET='s3cret', PROFILING_MAX_PROFILES=2,
+            PROFILING_SAMPLE_RATE=0,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client = APIClient()
+        Category.objects.create(name='food', type='expense')
+
+    def test_requests_are_profiled_only_with_the_secret(self):
+        self.assertNotIn('X-Profile-Id', self.client.get('/api/categories/by_type/'))
+        self.assertNotIn('X-Profile-Id', self.client.get('/api/categories/by_type/', HTTP_X_PROFILE='guess'))
+        self.assertEqual(self.client.get('/api/profiles').status_code, 403)
+        # The secret is not taken from the query string, where it would be logged
+        self.assertNotIn('X-Profile-Id', self.client.get('/api/categories/by_type/?profile=s3cret'))
+        self.assertEqual(self.client.get('/api/profiles?profile=s3cret').status_code, 403)
+
+        response = self.client.get('/api/transactions/monthly_summary/', HTTP_X_PROFILE='s3cret')
+        profile_id = response['X-Profile-Id']
+        detail = self.client.get(f'/api/profiles/{profile_id}', HTTP_X_PROFILE='s3cret').json()
+        self.assertEqual((detail['view'], detail['action'], detail['sampled']),
+                         ('TransactionViewSet', 'monthly_summary', False))
+        self.assertEqual(detail['sql_queries'], len(detail['queries']))
+        self.assertTrue(detail['top_functions'])
+
+        download = self.client.get(f'/api/profiles/{profile_id}?download=prof', HTTP_X_PROFILE='s3cret')
+        self.assertEqual(download.status_code, 200)
+        self.assertTrue(b''.join(download.streaming_content))
+        self.assertEqual(self.client.get('/api/profiles/../../etc', HTTP_X_PROFILE='s3cret').status_code, 404)
+
+    def test_ring_buffer_keeps_the_newest_profiles(self):
+        ids = [
+            self.client.get('/api/goals/', HTTP_X_PROFILE='s3cret')['X-Profile-Id']
+            for _ in range(3)
+        ]
+        listed = self.client.get('/api/profiles', HTTP_X_PROFILE='s3cret').json()
+        self.assertEqual([summary['id'] for summary in listed], ids[:0:-1])
+        self.assertEqual(len(profiling.profile_ids()), 2)
+
+    def test_sampling(self):
+        with override_settings(PROFILING_SAMPLE_RATE=1):
+            response = self.client.get('/api/goals/')
+        self.assertTrue(profiling.load(response['X-Profile-Id'])['sampled'])
+
+
+class SyntheticDataTests(TestCase):
+    def setUp(self):
+        clear_caches()
+
+    def ledger(self):
+        return list(
+            Transaction.objects.order_by('date', 'id')
+            .values_list('date', 'type', 'category__name', 'amount', 'description', 'budget_period__start_date')
+        )
+
+    def test_seed_is_deterministic_and_consistent(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            created = synthetic.seed(500, seed=7, end=date(2024, 6, 30), months=6)
+        self.assertEqual((created, Transaction.objects.count()), (500, 500))
+        self.assertEqual(BudgetPeriod.objects.count(), 6)
+        self.assertTrue(Transaction.objects.filter(recurring_transaction__isnull=False).exists())
+        self.assertFalse(Transaction.objects.filter(budget_period__isnull=True).exists())
+        self.assertEqual(rollups.verify(), [])
+
+        first = self.ledger()
+        Transaction.objects.all().delete()
+        RecurringTransaction.objects.all().delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            synthetic.seed(500, seed=7, end=date(2024, 6, 30), months=6)
+        self.assertEqual(self.ledger(), first)
+
+    def test_benchmark_covers_every_endpoint(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            synthetic.seed(300, seed=1, months=3)
+        results = benchmarks.run_endpoints(repeat=1)
+        self.assertEqual(set(results), {name for name, _ in benchmarks.ENDPOINTS})
+        self.assertEqual({name: result['status'] for name, result in results.items() if result['status'] != 200}, {})
+        self.assertEqual(results['transactions.list']['queries'], 1)
+
+        baseline = {'sizes': {'300': results}}
+        slower = {'sizes': {'300': {'transactions.list': dict(
+            results['transactions.list'], median_ms=results['transactions.list']['median_ms'] + 50, queries=3,
+        )}}}
+        self.assertEqual(benchmarks.compare(baseline, baseline), [])
+        self.assertEqual(len(benchmarks.compare(baseline, slower)), 2)
+        self.assertEqual(benchmarks.compare(baseline, slower, min_delta_ms=100, query_threshold=2), [])
+
+class LoadTestTests(TestCase):
+    def test_percentiles_use_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(loadtest.percentile(values, 0.50), 50)
+        self.assertEqual(loadtest.percentile(values, 0.95), 95)
+        self.assertEqual(loadtest.percentile(values, 0.99), 99)
+        self.assertEqual(loadtest.percentile([7], 0.99), 7)
+        self.assertIsNone(loadtest.percentile([], 0.5))
+
+    def test_summary_counts_server_errors(self):
+        recorder = loadtest.Recorder()
+        for status in (200, 304, 500, 'error'):
+            recorder.add('transactions.list', 0.01, status)
+        recorder.finished = recorder.started + 2
+        result = loadtest.summarize(recorder)['endpoints']['transactions.list']
+        self.assertEqual(result['requests'], 4)
+        self.assertEqual(result['errors'], 2)
+        self.assertEqual(result['throughput'], 2.0)
+        self.assertEqual(result['statuses'], {'200': 1, '304': 1, '500': 1, 'error': 1})
+
+    def test_client_reads_chunked_gzip_and_revalidates(self):
+        requests = []
+
+        async def handle(reader, writer):
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except asyncio.IncompleteReadError:
+                    writer.close()
+                    return
+                requests.append(head.decode('latin-1'))
+                if 'If-None-Match: "v1"' in requests[-1]:
+                    writer.write(b'HTTP/1.1 304 Not Modified\r\nETag: "v1"\r\n\r\n')
+                else:
+                    body = gzip.compress(b'{"count": 1}')
+                    writer.write(
+                        b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Encoding: gzip\r\n'
+                        b'ETag: "v1"\r\nTransfer-Encoding: chunked\r\n\r\n'
+                        + f'{len(body):x}'.encode() + b'\r\n' + body + b'\r\n0\r\n\r\n'
+                    )
+                await writer.drain()
+
+        async def scenario():
+            server = await asyncio.start_server(handle, '127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            recorder = loadtest.Recorder()
+            session = loadtest.Session('127.0.0.1', port, recorder, 0, random.Random(0))
+            try:
+                first = await session.call('categories.list', 'GET', '/api/categories/')
+                second = await session.call('categories.list', 'GET', '/api/categories/')
+            finally:
+                await session.close()
+                server.close()
+                await server.wait_closed()
+            return first, second, recorder
+
+        first, second, recorder = asyncio.run(scenario())
+        self.assertEqual(first, {'count': 1})
+        self.assertEqual(second, {'count': 1})
+        self.assertEqual([status for _, status in recorder.samples['categories.list']], [200, 304])
+        self.assertNotIn('If-None-Match', requests[0])
+        self.assertIn('If-None-Match: "v1"', requests[1])
+
+    def test_dashboard_loads_one_page_and_scrolls_a_few_more(self):
+        paths = []
+
+        async def handle(reader, writer):
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except asyncio.IncompleteReadError:
+                    writer.close()
+                    return
+                paths.append(head.decode('latin-1').split()[1])
+                # Every page of the list has a next one
+                page = {'results': [], 'next': f'http://testserver/api/transactions/?cursor={len(paths)}&page_size=50'}
+                data = {'categories': [], 'transactions': page} if paths[-1].startswith('/api/dashboard/') else page
+                body = json.dumps(data).encode()
+                writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                             + f'Content-Length: {len(body)}\r\n\r\n'.encode() + body)
+                await writer.drain()
+
+        async def scenario():
+            server = await asyncio.start_server(handle, '127.0.0.1', 0)
+            session = loadtest.Session('127.0.0.1', server.sockets[0].getsockname()[1], loadtest.Recorder(),
+                                       loadtest.SCROLL_PAGES, random.Random(0))
+            try:
+                await loadtest.dashboard(session)
+            finally:
+                await session.close()
+                server.close()
+                await server.wait_closed()
+
+        asyncio.run(scenario())
+        self.assertEqual(paths, ['/api/dashboard/?page_size=50'] + [
+            f'/api/transactions/?cursor={page}&page_size=50' for page in range(1, loadtest.SCROLL_PAGES + 1)])
+
+
+class DatabaseProfileTests(TestCase):
+    def test_production_profile_sets_pragmas_and_a_read_only_alias(self):
+        with tempfile.TemporaryDirectory() as directory:
+            databases = database.sqlite_databases(f'{directory}/db.sqlite3', 'production')
+            # TestCase only lets its own aliases connect, so rename the read alias
+            handler = ConnectionHandler({
+                'default': databases['default'],
+                'profile-read': databases[database.READ_ALIAS],
+            })
+            try:
+                with handler['default'].cursor() as cursor:
+                    cursor.execute('PRAGMA journal_mode')
+                    self.assertEqual(cursor.fetchone()[0], 'wal')
+                    cursor.execute('PRAGMA synchronous')
+                    self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+                    cursor.execute('PRAGMA busy_timeout')
+                    self.assertEqual(cursor.fetchone()[0], database.BUSY_TIMEOUT_SECONDS * 1000)
+                    cursor.execute('CREATE TABLE item (id INTEGER PRIMARY KEY)')
+                    cursor.execute('INSERT INTO item VALUES (1)')
+                self.assertEqual(handler['default'].transaction_mode, 'IMMEDIATE')
+
+                with handler['profile-read'].cursor() as cursor:
+                    cursor.execute('SELECT COUNT(*) FROM item')
+                    self.assertEqual(cursor.fetchone()[0], 1)
+                    with self.assertRaises(OperationalError):
+                        cursor.execute('INSERT INTO item VALUES (2)')
+            finally:
+                handler.close_all()
+
+    def test_default_profile_is_a_single_connection(self):
+        self.assertEqual(list(database.sqlite_databases('db.sqlite3')), ['default'])
+        with self.assertRaises(ValueError):
+            database.sqlite_databases('db.sqlite3', 'fast')
+
+    def test_router_reads_from_the_read_alias_outside_transactions(self):
+        router = database.ReadWriteRouter()
+        # Without a read alias everything stays on default
+        single = {alias: value for alias, value in connections.settings.items() if alias != database.READ_ALIAS}
+        with mock.patch.object(connections, 'settings', single), \
+                mock.patch.object(connections['default'], 'in_atomic_block', False):
+            self.assertEqual(router.db_for_read(Transaction), 'default')
+
+        with mock.patch.dict(connections.settings, {database.READ_ALIAS: {}}):
+            # TestCase runs inside a transaction, whose writes only default can see
+            self.assertEqual(router.db_for_read(Transaction), 'default')
+            with mock.patch.object(connections['default'], 'in_atomic_block', False):
+                self.assertEqual(router.db_for_read(Transaction), database.READ_ALIAS)
+        self.assertEqual(router.db_for_write(Transaction), 'default')
+        self.assertFalse(router.allow_migrate(database.READ_ALIAS, 'finance'))
+        self.assertTrue(router.allow_migrate('default', 'finance'))
+
+
+class ReadAliasWriteTests(TransactionTestCase):
+    """Bulk ledger writes with a `read` alias routed to, as in the production profile"""
+    databases = '__all__'
+
+    def setUp(self):
+        clear_caches()
+        if database.READ_ALIAS not in connections.settings:
+            # A query-only connection to the test database, like the production profile's mirror
+            read = {**connections.settings['default'],
+                    'OPTIONS': {'init_command': '; '.join(database.READ_PRAGMAS)}}
+            for patcher in (mock.patch.dict(connections.settings, {database.READ_ALIAS: read}),
+                            mock.patch.object(type(self), 'databases', {*self.databases, database.READ_ALIAS})):
+                patcher.start()
+                self.addCleanup(patcher.stop)
+            self.addCleanup(connections.__delitem__, database.READ_ALIAS)
+            self.addCleanup(lambda: connections[database.READ_ALIAS].close())
+        self.food = Category.objects.create(name='food', type='expense')
+        self.shopping = Category.objects.create(name='shopping', type='expense')
+        Transaction.objects.bulk_create([
+            Transaction(type='expense', category=self.food, amount=Decimal('5.00'), description=f'Item {i}',
+                        date=date(2024, 1, 1 + i))
+            for i in range(3)
+        ])
+        self.assertEqual(database.ReadWriteRouter().db_for_read(Transaction), database.READ_ALIAS)
+
+    def ledger(self):
+        return (sorted(Transaction.objects.values_list('category_id', 'amount', 'date')),
+                sorted(MonthlyRollup.objects.values_list('category_id', 'total', 'count')))
+
+    def test_failures_roll_back_the_ledger_and_the_rollup(self):
+        before = self.ledger()
+        operations = {
+            'bulk_create': lambda: Transaction.objects.bulk_create([Transaction(
+                type='expense', category=self.food, amount=Decimal('9.00'), description='x', date=date(2024, 1, 9))]),
+            'update': lambda: Transaction.objects.filter(amount=Decimal('5.00')).update(category=self.shopping),
+            'delete': lambda: Transaction.objects.filter(date__gte=date(2024, 1, 2)).delete(),
+        }
+        for name, operation in operations.items():
+            with self.subTest(operation=name):
+                # Fails after both the ledger and the rollup rows were written
+                with mock.patch.object(rollups, 'bump_on_commit', side_effect=OperationalError('disk I/O error')), \
+                        self.assertRaises(OperationalError):
+                    operation()
+                self.assertEqual(self.ledger(), before)
+                self.assertEqual(rollups.verify(), [])
+
+        for operation in operations.values():
+            operation()
+        self.assertEqual(rollups.verify(), [])
+        self.assertNotEqual(self.ledger(), before)
+
+
+class DashboardTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.today = timezone.now().date()
+        self.food = Category.objects.create(name='food', type='expense', color='#ef4444')
+        self.salary = Category.objects.create(name='salary', type='income')
+        for day, amount in ((1, '12.50'), (1, '7.50'), (2, '30.00')):
+            Transaction.objects.create(
+                type='expense', category=self.food, amount=Decimal(amount), description='x',
+                date=self.today.replace(day=day),
+            )
+        Transaction.objects.create(
+            type='income', category=self.salary, amount=Decimal('1000'), description='pay', date=self.today,
+        )
+
+    def test_returns_every_part_of_the_dashboard(self):
+        periods.generate_calendar('monthly', ahead=0, start=self.today)
+        period = periods.period_for(self.today)
+        Budget.objects.create(budget_period=period, monthly_income=4000)
+
+        response = self.client.get('/api/dashboard/', {'page_size': 2})
+        self.assertEqual(response.status_code, 200)
+        data = response.data
+        self.assertEqual(data['current_period']['id'], period.id)
+        self.assertEqual(data['current_budget']['monthly_income'], '4000.00')
+        self.assertEqual([category['name'] for category in data['categories']], ['food', 'salary'])
+        for name, url in (('monthly_summary', '/api/transactions/monthly_summary/'),
+                          ('six_month_trend', '/api/transactions/six_month_trend/')):
+            self.assertEqual(data[name], self.client.get(url).data)
+        self.assertEqual(data['monthly_summary']['expense_breakdown']['food'],
+                         {'amount': 50.0, 'color': '#ef4444', 'count': 3})
+
+        # The first page continues in the transaction list
+        page = data['transactions']
+        self.assertEqual(len(page['results']), 2)
+        self.assertIn('/api/transactions/?', page['next'])
+        self.assertIn('page_size=2', page['next'])
+        rest = self.client.get(page['next'][page['next'].index('/api/'):]).data
+        self.assertEqual(len(page['results']) + len(rest['results']), 4)
+        self.assertIsNone(rest['next'])
+
+    def test_missing_period_and_budget_are_null(self):
+        data = self.client.get('/api/dashboard/').data
+        self.assertIsNone(data['current_period'])
+        self.assertIsNone(data['current_budget'])
+
+    def test_revalidates_until_a_write_commits(self):
+        response = self.client.get('/api/dashboard/')
+        with self.assertNumQueries(0):
+            unchanged = self.client.get('/api/dashboard/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(unchanged.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/transactions/', {
+                'type': 'expense', 'category': self.food.id, 'amount': '5.00', 'description': 'y',
+                'date': self.today.isoformat(),
+            }, format='json')
+        changed = self.client.get('/api/dashboard/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.data['monthly_summary']['monthly_expenses'], 55.0)
+
+    def test_fan_out_runs_on_pool_threads_outside_transactions(self):
+        tasks = {'a': lambda: threading.current_thread().name, 'b': lambda: threading.current_thread().name}
+        # Inside TestCase's transaction everything stays on this thread
+        self.assertEqual(set(fanout.run_concurrently(tasks).values()), {threading.current_thread().name})
+
+        with mock.patch.object(connections['default'], 'in_atomic_block', False), \
+                mock.patch('finance.fanout.close_old_connections'):
+            results = fanout.run_concurrently(tasks)
+            self.assertTrue(all(name.startswith('fanout') for name in results.values()))
+            with self.assertRaises(ZeroDivisionError):
+                fanout.run_concurrently({'a': lambda: 1, 'b': lambda: 1 / 0})
+
+
+class BootstrapTests(TestCase):
+    def bootstrap(self):
+        output = StringIO()
+        call_command('bootstrap', '--skip-static', stdout=output)
+        return output.getvalue()
+
+    def test_seeds_an_empty_installation_once(self):
+        output = self.bootstrap()
+        self.assertIn('No migrations to apply', output)
+        self.assertEqual(Category.objects.filter(user=None, is_custom=False).count(), 14)
+        self.assertIsNotNone(periods.period_for(timezone.now().date()))
+
+        # Deleted defaults stay deleted on the next boot
+        Category.objects.filter(name='Dividends').delete()
+        self.bootstrap()
+        self.assertEqual(Category.objects.count(), 13)
+        self.assertEqual(BudgetPeriod.objects.count(), 13)
+
+    def test_shared_category_names_are_unique(self):
+        client = APIClient()
+        self.assertEqual(client.post('/api/categories/', {'name': 'food', 'type': 'expense'}).status_code, 201)
+        response = client.post('/api/categories/', {'name': 'food', 'type': 'expense'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('name', response.data)
+        self.assertEqual(client.post('/api/categories/', {'name': 'food', 'type': 'income'}).status_code, 201)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.today = timezone.now().date()
+        self.food = Category.objects.create(name='food', type='expense')
+        self.fun = Category.objects.create(name='entertainment', type='expense')
+        self.coffee = Transaction.objects.create(
+            type='expense', category=self.food, amount=Decimal('4.20'), description='Coffee shop',
+            date=self.today,
+        )
+        self.beans = Transaction.objects.create(
+            type='expense', category=self.food, amount=Decimal('18.00'), description='Coffee beans, coffee filters',
+            date=self.today - timedelta(days=40),
+        )
+        self.concert = Transaction.objects.create(
+            type='expense', category=self.fun, amount=Decimal('65.00'), description='Concert tickets at the café',
+            date=self.today - timedelta(days=3),
+        )
+
+    def search(self, **params):
+        response = self.client.get('/api/transactions/search/', params)
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data['results']]
+
+    def test_matches_every_word_as_a_prefix(self):
+        self.assertEqual(set(self.search(q='cof')), {self.coffee.id, self.beans.id})
+        self.assertEqual(self.search(q='coff sho'), [self.coffee.id])
+        self.assertEqual(self.search(q='CONCERT tick'), [self.concert.id])
+        # Accents are folded on both sides
+        self.assertEqual(self.search(q='cafe'), [self.concert.id])
+        # Quotes and operators are searched as plain words
+        self.assertEqual(self.search(q='"shop'), [self.coffee.id])
+        self.assertEqual(self.search(q='coffee NOT shop'), [])
+
+    def test_ranks_closer_matches_first(self):
+        self.assertEqual(self.search(q='coffee'), [self.beans.id, self.coffee.id])
+
+    def test_applies_the_list_filters(self):
+        self.assertEqual(self.search(q='co', category=self.fun.id), [self.concert.id])
+        self.assertEqual(self.search(q='coffee', date_from=self.today - timedelta(days=7)), [self.coffee.id])
+        self.assertEqual(self.search(q='coffee', min_amount='10'), [self.beans.id])
+        self.assertEqual(self.search(q='co', type='income'), [])
+
+    def test_pages_with_limit_and_offset(self):
+        first = self.client.get('/api/transactions/search/', {'q': 'co', 'limit': 2}).data
+        self.assertEqual(len(first['results']), 2)
+        self.assertEqual(first['next_offset'], 2)
+        rest = self.client.get('/api/transactions/search/', {'q': 'co', 'limit': 2, 'offset': 2}).data
+        self.assertEqual(len(rest['results']), 1)
+        self.assertIsNone(rest['next_offset'])
+
+    def test_sqlite_without_fts5_falls_back_to_substrings(self):
+        self.assertTrue(fulltext.has_fts5(connection))
+        with mock.patch.dict(fulltext._available, {'default': False}):
+            self.assertEqual(self.search(q='coffee'), [self.coffee.id, self.beans.id])
+            self.assertEqual(self.search(q='conc tick'), [self.concert.id])
+            queryset = fulltext.search(Transaction.objects.all(), 'coffee')
+            self.assertNotIn(fulltext.FTS_TABLE, str(queryset.query))
+
+    def test_deleting_transactions_leaves_the_index_to_its_triggers(self):
+        with CaptureQueriesContext(connection) as queries:
+            Transaction.objects.filter(id=self.coffee.id).delete()
+        self.assertFalse(any(fulltext.FTS_TABLE in query['sql'] for query in queries))
+        self.assertEqual(self.search(q='coffee'), [self.beans.id])
+
+    def test_rejects_bad_parameters(self):
+        for params in ({}, {'q': ' ,. '}, {'q': 'coffee', 'limit': 'ten'}, {'q': 'coffee', 'limit': 0},
+                       {'q': 'coffee', 'offset': -1}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get('/api/transactions/search/', params).status_code, 400)
+
+    def test_index_follows_every_write(self):
+        self.coffee.description = 'Espresso bar'
+        self.coffee.save()
+        Transaction.objects.filter(id=self.beans.id).update(description='Tea leaves')
+        self.concert.delete()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO finance_transaction (user_id, type, category_id, amount, description, date, '
+                "created_at, updated_at) VALUES (NULL, 'expense', %s, '3.00', 'Coffee to go', %s, %s, %s)",
+                [self.food.id, self.today, timezone.now(), timezone.now()],
+            )
+        self.assertEqual(self.search(q='espresso'), [self.coffee.id])
+        self.assertEqual(self.search(q='tea'), [self.beans.id])
+        self.assertEqual(self.search(q='concert'), [])
+        self.assertEqual(self.search(q='coffee'), [Transaction.objects.get(description='Coffee to go').id])
+
+    def test_ensure_index_repairs_missing_triggers(self):
+        self.assertFalse(fulltext.ensure_index())
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER {fulltext.FTS_TABLE}_insert')
+        Transaction.objects.create(
+            type='expense', category=self.food, amount=Decimal('2.00'), description='Bagel', date=self.today,
+        )
+        self.assertEqual(self.search(q='bagel'), [])
+
+        self.assertTrue(fulltext.ensure_index())
+        self.assertEqual(len(self.search(q='bagel')), 1)
+
+    def test_admin_search_uses_the_index(self):
+        admin = admin_site._registry[Transaction]
+        request = RequestFactory().get('/admin/finance/transaction/', {'q': 'coff'})
+        queryset, duplicates = admin.get_search_results(request, Transaction.objects.all(), 'coff')
+        self.assertEqual(set(queryset.values_list('id', flat=True)), {self.coffee.id, self.beans.id})
+        self.assertFalse(duplicates)
+        self.assertIn(fulltext.FTS_TABLE, str(queryset.query))
+
+
+class CategorizerTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.today = timezone.now().date()
+        self.food = Category.objects.create(name='food', type='expense')
+        self.travel = Category.objects.create(name='travel', type='expense')
+        self.other = Category.objects.create(name='other', type='expense')
+        self.salary = Category.objects.create(name='salary', type='income')
+        labelled = [('Coffee shop', self.food), ('Grocery store', self.food), ('Corner bakery', self.food),
+                    ('Train ticket', self.travel), ('Hotel booking', self.travel), ('Monthly salary', self.salary)]
+        Transaction.objects.bulk_create([
+            Transaction(type=category.type, category=category, amount=Decimal('10.00') + index,
+                        description=description, date=self.today - timedelta(days=index))
+            for index in range(10)
+            for description, category in labelled
+        ])
+
+    def rule(self, pattern, category, **fields):
+        return CategoryRule.objects.create(name=pattern, pattern=pattern, category=category, **fields)
+
+    def test_first_rule_in_priority_order_wins(self):
+        self.rule('coffee', self.travel, priority=2)
+        self.rule(r'coffee\s+shop$', self.food, match_type='regex', priority=1)
+        self.rule('shop', self.other, priority=3)
+        matcher = categorizer.RuleMatcher(categorizer.active_rules())
+        self.assertEqual(matcher.match('COFFEE SHOP', None, 'expense'), self.food.id)
+        self.assertEqual(matcher.match('Airport coffee', None, 'expense'), self.travel.id)
+        self.assertEqual(matcher.match('Workshop', None, 'expense'), None)
+        self.assertEqual(matcher.match('Coffee shop', None, 'income'), None)
+
+    def test_rules_apply_within_their_amount_bounds(self):
+        self.rule('store', self.travel, min_amount=Decimal('100'), max_amount=Decimal('200'))
+        self.rule('store', self.food, min_amount=Decimal('200'))
+        matcher = categorizer.RuleMatcher(categorizer.active_rules())
+        for amount, expected in (('99.99', None), ('100', self.travel.id), ('150', self.travel.id),
+                                 ('200', self.travel.id), ('200.01', self.food.id), (None, None)):
+            with self.subTest(amount=amount):
+                self.assertEqual(
+                    matcher.match('Duty free store', Decimal(amount) if amount else None, 'expense'), expected)
+        # One compiled expression per (type, band) that was needed
+        self.assertEqual(len(matcher._compiled), 6)
+
+    def test_model_learns_from_categorized_transactions(self):
+        model = categorizer.train()
+        self.assertEqual(model.size, 60)
+        category_id, probability = model.predict('Coffee to go', 'expense')
+        self.assertEqual(category_id, self.food.id)
+        self.assertGreater(probability, 0.6)
+        self.assertEqual(model.predict('Night train', 'expense')[0], self.travel.id)
+        self.assertIsNone(model.predict('Unknown words', 'expense'))
+        self.assertIsNone(model.predict('Coffee', 'transfer'))
+
+        # The catch-all category is not learned from
+        Transaction.objects.create(type='expense', category=self.other, amount=Decimal('1'),
+                                   description='Coffee coffee coffee', date=self.today)
+        self.assertEqual(categorizer.train().size, 60)
+
+    def test_model_is_retrained_on_category_changes_and_periodically(self):
+        clock = 1000 * categorizer.RETRAIN_SECONDS
+        with mock.patch.object(categorizer, 'train', wraps=categorizer.train) as train, \
+                mock.patch.object(categorizer.time, 'time', side_effect=lambda: clock):
+            model = categorizer.load().model
+            with self.captureOnCommitCallbacks(execute=True):
+                Transaction.objects.create(type='expense', category=self.food, amount=Decimal('3'),
+                                           description='Coffee', date=self.today)
+            # The very object trained before: held in memory, not unpickled from the cache
+            self.assertIs(categorizer.load().model, model)
+            self.assertEqual(train.call_count, 1)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                Category.objects.create(name='health', type='expense')
+            categorizer.load()
+            self.assertEqual(train.call_count, 2)
+
+            clock += categorizer.RETRAIN_SECONDS
+            self.assertEqual(categorizer.load().model.size, 61)
+            self.assertEqual(train.call_count, 3)
+
+    def test_categorize_suggests_categories(self):
+        self.rule('hotel', self.food, max_amount=Decimal('5'))
+        response = self.client.post('/api/transactions/categorize/', {'transactions': [
+            {'description': 'Bakery on Main St', 'amount': '4.20'},
+            {'description': 'Hotel minibar', 'amount': '-4.00'},
+            {'description': 'Hotel minibar', 'amount': '40.00'},
+            {'description': 'Salary March', 'type': 'income'},
+            {'description': 'Something else'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results']
+        self.assertEqual([result['category'] for result in results],
+                         [self.food.id, self.food.id, self.travel.id, self.salary.id, None])
+        self.assertEqual([result['source'] for result in results], ['model', 'rule', 'model', 'model', None])
+        self.assertEqual(results[0]['category_name'], 'food')
+        self.assertEqual(results[1]['confidence'], 1.0)
+
+    def test_categorize_moves_existing_transactions(self):
+        rows = [Transaction.objects.create(type='expense', category=self.other, amount=Decimal('3.00'),
+                                           description=description, date=self.today)
+                for description in ('Coffee beans', 'Parking')]
+        ids = [row.id for row in rows]
+        preview = self.client.post('/api/transactions/categorize/', {'ids': ids}, format='json')
+        self.assertEqual(preview.data['applied'], 0)
+        self.assertEqual(preview.data['results'][0]['previous_category'], self.other.id)
+        self.assertEqual(Transaction.objects.filter(category=self.other).count(), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            applied = self.client.post('/api/transactions/categorize/', {'ids': ids, 'apply': True}, format='json')
+        self.assertEqual(applied.data['applied'], 1)
+        self.assertEqual(Transaction.objects.get(id=ids[0]).category, self.food)
+        self.assertEqual(Transaction.objects.get(id=ids[1]).category, self.other)
+        self.assertEqual(rollups.verify(), [])
+
+    def test_categorize_rejects_bad_requests(self):
+        for data in ({}, {'transactions': [], 'ids': []}, {'ids': ['x']}, {'ids': '12'}, {'ids': [10 ** 9]},
+                     {'transactions': [{'amount': '3'}]}, {'transactions': [], 'min_confidence': 2}):
+            with self.subTest(data=data):
+                response = self.client.post('/api/transactions/categorize/', data, format='json')
+                self.assertEqual(response.status_code, 400)
+
+    def test_rule_patterns_are_validated(self):
+        for data in ({'match_type': 'regex', 'pattern': 'caf(e'}, {'match_type': 'regex', 'pattern': r'(a)\1'},
+                     {'match_type': 'regex', 'pattern': '(a+)+$'}, {'match_type': 'regex', 'pattern': r'(\w+\s?)*x'},
+                     {'match_type': 'regex', 'pattern': '(ab){1000}'}, {'match_type': 'regex', 'pattern': 'a' * 101},
+                     {'pattern': '  '}, {'pattern': 'rent', 'min_amount': '10', 'max_amount': '5'}):
+            with self.subTest(data=data):
+                response = self.client.post('/api/category-rules/', {'name': 'x', 'category': self.food.id, **data})
+                self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/category-rules/', {
+            'name': 'Rent', 'pattern': 'rent', 'category': self.travel.id, 'min_amount': '500'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['category_name'], 'travel')
+
+    def test_reclassify_only_touches_the_catch_all_category(self):
+        for description in ('Coffee', 'Hotel', 'Bank fee'):
+            Transaction.objects.create(type='expense', category=self.other, amount=Decimal('2.00'),
+                                       description=description, date=self.today)
+        self.rule('coffee', self.travel)
+        predictor = categorizer.Categorizer(categorizer.active_rules(), categorizer.train())
+
+        dry_run = categorizer.reclassify(predictor, batch_size=2, dry_run=True)
+        self.assertEqual(dry_run, {'scanned': 3, 'changed': 2, 'rule': 1, 'model': 1})
+        self.assertEqual(Transaction.objects.filter(category=self.other).count(), 3)
+
+        self.assertEqual(categorizer.reclassify(predictor, batch_size=2), dry_run)
+        self.assertEqual(Transaction.objects.get(description='Coffee').category, self.travel)
+        self.assertEqual(Transaction.objects.get(description='Hotel').category, self.travel)
+        # Labelled transactions are left alone unless everything is reclassified
+        self.assertEqual(Transaction.objects.filter(description='Coffee shop', category=self.food).count(), 10)
+        everything = categorizer.reclassify(predictor, everything=True)
+        self.assertEqual((everything['scanned'], everything['changed']), (63, 10))
+        self.assertEqual(rollups.verify(), [])
+
+    def test_evaluate_reports_held_out_precision(self):
+        Transaction.objects.filter(description='Corner bakery').update(category=self.travel)
+        report = categorizer.evaluate(holdout_every=4)
+        ids = Transaction.objects.values_list('id', flat=True)
+        self.assertEqual(report['held_out'], sum(pk % 4 == 0 for pk in ids))
+        self.assertEqual(report['trained_on'] + report['held_out'], 60)
+        self.assertEqual(report['predicted'], report['held_out'])
+        self.assertEqual(report['precision'], 1.0)
+        self.assertEqual(report['sources']['model']['correct'], report['correct'])
+
+    def test_command_reports_precision_and_reclassifies(self):
+        Transaction.objects.create(type='expense', category=self.other, amount=Decimal('2.00'),
+                                   description='Hotel parking', date=self.today)
+        output = StringIO()
+        call_command('categorize', stdout=output)
+        self.assertIn('Held-out precision 100.0%', output.getvalue())
+        self.assertIn('Changed 1 of 1 transactions (0 by rule, 1 by model)', output.getvalue())
+        self.assertFalse(Transaction.objects.filter(category=self.other).exists())
+
+    def test_import_can_categorize_rows(self):
+        statement = ('date,description,amount,category\n2024-01-05,Coffee Shop #12,-3.50,\n'
+                     '2024-01-06,Hotel Roma,-90.00,\n2024-01-07,Mystery,-1.00,\n2024-01-08,Hotel,-5.00,food\n')
+        response = self.client.post('/api/transactions/import/', {
+            'file': SimpleUploadedFile('statement.csv', statement.encode('utf-8')), 'categorize': 'true',
+        }, format='multipart')
+        self.assertEqual(response.data['created'], 4)
+        self.assertEqual(response.data['categorized'], 2)
+        categories = dict(Transaction.objects.filter(date__year=2024).values_list('description', 'category__name'))
+        self.assertEqual(categories, {'Coffee Shop #12': 'food', 'Hotel Roma': 'travel', 'Mystery': 'other',
+                                      'Hotel': 'food'})
+
+
+class QueryPlanTests(TestCase):
+    """
+    Runs every API action against a seeded ledger and asks SQLite for the plan
+    of each statement it sent to finance_transaction. A bare table scan means
+    the statement found no usable index and will grow with the ledger.
+    """
+    # Matches "SCAN finance_transaction" (or an alias of it), not "SCAN ... USING INDEX"
+    FULL_SCAN = r'^SCAN (?:TABLE )?({})$'
+
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.today = timezone.now().date()
+        self.food = Category.objects.create(name='food', type='expense')
+        self.salary = Category.objects.create(name='salary', type='income')
+        self.period = BudgetPeriod.objects.create(
+            name='Current', start_date=month_start(self.today), end_date=month_end(self.today),
+        )
+        Budget.objects.create(budget_period=self.period, monthly_income=4000)
+        self.goal = Goal.objects.create(name='Trip', target_amount=Decimal('900'), target_date=date(2030, 1, 1))
+        self.rule = RecurringTransaction.objects.create(
+            name='Rent', type='expense', category=self.food, amount=Decimal('700'), description='Rent',
+            frequency='monthly', start_date=add_months(self.today, -2),
+        )
+        Transaction.objects.bulk_create([
+            Transaction(
+                type='income' if index % 5 == 0 else 'expense',
+                category=self.salary if index % 5 == 0 else self.food,
+                amount=Decimal(index % 90 + 1), description=f'Seeded {index}',
+                date=self.today - timedelta(days=index % 400),
+                budget_period=self.period if index % 400 < self.today.day else None,
+            )
+            for index in range(400)
+        ])
+        rollups.rebuild()
+        self.transaction = Transaction.objects.order_by('id').first()
+
+    def full_scans(self, method, url, data=None, **extra):
+        """Plans of the statements `method url` ran against finance_transaction that scan the whole table"""
+        statements = []
+
+        def record(execute, sql, params, many, context):
+            if not many and '"finance_transaction"' in sql and sql.lstrip().startswith(('SELECT', 'UPDATE', 'DELETE')):
+                statements.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record), self.captureOnCommitCallbacks(execute=True):
+            response = getattr(self.client, method)(url, data, **extra)
+        self.assertLess(response.status_code, 400, f'{method.upper()} {url}')
+        if response.streaming:
+            b''.join(response.streaming_content)
+
+        scans = []
+        with connection.cursor() as cursor:
+            for sql, params in statements:
+                aliases = ['finance_transaction', *re.findall(r'"finance_transaction" ([A-Z]\d+)\b', sql)]
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                for row in cursor.fetchall():
+                    if re.match(self.FULL_SCAN.format('|'.join(aliases)), row[-1]):
+                        scans.append((row[-1], sql))
+        return scans
+
+    def test_read_actions_use_indexes(self):
+        month = month_start(self.today)
+        urls = [
+            '/api/transactions/',
+            f'/api/transactions/?date_from={month}&date_to={self.today}',
+            f'/api/transactions/?type=expense&date_from={month}',
+            f'/api/transactions/?category={self.food.id}',
+            f'/api/transactions/?budget_period={self.period.id}&type=income',
+            '/api/transactions/?shape=columns&page_size=100',
+            f'/api/transactions/{self.transaction.id}/',
+            '/api/transactions/monthly_summary/',
+            '/api/transactions/six_month_trend/',
+            '/api/transactions/trend/?granularity=week',
+            '/api/transactions/analytics/?range=12m',
+            f'/api/transactions/analytics/?range=custom&date_from={month.replace(day=10) - timedelta(days=60)}'
+            f'&date_to={self.today}',
+            # An unfiltered export reads every row by design
+            f'/api/transactions/export/?date_from={month}',
+            '/api/budget/',
+            '/api/budget/current_budget/',
+            '/api/budget/budget_analysis/',
+            '/api/budget/report_data/',
+            '/api/budget-periods/',
+            '/api/budget-periods/current/',
+            '/api/categories/',
+            '/api/categories/by_type/',
+            '/api/category-rules/',
+            '/api/dashboard/',
+            f'/api/transactions/search/?q=seed&category={self.food.id}&date_from={month}',
+            '/api/recurring-transactions/',
+            '/api/recurring-transactions/due_transactions/',
+            '/api/goals/',
+            '/api/goals/active_goals/',
+            '/api/goals/completed_goals/',
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.full_scans('get', url), [])
+
+    def test_write_actions_use_indexes(self):
+        transaction_url = f'/api/transactions/{self.transaction.id}/'
+        requests = [
+            ('post', '/api/transactions/', {
+                'type': 'expense', 'category': self.food.id, 'amount': '4.00',
+                'description': 'Lunch', 'date': self.today.isoformat(),
+            }),
+            ('patch', transaction_url, {'amount': '6.00', 'date': (self.today - timedelta(days=40)).isoformat()}),
+            ('post', '/api/transactions/batch/', {'operations': [
+                {'op': 'update', 'id': self.transaction.id, 'data': {'category': self.salary.id, 'type': 'income'}},
+            ]}),
+            ('delete', transaction_url, None),
+            ('post', f'/api/recurring-transactions/{self.rule.id}/process_occurrence/', None),
+            ('post', '/api/recurring-transactions/process_due/', None),
+            ('post', '/api/budget/update_income/', {'monthly_income': 5000}),
+            ('post', f'/api/goals/{self.goal.id}/update_progress/', {'amount': 100}),
+            ('delete', f'/api/budget-periods/{self.period.id}/', None),
+            ('delete', f'/api/categories/{self.food.id}/', None),
+        ]
+        for method, url, data in requests:
+            with self.subTest(method=method, url=url):
+                self.assertEqual(self.full_scans(method, url, data, format='json'), [])
+
+        statement = 'date,description,amount,category\n2024-01-05,Coffee Shop,-3.50,salary\n'
+        self.assertEqual(self.full_scans('post', '/api/transactions/import/', {
+            'file': SimpleUploadedFile('statement.csv', statement.encode('utf-8')),
+        }, format='multipart'), [])
+        self.assertEqual(rollups.verify(), [])
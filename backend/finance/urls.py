@@ -1,16 +1,22 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (TransactionViewSet, BudgetViewSet, GoalViewSet, 
-                   CategoryViewSet, BudgetPeriodViewSet, RecurringTransactionViewSet)
+                   CategoryViewSet, CategoryRuleViewSet, BudgetPeriodViewSet, RecurringTransactionViewSet,
+                   dashboard, metrics, profile_detail, profiles)
 
 router = DefaultRouter()
 router.register(r'transactions', TransactionViewSet)
 router.register(r'budget', BudgetViewSet)
 router.register(r'goals', GoalViewSet)
 router.register(r'categories', CategoryViewSet)
+router.register(r'category-rules', CategoryRuleViewSet)
 router.register(r'budget-periods', BudgetPeriodViewSet)
 router.register(r'recurring-transactions', RecurringTransactionViewSet)
 
 urlpatterns = [
+    path('dashboard/', dashboard, name='dashboard'),
+    path('metrics', metrics, name='metrics'),
+    path('profiles', profiles, name='profiles'),
+    path('profiles/<str:profile_id>', profile_detail, name='profile-detail'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
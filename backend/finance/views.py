@@ -1,13 +1,75 @@
 from rest_framework import viewsets, status
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, renderer_classes
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
-from django.db.models import Sum, Q
+from django.db import IntegrityError, transaction as db_transaction
+from django.http import FileResponse, StreamingHttpResponse
+from django.urls import reverse
 from django.utils import timezone
-from datetime import datetime, timedelta
-from .models import Transaction, Budget, Goal, Category, BudgetPeriod, RecurringTransaction
+from django.utils.dateparse import parse_date
+from django.utils.decorators import method_decorator
+import io
+from .analytics import (RANGE_MONTHS, TREND_GRANULARITIES, add_months, analytics_summary,
+                        cached_analytics_summary, month_span, month_summary, six_month_savings,
+                        trend as build_trend)
+from .batch import apply_operations
+from .caching import (BUDGET_PERIODS_SCOPE, BUDGETS_SCOPE, CATEGORIES_SCOPE, GOALS_SCOPE, LEDGER_SCOPE,
+                      RECURRING_SCOPE, TRANSACTIONS_SCOPE, cached, cached_response, conditional, month_scope)
+from .exports import CONTENT_TYPES, STREAMERS, CSVExportRenderer, NDJSONExportRenderer
+from .filters import TransactionFilterBackend
+from .importers import PARSERS, StatementImporter, StatementParseError, detect_format
+from .metrics import PrometheusRenderer, snapshot as metrics_snapshot
+from .models import Transaction, Budget, Goal, Category, BudgetPeriod, RecurringTransaction, CategoryRule
+from .pagination import TransactionCursorPagination
+from .renderers import ORJSONRenderer
+from . import categorizer, fanout, fulltext, periods, profiling, recurring
+from .rollups import month_end, month_start, summarize
 from .serializers import (TransactionSerializer, BudgetSerializer, GoalSerializer, 
-                         CategorySerializer, BudgetPeriodSerializer, RecurringTransactionSerializer)
+                         CategorySerializer, BudgetPeriodSerializer, RecurringTransactionSerializer,
+                         TransactionOperationSerializer, CategoryRuleSerializer, CategorizeItemSerializer,
+                         transaction_columns)
 
+BATCH_MAX_OPERATIONS = 10000
+SEARCH_PAGE_SIZE = 50
+SEARCH_MAX_PAGE_SIZE = 500
+
+
+# Cache scopes that cached and conditional responses depend on (see caching.py)
+
+def category_scopes(request, today):
+    return [CATEGORIES_SCOPE]
+
+
+def goal_scopes(request, today):
+    return [GOALS_SCOPE]
+
+
+def transaction_list_scopes(request, today):
+    return [TRANSACTIONS_SCOPE, CATEGORIES_SCOPE, BUDGET_PERIODS_SCOPE, RECURRING_SCOPE]
+
+
+def current_month_scopes(request, today):
+    return [CATEGORIES_SCOPE, month_scope(today)]
+
+
+def six_month_scopes(request, today):
+    return [month_scope(add_months(today, -n)) for n in range(6)]
+
+
+def budget_scopes(request, today):
+    return [BUDGETS_SCOPE, BUDGET_PERIODS_SCOPE]
+
+
+def dashboard_scopes(request, today):
+    return [*transaction_list_scopes(request, today), *six_month_scopes(request, today),
+            BUDGETS_SCOPE, month_scope(today)]
+
+
+def budget_analysis_scopes(request, today):
+    return [BUDGETS_SCOPE, BUDGET_PERIODS_SCOPE, CATEGORIES_SCOPE, LEDGER_SCOPE]
+
+
+@method_decorator(conditional(category_scopes), name='list')
 class CategoryViewSet(viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
@@ -17,6 +79,8 @@ class CategoryViewSet(viewsets.ModelViewSet):
         return Category.objects.all().order_by('type', 'name')
     
     @action(detail=False, methods=['get'])
+    @method_decorator(conditional(category_scopes))
+    @cached_response('by_type', category_scopes)
     def by_type(self, request):
         """Get categories grouped by type"""
         income_categories = Category.objects.filter(type='income').order_by('name')
@@ -83,6 +147,10 @@ class CategoryViewSet(viewsets.ModelViewSet):
             'created_count': created_count
         })
 
+class CategoryRuleViewSet(viewsets.ModelViewSet):
+    queryset = CategoryRule.objects.select_related('category')
+    serializer_class = CategoryRuleSerializer
+
 class BudgetPeriodViewSet(viewsets.ModelViewSet):
     queryset = BudgetPeriod.objects.all()
     serializer_class = BudgetPeriodSerializer
@@ -94,27 +162,11 @@ class BudgetPeriodViewSet(viewsets.ModelViewSet):
     def current(self, request):
         """Get the current active budget period"""
         today = timezone.now().date()
-        current_period = BudgetPeriod.objects.filter(
-            start_date__lte=today,
-            end_date__gte=today,
-            is_active=True
-        ).first()
+        current_period = periods.period_for(today)
         
+        # Periods are created ahead of time by `manage.py generate_periods`
         if not current_period:
-            # Create a default monthly period for current month
-            start_date = today.replace(day=1)
-            if start_date.month == 12:
-                end_date = start_date.replace(year=start_date.year + 1, month=1, day=1) - timedelta(days=1)
-            else:
-                end_date = start_date.replace(month=start_date.month + 1, day=1) - timedelta(days=1)
-            
-            current_period = BudgetPeriod.objects.create(
-                name=f"Monthly Budget - {start_date.strftime('%B %Y')}",
-                period_type='monthly',
-                start_date=start_date,
-                end_date=end_date,
-                is_active=True
-            )
+            return Response({'error': 'No budget period covers today'}, status=404)
         
         return Response(BudgetPeriodSerializer(current_period).data)
 
@@ -123,7 +175,7 @@ class RecurringTransactionViewSet(viewsets.ModelViewSet):
     serializer_class = RecurringTransactionSerializer
     
     def get_queryset(self):
-        return RecurringTransaction.objects.filter(is_active=True).order_by('next_occurrence')
+        return RecurringTransaction.objects.filter(is_active=True).select_related('category').order_by('next_occurrence')
     
     @action(detail=False, methods=['get'])
     def due_transactions(self, request):
@@ -132,7 +184,7 @@ class RecurringTransactionViewSet(viewsets.ModelViewSet):
         due_transactions = RecurringTransaction.objects.filter(
             is_active=True,
             next_occurrence__lte=today
-        )
+        ).select_related('category')
         return Response(RecurringTransactionSerializer(due_transactions, many=True).data)
     
     @action(detail=True, methods=['post'])
@@ -140,24 +192,23 @@ class RecurringTransactionViewSet(viewsets.ModelViewSet):
         """Process a recurring transaction occurrence and create actual transaction"""
         recurring_transaction = self.get_object()
         
-        # Get the current budget period
-        today = timezone.now().date()
-        current_period = BudgetPeriod.objects.filter(
-            start_date__lte=today,
-            end_date__gte=today,
-            is_active=True
-        ).first()
-        
-        # Create the actual transaction
-        transaction = Transaction.objects.create(
-            type=recurring_transaction.type,
-            category=recurring_transaction.category,
-            amount=recurring_transaction.amount,
-            description=f"{recurring_transaction.description} (Auto-generated)",
-            date=recurring_transaction.next_occurrence,
-            budget_period=current_period,
-            recurring_transaction=recurring_transaction
-        )
+        # Create the actual transaction, in the period containing its date
+        occurrence = recurring_transaction.next_occurrence
+        periods.extend_calendar(occurrence)
+        try:
+            with db_transaction.atomic():
+                transaction = Transaction.objects.create(
+                    type=recurring_transaction.type,
+                    category=recurring_transaction.category,
+                    amount=recurring_transaction.amount,
+                    description=f"{recurring_transaction.description} (Auto-generated)",
+                    date=occurrence,
+                    budget_period_id=periods.resolve(occurrence),
+                    recurring_transaction=recurring_transaction
+                )
+        except IntegrityError:
+            # Already generated (by process_due or a concurrent request): move past it as process_due does
+            transaction = None
         
         # Update next occurrence
         recurring_transaction.next_occurrence = recurring_transaction.calculate_next_occurrence()
@@ -169,209 +220,308 @@ class RecurringTransactionViewSet(viewsets.ModelViewSet):
         
         recurring_transaction.save()
         
+        if transaction is None:
+            return Response({
+                'error': f'The occurrence on {occurrence} was already generated',
+                'next_occurrence': recurring_transaction.next_occurrence
+            }, status=status.HTTP_409_CONFLICT)
+        
         return Response({
             'message': 'Recurring transaction processed successfully',
             'transaction': TransactionSerializer(transaction).data,
             'next_occurrence': recurring_transaction.next_occurrence
         })
+    
+    @action(detail=False, methods=['post'])
+    def process_due(self, request):
+        """Generate every missed occurrence of all due recurring transactions in one batch"""
+        today = timezone.now().date()
+        return Response(recurring.process_due(today))
 
+@method_decorator(conditional(transaction_list_scopes), name='list')
+@method_decorator(conditional(transaction_list_scopes), name='search')
 class TransactionViewSet(viewsets.ModelViewSet):
-    queryset = Transaction.objects.all()
+    queryset = Transaction.objects.select_related('category', 'budget_period', 'recurring_transaction')
     serializer_class = TransactionSerializer
+    pagination_class = TransactionCursorPagination
+    filter_backends = [TransactionFilterBackend]
+    
+    def list(self, request, *args, **kwargs):
+        """List transactions as rows (default) or, with ?shape=columns, as parallel arrays"""
+        shape = request.query_params.get('shape', 'rows')
+        if shape == 'rows':
+            return super().list(request, *args, **kwargs)
+        if shape != 'columns':
+            return Response({'error': "shape must be 'rows' or 'columns'"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Related names go into lookup tables, so the page itself needs no joins
+        page = self.paginate_queryset(self.filter_queryset(Transaction.objects.all()))
+        return self.get_paginated_response(transaction_columns(page))
     
     def perform_create(self, serializer):
-        # Get current budget period if not specified
+        # Default to the budget period containing the transaction's date
         if not serializer.validated_data.get('budget_period'):
-            today = timezone.now().date()
-            current_period = BudgetPeriod.objects.filter(
-                start_date__lte=today,
-                end_date__gte=today,
-                is_active=True
-            ).first()
-            serializer.save(budget_period=current_period)
+            periods.extend_calendar(serializer.validated_data['date'])
+            serializer.save(budget_period_id=periods.resolve(serializer.validated_data['date']))
         else:
             serializer.save()
     
     @action(detail=False, methods=['get'])
+    @method_decorator(conditional(current_month_scopes))
+    @cached_response('monthly_summary', current_month_scopes)
     def monthly_summary(self, request):
         """Get current month's financial summary"""
-        now = timezone.now()
-        current_month = now.month
-        current_year = now.year
-        
-        monthly_transactions = Transaction.objects.filter(
-            date__month=current_month,
-            date__year=current_year
-        )
-        
-        monthly_income = monthly_transactions.filter(type='income').aggregate(
-            total=Sum('amount'))['total'] or 0
-        
-        monthly_expenses = monthly_transactions.filter(type='expense').aggregate(
-            total=Sum('amount'))['total'] or 0
-        
-        monthly_savings = monthly_income - monthly_expenses
-        
-        # Enhanced expense breakdown by category
-        expense_breakdown = {}
-        expense_transactions = monthly_transactions.filter(type='expense').select_related('category')
-        
-        for transaction in expense_transactions:
-            category_name = transaction.category.name if transaction.category else 'uncategorized'
-            if category_name not in expense_breakdown:
-                expense_breakdown[category_name] = {
-                    'amount': 0,
-                    'color': transaction.category.color if transaction.category else '#6b7280',
-                    'count': 0
-                }
-            expense_breakdown[category_name]['amount'] += float(transaction.amount)
-            expense_breakdown[category_name]['count'] += 1
-        
-        return Response({
-            'monthly_income': float(monthly_income),
-            'monthly_expenses': float(monthly_expenses),
-            'monthly_savings': float(monthly_savings),
-            'expense_breakdown': expense_breakdown,
-            'transaction_count': monthly_transactions.count()
-        })
+        return Response(month_summary(timezone.now().date()))
     
     @action(detail=False, methods=['get'])
+    @method_decorator(conditional(six_month_scopes))
+    @cached_response('six_month_trend', six_month_scopes)
     def six_month_trend(self, request):
         """Get 6-month savings trend data"""
-        trends = []
-        
-        for i in range(5, -1, -1):  # Last 6 months
-            date = timezone.now() - timedelta(days=30*i)
-            month = date.strftime('%b')
-            year = date.year
-            month_num = date.month
-            
-            month_transactions = Transaction.objects.filter(
-                date__month=month_num,
-                date__year=year
-            )
-            
-            income = month_transactions.filter(type='income').aggregate(
-                total=Sum('amount'))['total'] or 0
-            expenses = month_transactions.filter(type='expense').aggregate(
-                total=Sum('amount'))['total'] or 0
-            
-            trends.append({
-                'month': month,
-                'income': float(income),
-                'expenses': float(expenses),
-                'savings': float(income - expenses)
-            })
-        
-        return Response(trends)
-
-class BudgetViewSet(viewsets.ModelViewSet):
-    queryset = Budget.objects.all()
-    serializer_class = BudgetSerializer
+        return Response(six_month_savings(timezone.now().date()))
     
     @action(detail=False, methods=['get'])
-    def monthly_summary(self, request):
-        """Get current month's financial summary"""
-        now = timezone.now()
-        current_month = now.month
-        current_year = now.year
+    def trend(self, request):
+        """Income/expense trend over the last N months, bucketed by week, month or quarter"""
+        granularity = request.query_params.get('granularity', 'month')
+        try:
+            months = int(request.query_params.get('months', 6))
+        except ValueError:
+            months = 0
         
-        monthly_transactions = Transaction.objects.filter(
-            date__month=current_month,
-            date__year=current_year
-        )
+        if granularity not in TREND_GRANULARITIES or not 1 <= months <= 120:
+            return Response(
+                {'error': 'months must be between 1 and 120 and granularity one of week, month or quarter'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        monthly_income = monthly_transactions.filter(type='income').aggregate(
-            total=Sum('amount'))['total'] or 0
+        return Response(build_trend(months, granularity, timezone.now().date()))
+    
+    @action(detail=False, methods=['get'])
+    def analytics(self, request):
+        """Aggregated trend, category breakdown and insights for the Analytics page"""
+        range_param = request.query_params.get('range', '3m')
+        today = timezone.now().date()
         
-        monthly_expenses = monthly_transactions.filter(type='expense').aggregate(
-            total=Sum('amount'))['total'] or 0
+        if range_param == 'custom':
+            try:
+                start_date = parse_date(request.query_params.get('date_from', ''))
+                end_date = parse_date(request.query_params.get('date_to', ''))
+            except ValueError:
+                start_date = end_date = None
+            if not start_date or not end_date or start_date > end_date:
+                return Response(
+                    {'error': 'A custom range needs valid date_from and date_to (YYYY-MM-DD)'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            months = month_span(start_date, end_date)
+        elif range_param in RANGE_MONTHS:
+            months = RANGE_MONTHS[range_param]
+            start_date = add_months(today, -months)
+            end_date = today
+        else:
+            return Response(
+                {'error': 'range must be one of 3m, 6m, 12m or custom'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        monthly_savings = monthly_income - monthly_expenses
+        return Response(analytics_summary(start_date, end_date, months))
+
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """Apply a list of create/update/delete operations in one atomic request"""
+        operations = request.data.get('operations') if isinstance(request.data, dict) else request.data
+        if not isinstance(operations, list):
+            return Response(
+                {'error': 'Send a list of operations, or an object with an "operations" list'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Expense breakdown
-        expense_breakdown = {}
-        expense_categories = ['food', 'transportation', 'entertainment', 'shopping', 'bills', 'healthcare', 'other']
+        # Read only the rows the operations refer to; ids that do not parse are left for the serializer to reject
+        ids = {'id': set(), 'category': set(), 'budget_period': set(), 'recurring_transaction': set()}
+        for operation in operations[:BATCH_MAX_OPERATIONS + 1]:
+            if not isinstance(operation, dict):
+                continue
+            references = [('id', operation.get('id'))] if operation.get('op') in ('update', 'delete') else []
+            if isinstance(operation.get('data'), dict):
+                references += [(field, operation['data'].get(field)) for field in ids if field != 'id']
+            for field, value in references:
+                if value is not None and not isinstance(value, bool):
+                    try:
+                        ids[field].add(int(value))
+                    except (TypeError, ValueError):
+                        pass
+        
+        context = {
+            'request': request,
+            'instances': Transaction.objects.select_related(
+                'category', 'budget_period', 'recurring_transaction').in_bulk(list(ids['id'])),
+            'categories': Category.objects.in_bulk(list(ids['category'])),
+            'budget_periods': BudgetPeriod.objects.in_bulk(list(ids['budget_period'])),
+            'recurring_transactions': RecurringTransaction.objects.in_bulk(list(ids['recurring_transaction'])),
+        }
+        serializer = TransactionOperationSerializer(
+            data=operations, many=True, max_length=BATCH_MAX_OPERATIONS, context=context)
+        serializer.is_valid(raise_exception=True)
+        
+        results = apply_operations(serializer.validated_data)
+        
+        return Response({'results': [
+            {'op': op, 'id': target, 'status': 'deleted'} if op == 'delete' else
+            {'op': op, 'id': target.pk, 'status': f'{op}d', 'transaction': TransactionSerializer(target).data}
+            for op, target in results
+        ]})
+    
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_statement(self, request):
+        """
+        Import a CSV, OFX or QIF bank statement, skipping rows imported before.
+        With categorize=true, rows without a category get a suggested one.
+        """
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response({'error': 'Upload a statement in the "file" field'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        statement_format = request.data.get('format') or detect_format(upload.name)
+        if statement_format not in PARSERS:
+            return Response(
+                {'error': 'format must be one of csv, ofx or qif'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        for category in expense_categories:
-            amount = monthly_transactions.filter(
-                type='expense', 
-                category=category
-            ).aggregate(total=Sum('amount'))['total'] or 0
-            if amount > 0:
-                expense_breakdown[category] = float(amount)
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', errors='replace', newline='')
+        predictor = None
+        if request.data.get('categorize') in ('true', '1', 'on'):
+            predictor = categorizer.load()
+        importer = StatementImporter(date_format=request.data.get('date_format') or None, categorizer=predictor)
+        try:
+            result = importer.run(PARSERS[statement_format](stream))
+        except StatementParseError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
         
+        return Response(result, status=status.HTTP_201_CREATED if result['created'] else status.HTTP_200_OK)
+    
+    @action(detail=False, methods=['get'], renderer_classes=[CSVExportRenderer, NDJSONExportRenderer])
+    def export(self, request):
+        """Stream every transaction matching the list filters as ?format=csv (default) or ?format=ndjson"""
+        export_format = request.accepted_renderer.format
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(STREAMERS[export_format](queryset), content_type=CONTENT_TYPES[export_format])
+        response['Content-Disposition'] = f'attachment; filename="transactions.{export_format}"'
+        return response
+    
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Transactions whose description matches ?q= (every word, each as a
+        prefix), best match first. Takes the list filters, plus limit (at most
+        500) and offset; next_offset is set while more matches follow.
+        """
+        text = request.query_params.get('q', '')
+        if not fulltext.words(text):
+            return Response({'error': 'q must contain at least one word'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(int(request.query_params.get('limit', SEARCH_PAGE_SIZE)), SEARCH_MAX_PAGE_SIZE)
+            offset = int(request.query_params.get('offset', 0))
+        except ValueError:
+            return Response({'error': 'limit and offset must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1 or offset < 0:
+            return Response({'error': 'limit must be positive and offset not negative'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        
+        queryset = fulltext.search(self.filter_queryset(self.get_queryset()), text)
+        # One extra row tells whether another page follows
+        rows = list(queryset[offset:offset + limit + 1])
         return Response({
-            'monthly_income': float(monthly_income),
-            'monthly_expenses': float(monthly_expenses),
-            'monthly_savings': float(monthly_savings),
-            'expense_breakdown': expense_breakdown,
-            'transaction_count': monthly_transactions.count()
+            'query': text,
+            'next_offset': offset + limit if len(rows) > limit else None,
+            'results': TransactionSerializer(rows[:limit], many=True).data,
         })
     
-    @action(detail=False, methods=['get'])
-    def six_month_trend(self, request):
-        """Get 6-month savings trend data"""
-        trends = []
-        
-        for i in range(5, -1, -1):  # Last 6 months
-            date = timezone.now() - timedelta(days=30*i)
-            month = date.strftime('%b')
-            year = date.year
-            month_num = date.month
-            
-            month_transactions = Transaction.objects.filter(
-                date__month=month_num,
-                date__year=year
-            )
-            
-            income = month_transactions.filter(type='income').aggregate(
-                total=Sum('amount'))['total'] or 0
-            expenses = month_transactions.filter(type='expense').aggregate(
-                total=Sum('amount'))['total'] or 0
-            
-            trends.append({
-                'month': month,
-                'income': float(income),
-                'expenses': float(expenses),
-                'savings': float(income - expenses)
-            })
-        
-        return Response(trends)
+    @action(detail=False, methods=['post'])
+    def categorize(self, request):
+        """
+        Suggest categories from category rules and the words of categorized
+        transactions. Send {"transactions": [{"description", "amount", "type"}]}
+        for new rows, or {"ids": [...]} for existing ones, with "apply": true to
+        move them to the suggested categories. min_confidence (0-1) sets how
+        sure a suggestion from the words must be.
+        """
+        data = request.data if isinstance(request.data, dict) else {}
+        items, ids = data.get('transactions'), data.get('ids')
+        if (items is None) == (ids is None):
+            return Response({'error': 'Send either a "transactions" or an "ids" list'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            min_confidence = float(data.get('min_confidence', categorizer.MIN_CONFIDENCE))
+        except (TypeError, ValueError):
+            min_confidence = None
+        if min_confidence is None or not 0 <= min_confidence <= 1:
+            return Response({'error': 'min_confidence must be a number from 0 to 1'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        
+        if items is not None:
+            serializer = CategorizeItemSerializer(data=items, many=True, max_length=BATCH_MAX_OPERATIONS)
+            serializer.is_valid(raise_exception=True)
+            rows = [(None, item['type'], item.get('amount'), item['description'], None)
+                    for item in serializer.validated_data]
+        else:
+            try:
+                if not isinstance(ids, list):
+                    raise TypeError
+                ids = [int(value) for value in ids]
+            except (TypeError, ValueError):
+                return Response({'error': 'ids must be a list of transaction ids'}, status=status.HTTP_400_BAD_REQUEST)
+            if len(ids) > BATCH_MAX_OPERATIONS:
+                return Response({'error': f'Send at most {BATCH_MAX_OPERATIONS} ids'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            found = Transaction.objects.in_bulk(ids)
+            missing = [value for value in ids if value not in found]
+            if missing:
+                return Response({'error': f'Transactions not found: {missing[:20]}'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            rows = [(found[value].id, found[value].type, found[value].amount, found[value].description,
+                     found[value].category_id) for value in ids]
+        
+        predictor = categorizer.load(min_confidence)
+        names = dict(Category.objects.values_list('id', 'name'))
+        results = []
+        changes = {}
+        for transaction_id, transaction_type, amount, description, category_id in rows:
+            prediction = predictor.predict(description, abs(amount) if amount is not None else None, transaction_type)
+            result = {'id': transaction_id, 'previous_category': category_id} if transaction_id else {}
+            result.update({'category': None, 'category_name': None, 'source': None, 'confidence': None})
+            if prediction is not None:
+                result.update({
+                    'category': prediction[0],
+                    'category_name': names.get(prediction[0]),
+                    'source': prediction[1],
+                    'confidence': round(prediction[2], 4),
+                })
+                if transaction_id and prediction[0] != category_id:
+                    changes.setdefault(prediction[0], []).append(transaction_id)
+            results.append(result)
+        
+        applied = 0
+        if ids is not None and data.get('apply') is True:
+            categorizer.apply_changes(changes)
+            applied = sum(len(moved) for moved in changes.values())
+        return Response({'results': results, 'applied': applied})
 
 class BudgetViewSet(viewsets.ModelViewSet):
     queryset = Budget.objects.all()
     serializer_class = BudgetSerializer
     
     def get_queryset(self):
-        return Budget.objects.all().order_by('-created_at')
+        return Budget.objects.select_related('budget_period').order_by('-created_at')
     
     @action(detail=False, methods=['get'])
+    @method_decorator(conditional(budget_scopes))
+    @cached_response('current_budget', budget_scopes)
     def current_budget(self, request):
-        """Get or create current budget for active period"""
-        # Get current budget period
-        today = timezone.now().date()
-        current_period = BudgetPeriod.objects.filter(
-            start_date__lte=today,
-            end_date__gte=today,
-            is_active=True
-        ).first()
-        
-        if not current_period:
-            # Create default monthly period
-            start_date = today.replace(day=1)
-            if start_date.month == 12:
-                end_date = start_date.replace(year=start_date.year + 1, month=1, day=1) - timedelta(days=1)
-            else:
-                end_date = start_date.replace(month=start_date.month + 1, day=1) - timedelta(days=1)
-            
-            current_period = BudgetPeriod.objects.create(
-                name=f"Monthly Budget - {start_date.strftime('%B %Y')}",
-                period_type='monthly',
-                start_date=start_date,
-                end_date=end_date,
-                is_active=True
-            )
+        """Get or create the budget of the current period"""
+        # Get current budget period, extending the calendar if it has run out
+        current_period = periods.current_period()
         
         budget, created = Budget.objects.get_or_create(
             budget_period=current_period,
@@ -389,13 +539,8 @@ class BudgetViewSet(viewsets.ModelViewSet):
         if period_id:
             budget_period = BudgetPeriod.objects.get(id=period_id)
         else:
-            # Get current budget period
-            today = timezone.now().date()
-            budget_period = BudgetPeriod.objects.filter(
-                start_date__lte=today,
-                end_date__gte=today,
-                is_active=True
-            ).first()
+            # Get current budget period, extending the calendar if it has run out
+            budget_period = periods.current_period()
         
         budget, created = Budget.objects.get_or_create(
             budget_period=budget_period,
@@ -409,6 +554,8 @@ class BudgetViewSet(viewsets.ModelViewSet):
         return Response(BudgetSerializer(budget).data)
     
     @action(detail=False, methods=['get'])
+    @method_decorator(conditional(budget_analysis_scopes))
+    @cached_response('budget_analysis', budget_analysis_scopes)
     def budget_analysis(self, request):
         """Analyze current spending vs budget for active period"""
         period_id = request.query_params.get('period_id')
@@ -418,46 +565,32 @@ class BudgetViewSet(viewsets.ModelViewSet):
             budget = Budget.objects.filter(budget_period=budget_period).first()
         else:
             # Get current budget period
-            today = timezone.now().date()
-            budget_period = BudgetPeriod.objects.filter(
-                start_date__lte=today,
-                end_date__gte=today,
-                is_active=True
-            ).first()
+            budget_period = periods.period_for(timezone.now().date())
             budget = Budget.objects.filter(budget_period=budget_period).first()
         
         if not budget:
             return Response({'error': 'No budget found for this period'}, status=404)
         
-        # Get transactions for the budget period
-        period_transactions = Transaction.objects.filter(
-            budget_period=budget_period
-        ) if budget_period else Transaction.objects.filter(
-            date__month=timezone.now().month,
-            date__year=timezone.now().year
-        )
+        # Totals for the budget period, read from the monthly rollup
+        if budget_period:
+            rows = summarize(fields=('type', 'category__type', 'category__name'), budget_period=budget_period)
+        else:
+            today = timezone.now().date()
+            rows = summarize(month_start(today), month_end(today), fields=('type', 'category__type', 'category__name'))
         
         # Calculate actual spending (dynamic categorization based on actual categories)
-        needs_categories = Category.objects.filter(
-            type='expense',
-            name__in=['food', 'bills', 'healthcare', 'transportation', 'rent', 'utilities']
-        )
-        wants_categories = Category.objects.filter(
-            type='expense'
-        ).exclude(id__in=needs_categories.values_list('id', flat=True))
-        
-        needs_spent = period_transactions.filter(
-            type='expense',
-            category__in=needs_categories
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        wants_spent = period_transactions.filter(
-            type='expense',
-            category__in=wants_categories
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        period_income = period_transactions.filter(type='income').aggregate(
-            total=Sum('amount'))['total'] or 0
+        needs_names = {'food', 'bills', 'healthcare', 'transportation', 'rent', 'utilities'}
+        needs_spent = 0
+        wants_spent = 0
+        period_income = 0
+        for row in rows:
+            if row['type'] == 'income':
+                period_income += row['total']
+            elif row['category__type'] == 'expense':
+                if row['category__name'] in needs_names:
+                    needs_spent += row['total']
+                else:
+                    wants_spent += row['total']
         
         actual_savings = period_income - needs_spent - wants_spent
         
@@ -479,109 +612,66 @@ class BudgetViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def report_data(self, request):
         """Get comprehensive data for PDF reports"""
-        # Get period parameter
         period_id = request.query_params.get('period_id')
-        months_back = int(request.query_params.get('months_back', 3))
+        try:
+            months_back = int(request.query_params.get('months_back', 3))
+        except ValueError:
+            months_back = 0
+        if months_back < 1:
+            return Response({'error': 'months_back must be a positive integer'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Calculate date range
+        # Calendar months back from today, or the requested budget period
         end_date = timezone.now().date()
-        start_date = end_date - timedelta(days=months_back * 30)
+        start_date = add_months(end_date, -months_back)
+        months = months_back
         
+        budget_period = None
         if period_id:
             try:
                 budget_period = BudgetPeriod.objects.get(id=period_id)
-                start_date = budget_period.start_date
-                end_date = budget_period.end_date
-            except BudgetPeriod.DoesNotExist:
-                pass
-        
-        # Get transactions
-        transactions = Transaction.objects.filter(
-            date__gte=start_date,
-            date__lte=end_date
-        ).order_by('-date')
+            except (BudgetPeriod.DoesNotExist, ValueError):
+                budget_period = None
+        if budget_period:
+            start_date = budget_period.start_date
+            end_date = budget_period.end_date
+            months = month_span(start_date, end_date)
         
         # Get budget data
-        current_budget = None
-        if period_id:
-            current_budget = Budget.objects.filter(budget_period_id=period_id).first()
-        else:
-            current_period = BudgetPeriod.objects.filter(
-                start_date__lte=end_date,
-                end_date__gte=end_date,
-                is_active=True
-            ).first()
-            if current_period:
-                current_budget = Budget.objects.filter(budget_period=current_period).first()
-        
-        # Calculate analytics
-        total_income = transactions.filter(type='income').aggregate(
-            total=Sum('amount'))['total'] or 0
-        total_expenses = transactions.filter(type='expense').aggregate(
-            total=Sum('amount'))['total'] or 0
-        
-        # Category breakdown
-        category_breakdown = transactions.filter(type='expense').values(
-            'category__name', 'category__color'
-        ).annotate(
-            total=Sum('amount')
-        ).order_by('-total')
-        
-        # Monthly trend
-        monthly_data = {}
-        for transaction in transactions:
-            month_key = transaction.date.strftime('%Y-%m')
-            month_name = transaction.date.strftime('%b %Y')
-            
-            if month_key not in monthly_data:
-                monthly_data[month_key] = {
-                    'month': month_name,
-                    'income': 0,
-                    'expenses': 0
-                }
-            
-            if transaction.type == 'income':
-                monthly_data[month_key]['income'] += float(transaction.amount)
-            else:
-                monthly_data[month_key]['expenses'] += float(transaction.amount)
-        
-        monthly_trend = list(monthly_data.values())
+        budget_period_id = budget_period.pk if budget_period else periods.resolve(end_date)
+        current_budget = Budget.objects.filter(budget_period_id=budget_period_id).first() if budget_period_id else None
+        
+        # Aggregates come from the rollup and are cached until a write touches the range
+        summary = cached_analytics_summary(
+            start_date, end_date, months, key=f"report:{budget_period.pk if budget_period else '-'}")
+        
+        # Detail rows are served a keyset page at a time (?cursor=, ?page_size=)
+        paginator = TransactionCursorPagination()
+        transactions = paginator.paginate_queryset(
+            Transaction.objects
+            .filter(date__gte=start_date, date__lte=end_date)
+            .select_related('category', 'budget_period', 'recurring_transaction'),
+            request,
+            view=self
+        )
         
-        # Compile response
         return Response({
             'period': {
                 'start_date': start_date.isoformat(),
                 'end_date': end_date.isoformat(),
                 'months_back': months_back
             },
-            'transactions': TransactionSerializer(transactions[:50], many=True).data,  # Limit for performance
+            'transactions': TransactionSerializer(transactions, many=True).data,
+            'transactions_next': paginator.get_next_link(),
             'budget': BudgetSerializer(current_budget).data if current_budget else None,
             'analytics': {
-                'insights': {
-                    'totalIncome': float(total_income),
-                    'totalExpenses': float(total_expenses),
-                    'netWorthChange': float(total_income - total_expenses),
-                    'savingsRate': ((total_income - total_expenses) / total_income * 100) if total_income > 0 else 0,
-                    'avgMonthlySpending': float(total_expenses) / max(months_back, 1),
-                    'avgDailySpending': float(total_expenses) / max(months_back * 30, 1),
-                    'largestCategory': {
-                        'category': category_breakdown[0]['category__name'],
-                        'amount': float(category_breakdown[0]['total'])
-                    } if category_breakdown else None
-                },
-                'categoryBreakdown': [
-                    {
-                        'name': item['category__name'] or 'Uncategorized',
-                        'amount': float(item['total']),
-                        'color': item['category__color']
-                    }
-                    for item in category_breakdown
-                ],
-                'monthlyTrend': monthly_trend
+                'insights': summary['insights'],
+                'categoryBreakdown': summary['categoryBreakdown'],
+                'monthlyTrend': summary['monthlyTrend']
             }
         })
 
 
+@method_decorator(conditional(goal_scopes), name='list')
 class GoalViewSet(viewsets.ModelViewSet):
     queryset = Goal.objects.all()
     serializer_class = GoalSerializer
@@ -618,3 +708,95 @@ class GoalViewSet(viewsets.ModelViewSet):
         completed_goals = Goal.objects.filter(completed=True)
         return Response(GoalSerializer(completed_goals, many=True).data)
 
+
+@conditional(dashboard_scopes)
+@api_view(['GET'])
+def dashboard(request):
+    """
+    Everything the dashboard shows on load in one response: the first page of
+    the ledger (its `next` link continues in /api/transactions/ with the same
+    page_size and filters), the categories, the current budget period and
+    budget, this month's summary and the six month trend.
+    
+    The period and the categories are read once and shared. The other parts
+    run concurrently (finance/fanout.py) and reuse the cache entries of their
+    own endpoints, so the response takes about as long as its slowest part.
+    """
+    today = timezone.now().date()
+    period = periods.period_for(today)
+    categories = CategorySerializer(Category.objects.all().order_by('type', 'name'), many=True).data
+    by_id = {category['id']: category for category in categories}
+    
+    def transactions():
+        queryset = TransactionFilterBackend().filter_queryset(request, TransactionViewSet.queryset.all(), None)
+        paginator = TransactionCursorPagination()
+        page = paginator.paginate_queryset(queryset, request)
+        paginator.base_url = request.build_absolute_uri(
+            f"{reverse('transaction-list')}?{request.query_params.urlencode()}"
+        )
+        return paginator.get_paginated_response(TransactionSerializer(page, many=True).data).data
+    
+    def current_budget():
+        budget = Budget.objects.filter(budget_period=period).first() if period else None
+        return BudgetSerializer(budget).data if budget else None
+    
+    parts = fanout.run_concurrently({
+        'transactions': transactions,
+        'monthly_summary': lambda: cached(
+            f'monthly_summary:{today.isoformat()}:', current_month_scopes(request, today),
+            lambda: month_summary(today, by_id),
+        ),
+        'six_month_trend': lambda: cached(
+            f'six_month_trend:{today.isoformat()}:', six_month_scopes(request, today),
+            lambda: six_month_savings(today),
+        ),
+        'current_budget': current_budget,
+    })
+    return Response({
+        **parts,
+        'categories': categories,
+        'current_period': BudgetPeriodSerializer(period).data if period else None,
+    })
+
+
+@api_view(['GET'])
+@renderer_classes([PrometheusRenderer, ORJSONRenderer])
+def metrics(request):
+    """Per-endpoint request, latency and SQL metrics of this process, as Prometheus text or ?format=json"""
+    return Response(metrics_snapshot())
+
+
+@api_view(['GET'])
+def profiles(request):
+    """Stored request profiles, newest first; needs the profiling secret or a staff session"""
+    if not profiling.can_read_profiles(request):
+        return Response({'error': 'Profiles need the profiling secret or a staff session'},
+                        status=status.HTTP_403_FORBIDDEN)
+    
+    summaries = []
+    for profile_id in reversed(profiling.profile_ids()):
+        summary = profiling.load(profile_id)
+        if summary:
+            summary.pop('queries')
+            summary.pop('top_functions')
+            summaries.append(summary)
+    return Response(summaries)
+
+
+@api_view(['GET'])
+def profile_detail(request, profile_id):
+    """One stored profile with its query log and top functions; ?download=prof returns the pstats file"""
+    if not profiling.can_read_profiles(request):
+        return Response({'error': 'Profiles need the profiling secret or a staff session'},
+                        status=status.HTTP_403_FORBIDDEN)
+    
+    if request.query_params.get('download') == 'prof':
+        path = profiling.stats_path(profile_id)
+        if path is None:
+            return Response({'error': 'Profile not found'}, status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=f'{profile_id}.prof')
+    
+    summary = profiling.load(profile_id)
+    if summary is None:
+        return Response({'error': 'Profile not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(summary)
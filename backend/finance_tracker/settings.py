@@ -1,6 +1,10 @@
 import os
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
+
+from finance.database import sqlite_databases
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = os.environ.get('SECRET_KEY', 'your-secret-key-here-change-in-production')
@@ -20,12 +24,18 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost, so latency covers the whole middleware stack
+    'finance.metrics.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    # Outermost after CORS, so it sees the final response body
+    'finance.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # After authentication, so staff sessions can ask for a profile
+    'finance.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -48,19 +58,66 @@ TEMPLATES = [
     },
 ]
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db' / 'db.sqlite3',
+# DATABASE_PROFILE=production (the default when DEBUG is off) turns on WAL,
+# tuned pragmas, persistent connections and a read-only alias for ORM reads;
+# see finance/database.py.
+DATABASE_PROFILE = os.environ.get('DATABASE_PROFILE', 'default' if DEBUG else 'production')
+DATABASES = sqlite_databases(
+    BASE_DIR / 'db' / 'db.sqlite3', DATABASE_PROFILE,
+    conn_max_age=int(os.environ.get('CONN_MAX_AGE', 600)),
+)
+DATABASE_ROUTERS = ['finance.database.ReadWriteRouter']
+
+# Summary endpoints are cached (finance/caching.py). Local memory needs no extra
+# services; set CACHE_DIR to share the cached values between several worker
+# processes.
+if os.environ.get('CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ['CACHE_DIR'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'finance-tracker',
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        }
     }
+# The version tokens that invalidate cached values must be seen by every
+# process that writes the database: each web worker, and management commands
+# run from cron. They live in files beside the database.
+CACHES['versions'] = {
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': os.environ.get('CACHE_VERSIONS_DIR', str(BASE_DIR / 'db' / 'cache-versions')),
+    'OPTIONS': {'MAX_ENTRIES': 100000},
 }
 
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
-    ]
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'finance.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
+# Opt-in request profiling (finance/profiling.py): send X-Profile with the
+# secret, or sample a fraction of all requests; the newest profiles are kept.
+PROFILING_SECRET = os.environ.get('PROFILING_SECRET', '')
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0))
+PROFILING_DIR = os.environ.get('PROFILING_DIR', BASE_DIR / 'db' / 'profiles')
+PROFILING_MAX_PROFILES = int(os.environ.get('PROFILING_MAX_PROFILES', 50))
+
+# Threads that compute the parts of /api/dashboard/ concurrently (finance/fanout.py)
+FANOUT_WORKERS = int(os.environ.get('FANOUT_WORKERS', 4))
+
+# Responses smaller than this are not compressed (finance.middleware)
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+
 CORS_ALLOWED_ORIGINS = os.environ.get(
     'CORS_ALLOWED_ORIGINS', 
     'http://localhost:3000,http://127.0.0.1:3000,http://localhost,http://127.0.0.1'
@@ -68,6 +125,10 @@ CORS_ALLOWED_ORIGINS = os.environ.get(
 
 CORS_ALLOW_ALL_ORIGINS = DEBUG  # Allow all origins in debug mode
 
+# Conditional GET: the frontend revalidates with If-None-Match and reads ETag
+CORS_ALLOW_HEADERS = (*default_headers, 'if-none-match', 'x-profile')
+CORS_EXPOSE_HEADERS = ['ETag', 'Last-Modified', 'X-Profile-Id']
+
 # Security settings for production
 if not DEBUG:
     SECURE_BROWSER_XSS_FILTER = True
@@ -0,0 +1,30 @@
+"""
+Production server settings; docker-entrypoint.sh runs
+`gunicorn -c gunicorn.conf.py finance_tracker.wsgi`. Every value can be
+overridden through the environment (or GUNICORN_CMD_ARGS).
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# SQLite takes one writer at a time, so more processes mostly add memory
+workers = int(os.environ.get('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2 + 1, 4)))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Import Django once in the master and fork ready workers from it
+preload_app = True
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = 30
+keepalive = 5
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def post_fork(server, worker):
+    # Workers must not share a database connection inherited from the master
+    from django.db import connections
+    connections.close_all()
@@ -9,7 +9,7 @@ import FinancialGoals from '../components/FinancialGoals';
 import BudgetManagement from '../components/BudgetManagement';
 import { Home, CreditCard, Settings, BarChart3, Target, Zap, Wallet, Calculator } from 'lucide-react';
 import { Toaster, toast } from 'sonner';
-import apiService from '../lib/api';
+import apiService, { TRANSACTIONS_PAGE_SIZE } from '../lib/api';
 
 const ModernFinanceTracker = () => {
   // State management
@@ -17,19 +17,32 @@ const ModernFinanceTracker = () => {
   const [loading, setLoading] = useState(true);
   const [transactions, setTransactions] = useState([]);
   const [categories, setCategories] = useState([]);
+  const [dashboard, setDashboard] = useState(null);
+  // The last page loaded into `transactions`; its `next` link continues the list
+  const [transactionsPage, setTransactionsPage] = useState(null);
+  const [transactionFilter, setTransactionFilter] = useState('all');
+  const [loadingMore, setLoadingMore] = useState(false);
+
+  // Re-read the dashboard's aggregates after a write (revalidated with its ETag)
+  const refreshDashboard = async () => {
+    try {
+      setDashboard(await apiService.getDashboard());
+    } catch (error) {
+      console.error('Error refreshing dashboard:', error);
+    }
+  };
 
   // Load initial data
   useEffect(() => {
     const loadData = async () => {
       try {
         setLoading(true);
-        const [transactionsData, categoriesData] = await Promise.all([
-          apiService.getTransactions(),
-          apiService.getCategories()
-        ]);
-        
-        setTransactions(transactionsData);
-        setCategories(categoriesData);
+        // One round trip for the first page, the categories and the dashboard's aggregates
+        const first = await apiService.getDashboard();
+        setDashboard(first);
+        setCategories(first.categories);
+        setTransactions(first.transactions.results);
+        setTransactionsPage(first.transactions);
       } catch (error) {
         console.error('Error loading data:', error);
         toast.error('Failed to load data. Please refresh the page.');
@@ -41,9 +54,44 @@ const ModernFinanceTracker = () => {
     loadData();
   }, []);
 
+  // Append the next page of the list, when the user scrolls to its end
+  const loadMoreTransactions = async () => {
+    if (loadingMore || !transactionsPage?.next) return;
+    try {
+      setLoadingMore(true);
+      const page = await apiService.getNextTransactionsPage(transactionsPage);
+      setTransactions(prev => [...prev, ...page.results]);
+      setTransactionsPage(page);
+    } catch (error) {
+      console.error('Error loading transactions:', error);
+      toast.error('Failed to load more transactions');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  // The type filter runs on the server, so the list restarts from its first page
+  const handleTransactionFilterChange = async (filter) => {
+    setTransactionFilter(filter);
+    try {
+      const page = await apiService.getTransactionsPage({
+        page_size: TRANSACTIONS_PAGE_SIZE,
+        type: filter === 'all' ? undefined : filter,
+      });
+      setTransactions(page.results);
+      setTransactionsPage(page);
+    } catch (error) {
+      console.error('Error loading transactions:', error);
+      toast.error('Failed to load transactions');
+    }
+  };
+
   // Handle adding new transactions
   const handleTransactionAdded = (newTransaction) => {
-    setTransactions(prev => [newTransaction, ...prev]);
+    if (transactionFilter === 'all' || newTransaction.type === transactionFilter) {
+      setTransactions(prev => [newTransaction, ...prev]);
+    }
+    refreshDashboard();
   };
 
   // Handle updating transactions
@@ -51,6 +99,7 @@ const ModernFinanceTracker = () => {
     setTransactions(prev => 
       prev.map(t => t.id === updatedTransaction.id ? updatedTransaction : t)
     );
+    refreshDashboard();
   };
 
   // Handle deleting transactions
@@ -58,6 +107,7 @@ const ModernFinanceTracker = () => {
     try {
       await apiService.deleteTransaction(id);
       setTransactions(prev => prev.filter(t => t.id !== id));
+      refreshDashboard();
       toast.success('Transaction deleted successfully');
     } catch (error) {
       console.error('Error deleting transaction:', error);
@@ -260,11 +310,16 @@ const ModernFinanceTracker = () => {
   );
 
   const DashboardSection = () => (
-    <Dashboard transactions={transactions} />
+    <Dashboard
+      summary={dashboard?.monthly_summary}
+      trend={dashboard?.six_month_trend}
+      budget={dashboard?.current_budget}
+      period={dashboard?.current_period}
+    />
   );
 
   const AnalyticsSection = () => (
-    <Analytics transactions={transactions} />
+    <Analytics />
   );
 
   const GoalsSection = () => (
@@ -272,13 +327,18 @@ const ModernFinanceTracker = () => {
   );
 
   const BudgetSection = () => (
-    <BudgetManagement transactions={transactions} />
+    <BudgetManagement />
   );
 
   const TransactionsSection = () => (
     <TransactionList 
       transactions={transactions}
       categories={categories}
+      filter={transactionFilter}
+      onFilterChange={handleTransactionFilterChange}
+      hasMore={Boolean(transactionsPage?.next)}
+      loadingMore={loadingMore}
+      onLoadMore={loadMoreTransactions}
       onTransactionAdded={handleTransactionAdded}
       onTransactionUpdated={handleTransactionUpdated}
       onTransactionDeleted={handleTransactionDeleted}
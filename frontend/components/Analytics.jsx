@@ -1,6 +1,6 @@
 'use client';
 
-import { useState, useEffect, useMemo } from 'react';
+import { useState, useEffect } from 'react';
 import { 
   TrendingUp, 
   TrendingDown, 
@@ -33,132 +33,55 @@ import { apiService } from '../lib/api';
 import { toast } from 'sonner';
 import pdfReportService from '../lib/pdfReports';
 
+const RANGE_PARAMS = {
+  '3months': '3m',
+  '6months': '6m',
+  '12months': '12m',
+};
+
+const EMPTY_ANALYTICS = {
+  monthlyTrend: [],
+  categoryBreakdown: [],
+  insights: {
+    totalIncome: 0,
+    totalExpenses: 0,
+    netWorthChange: 0,
+    savingsRate: 0,
+    avgMonthlySpending: 0,
+    avgDailySpending: 0,
+    largestCategory: null
+  }
+};
+
 export default function Analytics() {
-  const [transactions, setTransactions] = useState([]);
   const [timeRange, setTimeRange] = useState('3months');
   const [loading, setLoading] = useState(true);
+  const [analyticsData, setAnalyticsData] = useState(EMPTY_ANALYTICS);
   const [budget, setBudget] = useState(null);
   const [generatingPDF, setGeneratingPDF] = useState(false);
 
   useEffect(() => {
-    loadTransactions();
     loadBudgetData();
   }, []);
 
-  const loadTransactions = async () => {
+  useEffect(() => {
+    loadAnalytics(timeRange);
+  }, [timeRange]);
+
+  // Aggregation happens server-side; the payload is a few KB regardless of history size
+  const loadAnalytics = async (range) => {
     try {
       setLoading(true);
-      console.log('Loading transactions...');
-      const data = await apiService.getTransactions();
-      console.log('Transactions loaded:', data);
-      setTransactions(data);
+      const data = await apiService.getAnalytics(RANGE_PARAMS[range] || '3m');
+      setAnalyticsData(data);
     } catch (error) {
-      console.error('Error loading transactions:', error);
-      toast.error('Failed to load transactions');
+      console.error('Error loading analytics:', error);
+      toast.error('Failed to load analytics');
     } finally {
       setLoading(false);
     }
   };
 
-  const analyticsData = useMemo(() => {
-    console.log('Computing analytics data, transactions:', transactions);
-    if (!transactions.length) {
-      console.log('No transactions, returning empty data');
-      return {
-        monthlyTrend: [],
-        categoryBreakdown: [],
-        insights: {
-          totalIncome: 0,
-          totalExpenses: 0,
-          netWorthChange: 0,
-          savingsRate: 0,
-          avgMonthlySpending: 0,
-          avgDailySpending: 0,
-          largestCategory: null
-        }
-      };
-    }
-
-    const currentDate = new Date();
-    const monthsToLookBack = timeRange === '3months' ? 3 : timeRange === '6months' ? 6 : 12;
-    const cutoffDate = new Date();
-    cutoffDate.setMonth(currentDate.getMonth() - monthsToLookBack);
-
-    const filteredTransactions = transactions.filter(t => 
-      new Date(t.date) >= cutoffDate
-    );
-
-    // Monthly trend
-    const monthlyData = {};
-    filteredTransactions.forEach(transaction => {
-      const date = new Date(transaction.date);
-      const monthKey = `${date.getFullYear()}-${String(date.getMonth() + 1).padStart(2, '0')}`;
-      const monthName = date.toLocaleString('default', { month: 'short', year: 'numeric' });
-      
-      if (!monthlyData[monthKey]) {
-        monthlyData[monthKey] = { month: monthName, income: 0, expenses: 0 };
-      }
-      
-      if (transaction.type === 'income') {
-        monthlyData[monthKey].income += parseFloat(transaction.amount);
-      } else {
-        monthlyData[monthKey].expenses += parseFloat(transaction.amount);
-      }
-    });
-
-    const monthlyTrend = Object.values(monthlyData).sort((a, b) => 
-      new Date(a.month).getTime() - new Date(b.month).getTime()
-    );
-
-    // Category breakdown (expenses only)
-    const categoryData = {};
-    filteredTransactions
-      .filter(t => t.type === 'expense')
-      .forEach(transaction => {
-        const category = transaction.category_name || 'Uncategorized';
-        categoryData[category] = (categoryData[category] || 0) + parseFloat(transaction.amount);
-      });
-
-    const categoryBreakdown = Object.entries(categoryData)
-      .map(([name, amount]) => ({ name, amount }))
-      .sort((a, b) => b.amount - a.amount);
-
-    // Calculate insights
-    const totalIncome = filteredTransactions
-      .filter(t => t.type === 'income')
-      .reduce((sum, t) => sum + parseFloat(t.amount), 0);
-    
-    const totalExpenses = filteredTransactions
-      .filter(t => t.type === 'expense')
-      .reduce((sum, t) => sum + parseFloat(t.amount), 0);
-
-    const netWorthChange = totalIncome - totalExpenses;
-    const savingsRate = totalIncome > 0 ? ((netWorthChange / totalIncome) * 100) : 0;
-    const avgMonthlySpending = totalExpenses / monthsToLookBack;
-    const avgDailySpending = totalExpenses / (monthsToLookBack * 30);
-    const largestCategory = categoryBreakdown[0] || null;
-
-    const result = {
-      monthlyTrend,
-      categoryBreakdown,
-      insights: {
-        totalIncome,
-        totalExpenses,
-        netWorthChange,
-        savingsRate,
-        avgMonthlySpending,
-        avgDailySpending,
-        largestCategory: largestCategory ? {
-          category: largestCategory.name,
-          amount: largestCategory.amount
-        } : null
-      }
-    };
-    
-    console.log('Analytics data computed:', result);
-    return result;
-  }, [transactions, timeRange]);
-
   const loadBudgetData = async () => {
     try {
       const budgetData = await apiService.getCurrentBudget();
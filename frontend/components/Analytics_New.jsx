@@ -44,8 +44,9 @@ export default function Analytics() {
   const loadTransactions = async () => {
     try {
       setLoading(true);
-      const data = await apiService.getTransactions();
-      setTransactions(data);
+      // Only the most recent rows; Analytics.jsx reads the server aggregates instead
+      const data = await apiService.getTransactionsPage({ page_size: 500 });
+      setTransactions(data.results);
     } catch (error) {
       console.error('Error loading transactions:', error);
       toast.error('Failed to load transactions');
@@ -20,8 +20,9 @@ import { toast } from 'sonner';
 import apiService from '../lib/api';
 import BudgetTemplateSelectorFixed from './BudgetTemplateSelectorFixed';
 
-const BudgetManagement = ({ transactions = [] }) => {
+const BudgetManagement = () => {
   const [budget, setBudget] = useState(null);
+  const [analysis, setAnalysis] = useState(null);
   const [budgetPeriods, setBudgetPeriods] = useState([]);
   const [currentPeriod, setCurrentPeriod] = useState(null);
   const [loading, setLoading] = useState(true);
@@ -46,13 +47,15 @@ const BudgetManagement = ({ transactions = [] }) => {
   const loadBudgetData = async () => {
     try {
       setLoading(true);
-      const [budgetData, periodsData, currentPeriodData] = await Promise.all([
+      const [budgetData, periodsData, currentPeriodData, analysisData] = await Promise.all([
         apiService.getCurrentBudget().catch(() => null),
         apiService.getBudgetPeriods().catch(() => []),
-        apiService.getCurrentBudgetPeriod().catch(() => null)
+        apiService.getCurrentBudgetPeriod().catch(() => null),
+        apiService.getBudgetAnalysis().catch(() => null)
       ]);
       
       setBudget(budgetData);
+      setAnalysis(analysisData);
       setBudgetPeriods(periodsData);
       setCurrentPeriod(currentPeriodData);
       
@@ -79,47 +82,17 @@ const BudgetManagement = ({ transactions = [] }) => {
     }
   };
 
-  // Calculate actual spending from transactions
+  // Spending of the current period, summed on the server from the monthly rollup
   const calculateActualSpending = () => {
-    if (!transactions.length || !currentPeriod) {
+    if (!analysis) {
       return { needs: 0, wants: 0, totalSpent: 0 };
     }
 
-    const periodStart = new Date(currentPeriod.start_date);
-    const periodEnd = new Date(currentPeriod.end_date);
-    
-    const periodTransactions = transactions.filter(t => {
-      const transactionDate = new Date(t.date);
-      return transactionDate >= periodStart && 
-             transactionDate <= periodEnd && 
-             t.type === 'expense';
-    });
-
-    // Categorize spending (this is simplified - you might want more sophisticated categorization)
-    const needsCategories = ['Groceries', 'Utilities', 'Rent', 'Healthcare', 'Transportation'];
-    const wantsCategories = ['Entertainment', 'Dining Out', 'Shopping', 'Hobbies'];
-    
-    let needsSpent = 0;
-    let wantsSpent = 0;
-    
-    periodTransactions.forEach(t => {
-      const categoryName = t.category_name || t.category || '';
-      const amount = Math.abs(parseFloat(t.amount));
-      
-      if (needsCategories.some(cat => categoryName.toLowerCase().includes(cat.toLowerCase()))) {
-        needsSpent += amount;
-      } else if (wantsCategories.some(cat => categoryName.toLowerCase().includes(cat.toLowerCase()))) {
-        wantsSpent += amount;
-      } else {
-        // Default to needs if unclear
-        needsSpent += amount;
-      }
-    });
-
+    const { needs, wants } = analysis.actual_spending;
     return {
-      needs: needsSpent,
-      wants: wantsSpent,
-      totalSpent: needsSpent + wantsSpent
+      needs,
+      wants,
+      totalSpent: needs + wants
     };
   };
 
@@ -3,102 +3,23 @@ import React, { useMemo } from 'react';
 import { LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, PieChart, Pie, Cell, ResponsiveContainer } from 'recharts';
 import { TrendingUp, TrendingDown, PiggyBank, Activity, BarChart3, ArrowUpRight, ArrowDownRight } from 'lucide-react';
 
-const Dashboard = ({ transactions = [] }) => {
-  // Calculate metrics from transactions
+const Dashboard = ({ summary = null, trend = [], budget = null, period = null }) => {
+  // Everything shown here comes aggregated from the /dashboard/ response
   const metrics = useMemo(() => {
-    if (!transactions.length) {
-      return {
-        totalIncome: 0,
-        totalExpenses: 0,
-        totalSavings: 0,
-        monthlyData: [],
-        savingsData: [],
-        incomeBreakdown: [],
-        expenseBreakdown: []
-      };
-    }
-
-    const currentMonth = new Date().getMonth();
-    const currentYear = new Date().getFullYear();
-    
-    const currentMonthTransactions = transactions.filter(t => {
-      const transactionDate = new Date(t.date);
-      return transactionDate.getMonth() === currentMonth && 
-             transactionDate.getFullYear() === currentYear;
-    });
-
-    const totalIncome = currentMonthTransactions
-      .filter(t => t.type === 'income')
-      .reduce((sum, t) => sum + parseFloat(t.amount || 0), 0);
-
-    const totalExpenses = Math.abs(currentMonthTransactions
-      .filter(t => t.type === 'expense')
-      .reduce((sum, t) => sum + parseFloat(t.amount || 0), 0));
-
-    const totalSavings = totalIncome - totalExpenses;
-
-    // Group transactions by category for expense breakdown
-    const expensesByCategory = transactions
-      .filter(t => t.type === 'expense')
-      .reduce((acc, t) => {
-        const categoryName = t.category_name || t.category?.name || 'Other';
-        acc[categoryName] = (acc[categoryName] || 0) + Math.abs(parseFloat(t.amount || 0));
-        return acc;
-      }, {});
-
-    const expenseBreakdown = Object.entries(expensesByCategory)
-      .map(([name, value]) => ({ name, value }))
-      .sort((a, b) => b.value - a.value)
-      .slice(0, 6);
-
-    // Group transactions by category for income breakdown
-    const incomesByCategory = transactions
-      .filter(t => t.type === 'income')
-      .reduce((acc, t) => {
-        const categoryName = t.category_name || t.category?.name || 'Other';
-        acc[categoryName] = (acc[categoryName] || 0) + parseFloat(t.amount || 0);
-        return acc;
-      }, {});
-
-    const incomeBreakdown = Object.entries(incomesByCategory)
-      .map(([name, value]) => ({ name, value }))
+    const breakdown = (byCategory = {}, limit) => Object.entries(byCategory)
+      .map(([name, item]) => ({ name, value: item.amount }))
       .sort((a, b) => b.value - a.value)
-      .slice(0, 4);
-
-    // Create monthly savings data based on actual transactions
-    const savingsData = Array.from({ length: 12 }, (_, i) => {
-      const monthName = new Date(currentYear, i).toLocaleString('default', { month: 'long' });
-      
-      // Get transactions for this specific month
-      const monthTransactions = transactions.filter(t => {
-        const transactionDate = new Date(t.date);
-        return transactionDate.getMonth() === i && transactionDate.getFullYear() === currentYear;
-      });
-      
-      // Calculate actual income and expenses for this month
-      const monthIncome = monthTransactions
-        .filter(t => t.type === 'income')
-        .reduce((sum, t) => sum + parseFloat(t.amount || 0), 0);
-      
-      const monthExpenses = Math.abs(monthTransactions
-        .filter(t => t.type === 'expense')
-        .reduce((sum, t) => sum + parseFloat(t.amount || 0), 0));
-      
-      return {
-        name: monthName,
-        value: monthIncome - monthExpenses
-      };
-    });
+      .slice(0, limit);
 
     return {
-      totalIncome,
-      totalExpenses,
-      totalSavings,
-      expenseBreakdown,
-      incomeBreakdown,
-      savingsData
+      totalIncome: summary?.monthly_income ?? 0,
+      totalExpenses: summary?.monthly_expenses ?? 0,
+      totalSavings: summary?.monthly_savings ?? 0,
+      expenseBreakdown: breakdown(summary?.expense_breakdown, 6),
+      incomeBreakdown: breakdown(summary?.income_breakdown, 4),
+      savingsData: trend.map(month => ({ name: month.month, value: month.savings })),
     };
-  }, [transactions]);
+  }, [summary, trend]);
   const styles = {
     grid: {
       display: 'grid',
@@ -182,7 +103,10 @@ const Dashboard = ({ transactions = [] }) => {
     <div>
       <div style={styles.header}>
         <h1 style={styles.title}>Personal Finance Tracker</h1>
-        <p style={styles.subtitle}>Track your financial journey with precision</p>
+        <p style={styles.subtitle}>
+          {period ? period.name : 'Track your financial journey with precision'}
+          {budget ? ` · $${parseFloat(budget.monthly_income).toLocaleString()} budgeted income` : ''}
+        </p>
       </div>
 
       {/* Key Metrics */}
@@ -241,7 +165,7 @@ const Dashboard = ({ transactions = [] }) => {
         {/* Savings Trend */}
         <div style={styles.card}>
           <div style={{ display: 'flex', justifyContent: 'space-between', marginBottom: '24px' }}>
-            <h3 style={{ fontSize: '14px', fontWeight: '500', color: '#e5e5e5' }}>2025 Savings</h3>
+            <h3 style={{ fontSize: '14px', fontWeight: '500', color: '#e5e5e5' }}>Six Month Savings</h3>
             <BarChart3 style={{ width: 16, height: 16, color: '#525252' }} />
           </div>
           <ResponsiveContainer width="100%" height={200}>
@@ -406,46 +330,11 @@ const Dashboard = ({ transactions = [] }) => {
         <div style={styles.card}>
           <div style={{ display: 'flex', justifyContent: 'space-between', alignItems: 'center', marginBottom: '24px' }}>
             <h3 style={{ fontSize: '14px', fontWeight: '500', color: '#e5e5e5' }}>Total Savings</h3>
-            <div style={{ display: 'flex', gap: '8px' }}>
-              {['All Months', 'Q1', 'Q2', 'Q3', 'Q4'].map((filter) => (
-                <button
-                  key={filter}
-                  style={{
-                    ...styles.filterButton,
-                    ...(filter === 'All Months' ? styles.filterButtonActive : {})
-                  }}
-                >
-                  {filter}
-                </button>
-              ))}
-            </div>
+            <span style={{ fontSize: '12px', color: '#737373' }}>Last six months</span>
           </div>
           
           <div style={{ display: 'grid', gridTemplateColumns: 'repeat(auto-fit, minmax(180px, 1fr))', gap: '12px' }}>
-            {Array.from({ length: 12 }, (_, index) => {
-              const monthNames = ['January', 'February', 'March', 'April', 'May', 'June', 
-                                'July', 'August', 'September', 'October', 'November', 'December'];
-              const monthName = monthNames[index];
-              const currentMonth = new Date().getMonth();
-              const currentYear = new Date().getFullYear();
-              const hasData = index <= currentMonth;
-              
-              // Calculate actual monthly data from transactions
-              const monthlyTransactions = transactions.filter(t => {
-                const transactionDate = new Date(t.date);
-                return transactionDate.getMonth() === index && transactionDate.getFullYear() === currentYear;
-              });
-              
-              const income = monthlyTransactions
-                .filter(t => t.type === 'income')
-                .reduce((sum, t) => sum + parseFloat(t.amount), 0);
-              
-              const expenses = monthlyTransactions
-                .filter(t => t.type === 'expense')
-                .reduce((sum, t) => sum + parseFloat(t.amount), 0);
-              
-              const net = income - expenses;
-              
+            {trend.map(({ month: monthName, income, expenses, savings: net }) => {
               return (
                 <div 
                   key={monthName}
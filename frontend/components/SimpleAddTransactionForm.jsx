@@ -131,6 +131,24 @@ const SimpleAddTransactionForm = ({ onTransactionAdded, trigger, categories = []
     }
   };
 
+  // Pre-select the suggested category once a description is typed, unless one was picked
+  const suggestCategory = async () => {
+    if (formData.category || !formData.description.trim()) return;
+    try {
+      const { results } = await apiService.categorizeTransactions([{
+        description: formData.description,
+        amount: formData.amount ? Math.abs(parseFloat(formData.amount)).toFixed(2) : null,
+        type: formData.type
+      }]);
+      const suggestion = results[0]?.category;
+      if (suggestion && getFilteredCategories(formData.type).some(category => category.id === suggestion)) {
+        setFormData(prev => (prev.category ? prev : { ...prev, category: suggestion.toString() }));
+      }
+    } catch (error) {
+      // A suggestion is optional; the category can still be picked by hand
+    }
+  };
+
   // Handle input changes
   const handleInputChange = (field, value) => {
     setFormData(prev => ({
@@ -367,6 +385,7 @@ const SimpleAddTransactionForm = ({ onTransactionAdded, trigger, categories = []
               placeholder={formData.type === 'income' ? 'e.g., Salary payment' : 'e.g., Grocery shopping'}
               value={formData.description}
               onChange={(e) => handleInputChange('description', e.target.value)}
+              onBlur={suggestCategory}
               style={{
                 backgroundColor: '#262626',
                 border: `1px solid ${errors.description ? '#ef4444' : '#404040'}`,
@@ -1,5 +1,5 @@
 "use client"
-import React, { useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import { Edit, Trash2, ArrowUpRight, ArrowDownRight, Filter, CreditCard, Plus } from 'lucide-react';
 import EditTransactionForm from './EditTransactionForm';
 import SimpleAddTransactionForm from './SimpleAddTransactionForm';
@@ -10,11 +10,26 @@ const TransactionList = ({
   onTransactionAdded,
   onTransactionUpdated, 
   onTransactionDeleted,
-  categories 
+  categories,
+  filter: transactionFilter = 'all',
+  onFilterChange,
+  hasMore = false,
+  loadingMore = false,
+  onLoadMore,
 }) => {
   const [editingTransaction, setEditingTransaction] = useState(null);
   const [editFormOpen, setEditFormOpen] = useState(false);
-  const [transactionFilter, setTransactionFilter] = useState('all');
+  const sentinel = useRef(null);
+
+  // Load the next page when the end of the list scrolls into view
+  useEffect(() => {
+    if (!hasMore || !sentinel.current) return;
+    const observer = new IntersectionObserver(entries => {
+      if (entries[0].isIntersecting) onLoadMore();
+    }, { rootMargin: '400px' });
+    observer.observe(sentinel.current);
+    return () => observer.disconnect();
+  }, [hasMore, onLoadMore]);
 
   const styles = {
     card: {
@@ -72,14 +87,6 @@ const TransactionList = ({
     },
   };
 
-  // Filter transactions based on selected filter
-  const filteredTransactions = transactions.filter(transaction => {
-    if (transactionFilter === 'all') return true;
-    if (transactionFilter === 'income') return transaction.type === 'income';
-    if (transactionFilter === 'expense') return transaction.type === 'expense';
-    return true;
-  });
-
   // Handle transaction edit
   const handleTransactionEdit = (transaction) => {
     setEditingTransaction(transaction);
@@ -141,7 +148,7 @@ const TransactionList = ({
                   ...styles.filterButton, 
                   ...(transactionFilter === 'all' ? styles.filterButtonActive : {})
                 }}
-                onClick={() => setTransactionFilter('all')}
+                onClick={() => onFilterChange('all')}
               >
                 All
               </button>
@@ -150,7 +157,7 @@ const TransactionList = ({
                   ...styles.filterButton, 
                   ...(transactionFilter === 'income' ? styles.filterButtonActive : {})
                 }}
-                onClick={() => setTransactionFilter('income')}
+                onClick={() => onFilterChange('income')}
               >
                 Income
               </button>
@@ -159,7 +166,7 @@ const TransactionList = ({
                   ...styles.filterButton, 
                   ...(transactionFilter === 'expense' ? styles.filterButtonActive : {})
                 }}
-                onClick={() => setTransactionFilter('expense')}
+                onClick={() => onFilterChange('expense')}
               >
                 Expenses
               </button>
@@ -168,7 +175,8 @@ const TransactionList = ({
         </div>
         
         <div>
-          {filteredTransactions.map((transaction) => (
+          {/* The server applies the type filter; further pages append as the list scrolls */}
+          {transactions.map((transaction) => (
             <div 
               key={transaction.id} 
               style={styles.transactionRow}
@@ -266,7 +274,13 @@ const TransactionList = ({
             </div>
           ))}
           
-          {filteredTransactions.length === 0 && transactions.length > 0 && (
+          {hasMore && (
+            <div ref={sentinel} style={{ padding: '24px', textAlign: 'center', fontSize: '12px', color: '#737373' }}>
+              {loadingMore ? 'Loading more transactions...' : ''}
+            </div>
+          )}
+          
+          {transactions.length === 0 && transactionFilter !== 'all' && (
             <div style={{ 
               display: 'flex', 
               flexDirection: 'column', 
@@ -285,7 +299,7 @@ const TransactionList = ({
             </div>
           )}
           
-          {transactions.length === 0 && (
+          {transactions.length === 0 && transactionFilter === 'all' && (
             <div style={{ 
               display: 'flex', 
               flexDirection: 'column', 
@@ -3,25 +3,38 @@ import { getApiUrl } from './apiConfig';
 
 const API_BASE_URL = getApiUrl();
 
+// Rows per page of the transaction list; the next page loads on scroll
+export const TRANSACTIONS_PAGE_SIZE = 50;
+
 // API Service Class
 class ApiService {
   constructor() {
     this.baseURL = API_BASE_URL;
+    // url -> { etag, data } of the last successful GET, revalidated with If-None-Match
+    this.etagCache = new Map();
   }
 
   // Generic request method
   async request(endpoint, options = {}) {
     const url = `${this.baseURL}${endpoint}`;
+    const isGet = !options.method || options.method === 'GET';
+    const cached = isGet ? this.etagCache.get(url) : undefined;
     const config = {
+      ...options,
       headers: {
         'Content-Type': 'application/json',
+        ...(cached ? { 'If-None-Match': cached.etag } : {}),
         ...options.headers,
       },
-      ...options,
     };
 
     try {
       const response = await fetch(url, config);
+
+      // Unchanged since the last load: reuse the body we already have
+      if (response.status === 304 && cached) {
+        return cached.data;
+      }
       
       if (!response.ok) {
         throw new Error(`HTTP error! status: ${response.status}`);
@@ -30,7 +43,12 @@ class ApiService {
       // Handle empty responses
       const contentType = response.headers.get('content-type');
       if (contentType && contentType.includes('application/json')) {
-        return await response.json();
+        const data = await response.json();
+        const etag = response.headers.get('ETag');
+        if (isGet && etag) {
+          this.etagCache.set(url, { etag, data });
+        }
+        return data;
       }
       return response.text();
     } catch (error) {
@@ -79,9 +97,43 @@ class ApiService {
 
   // ==================== TRANSACTIONS ====================
 
-  // Get all transactions
-  async getTransactions() {
-    return this.get('/transactions/');
+  // Get one page of transactions. `params` accepts the server-side filters
+  // (date_from, date_to, type, category, budget_period, min_amount, max_amount),
+  // page_size and the opaque cursor from a previous page.
+  async getTransactionsPage(params = {}) {
+    const query = new URLSearchParams();
+    Object.entries(params).forEach(([key, value]) => {
+      if (value !== undefined && value !== null && value !== '') query.append(key, value);
+    });
+    const qs = query.toString();
+    return this.get(`/transactions/${qs ? `?${qs}` : ''}`);
+  }
+
+  // The page after `page` (same filters and page_size), or null on the last one.
+  // Lists load pages as the user scrolls; totals come from the aggregate endpoints.
+  async getNextTransactionsPage(page) {
+    if (!page.next) return null;
+    return this.get(page.next.slice(page.next.indexOf('/transactions/')));
+  }
+
+  // Transactions whose description matches `q` (each word as a prefix), best match first.
+  // `params` accepts the list filters plus limit and offset; the response carries next_offset.
+  async searchTransactions(q, params = {}) {
+    const query = new URLSearchParams({ q });
+    Object.entries(params).forEach(([key, value]) => {
+      if (value !== undefined && value !== null && value !== '') query.append(key, value);
+    });
+    return this.get(`/transactions/search/?${query.toString()}`);
+  }
+
+  // URL of the streaming export (format 'csv' or 'ndjson') for the given list filters;
+  // point a link or window.location at it so the browser downloads it directly
+  getTransactionsExportUrl(format = 'csv', params = {}) {
+    const query = new URLSearchParams({ format });
+    Object.entries(params).forEach(([key, value]) => {
+      if (value !== undefined && value !== null && value !== '') query.append(key, value);
+    });
+    return `${this.baseURL}/transactions/export/?${query.toString()}`;
   }
 
   // Create a new transaction
@@ -89,6 +141,25 @@ class ApiService {
     return this.post('/transactions/', transactionData);
   }
 
+  // Import a CSV, OFX or QIF bank statement file; with categorize, rows without a
+  // category get a suggested one instead of "other"
+  async importStatement(file, format = null, categorize = false) {
+    const formData = new FormData();
+    formData.append('file', file);
+    if (format) formData.append('format', format);
+    if (categorize) formData.append('categorize', 'true');
+
+    // Let the browser set the multipart boundary instead of the JSON content type
+    const response = await fetch(`${this.baseURL}/transactions/import/`, {
+      method: 'POST',
+      body: formData,
+    });
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    return response.json();
+  }
+
   // Update a transaction
   async updateTransaction(id, transactionData) {
     return this.put(`/transactions/${id}/`, transactionData);
@@ -99,6 +170,19 @@ class ApiService {
     return this.delete(`/transactions/${id}/`);
   }
 
+  // Apply create/update/delete operations in one atomic request
+  async batchTransactions(operations) {
+    return this.post('/transactions/batch/', { operations });
+  }
+
+  // Get server-side aggregated analytics (range: 3m, 6m, 12m or custom)
+  async getAnalytics(range = '3m', dateFrom = null, dateTo = null) {
+    const params = new URLSearchParams({ range });
+    if (dateFrom) params.append('date_from', dateFrom);
+    if (dateTo) params.append('date_to', dateTo);
+    return this.get(`/transactions/analytics/?${params.toString()}`);
+  }
+
   // Get monthly summary
   async getMonthlySummary() {
     return this.get('/transactions/monthly_summary/');
@@ -109,6 +193,21 @@ class ApiService {
     return this.get('/transactions/six_month_trend/');
   }
 
+  // Get an income/expense trend for the last N months (granularity: week, month or quarter)
+  async getTrend(months = 6, granularity = 'month') {
+    return this.get(`/transactions/trend/?months=${months}&granularity=${granularity}`);
+  }
+
+  // ==================== DASHBOARD ====================
+
+  // Everything the dashboard shows on load in one request: the first page of
+  // transactions (continue it with getNextTransactionsPage), categories, the
+  // current budget and period, this month's summary (with the expense and
+  // income breakdowns) and the six month trend
+  async getDashboard() {
+    return this.get(`/dashboard/?page_size=${TRANSACTIONS_PAGE_SIZE}`);
+  }
+
   // ==================== CATEGORIES ====================
 
   // Get all categories
@@ -141,6 +240,36 @@ class ApiService {
     return this.post('/categories/create_defaults/');
   }
 
+  // Suggested categories for [{ description, amount, type }], from the category rules
+  // and the descriptions of categorized transactions
+  async categorizeTransactions(transactions) {
+    return this.post('/transactions/categorize/', { transactions });
+  }
+
+  // Suggest categories for existing transactions; with apply, move them to the suggestions
+  async categorizeExistingTransactions(ids, apply = false) {
+    return this.post('/transactions/categorize/', { ids, apply });
+  }
+
+  // ==================== CATEGORY RULES ====================
+
+  // Get all category rules (keyword or regex -> category, lowest priority first)
+  async getCategoryRules() {
+    return this.get('/category-rules/');
+  }
+
+  async createCategoryRule(ruleData) {
+    return this.post('/category-rules/', ruleData);
+  }
+
+  async updateCategoryRule(id, ruleData) {
+    return this.put(`/category-rules/${id}/`, ruleData);
+  }
+
+  async deleteCategoryRule(id) {
+    return this.delete(`/category-rules/${id}/`);
+  }
+
   // ==================== BUDGETS ====================
 
   // Get all budgets
@@ -258,6 +387,11 @@ class ApiService {
     return this.post(`/recurring-transactions/${id}/process_occurrence/`);
   }
 
+  // Generate all missed occurrences of every due recurring transaction
+  async processDueRecurringTransactions() {
+    return this.post('/recurring-transactions/process_due/');
+  }
+
   // Delete a recurring transaction
   async deleteRecurringTransaction(id) {
     return this.delete(`/recurring-transactions/${id}/`);
@@ -270,12 +404,21 @@ const apiService = new ApiService();
 // Export individual methods for convenience
 export const {
   // Transactions
-  getTransactions,
+  getTransactionsPage,
+  getNextTransactionsPage,
+  getAnalytics,
+  getTransactionsExportUrl,
   createTransaction,
+  importStatement,
+  batchTransactions,
   updateTransaction,
   deleteTransaction,
   getMonthlySummary,
   getSixMonthTrend,
+  getTrend,
+  
+  // Dashboard
+  getDashboard,
   
   // Categories
   getCategories,
@@ -312,6 +455,7 @@ export const {
   createRecurringTransaction,
   updateRecurringTransaction,
   processRecurringTransaction,
+  processDueRecurringTransactions,
   deleteRecurringTransaction,
 } = apiService;
 